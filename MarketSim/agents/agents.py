@@ -1,136 +1,231 @@
-import numpy as np
-from engine.order import Order
-import random
-from abc import ABC, abstractmethod
-from collections import deque
-
-class BaseAgent(ABC):
-    def __init__(self, agent_id):
-        self.agent_id = agent_id
-        self.inventory = 0
-        self.balance = 0
-
-    @abstractmethod
-    def act(self, snapshot):
-        pass
-    
-class MarketMaker(BaseAgent):
-    def __init__(self, agent_id, inventory_limit=1000, skew_factor=0.01):
-        super().__init__(agent_id)
-        self.inventory_limit = inventory_limit
-        self.skew_factor = skew_factor
-        self.active_orders = [] # REQUIRED: Track active order IDs
-        self.order_counter = 0
-
-    def act(self, snapshot):
-        mid_price = snapshot.get('mid_price', 100.0)
-        last_spread = snapshot.get('spread', 0.10)
-        
-        actions = []
-
-        # --- FIX: CANCEL OLD ORDERS ---
-        # This is the critical missing piece! 
-        # Without this, the book fills up and the spread freezes.
-        if self.active_orders:
-            for oid in self.active_orders:
-                actions.append({'type': 'CANCEL', 'order_id': oid})
-            self.active_orders = []
-
-        q = self.inventory
-        if abs(q) >= self.inventory_limit:
-            return actions # Return just cancels if inventory full
-
-        reservation_price = mid_price - (q * self.skew_factor)
-        
-        # Dynamic spread logic with jitter
-        target_spread = max(0.02, last_spread * random.uniform(0.9, 1.1))
-        half_spread = target_spread / 2
-        
-        bid_price = max(0.01, round(reservation_price - half_spread, 2))
-        ask_price = max(0.01, round(reservation_price + half_spread, 2))
-        
-        if ask_price <= bid_price:
-            ask_price = bid_price + 0.05
-        
-        qty = random.randint(1, 10)
-        
-        # Generate Unique IDs
-        self.order_counter += 1
-        bid_id = f"{self.agent_id}_{self.order_counter}_B"
-        ask_id = f"{self.agent_id}_{self.order_counter}_A"
-        
-        # Place New Orders with explicit IDs
-        actions.append({
-            'type': 'PLACE_LIMIT',
-            'side': 'buy',
-            'price': bid_price,
-            'qty': qty,
-            'agent_id': self.agent_id,
-            'order_id': bid_id
-        })
-        actions.append({
-            'type': 'PLACE_LIMIT',
-            'side': 'sell',
-            'price': ask_price,
-            'qty': qty,
-            'agent_id': self.agent_id,
-            'order_id': ask_id
-        })
-        
-        self.active_orders = [bid_id, ask_id]
-        
-        return actions
-
-class NoiseTrader(BaseAgent):
-    def __init__(self, agent_id, sigma=0.5):
-        super().__init__(agent_id)
-        self.sigma = sigma
-        
-    def act(self, snapshot):
-        fair_value = snapshot.get('fair_value', snapshot.get('mid_price', 100.0))
-        
-        side = random.choice(['buy', 'sell'])
-        trade_size = random.randint(1, 20)
-        
-        price_variation = np.random.normal(0, self.sigma)
-        price = fair_value + price_variation if side == 'buy' else fair_value - price_variation
-        price = max(0.01, round(price, 2))
-        
-        return {
-            'type': 'PLACE_LIMIT',
-            'side': side,
-            'price': price,
-            'qty': trade_size,
-            'agent_id': self.agent_id
-        }
-
-class MomentumTrader(BaseAgent):
-    def __init__(self, agent_id, window_size=50):
-        super().__init__(agent_id)
-        self.window_size = window_size
-        self.price_history = deque(maxlen=window_size)
-    
-    def act(self, snapshot):
-        current_mid = snapshot.get('mid_price', 100.0)
-        self.price_history.append(current_mid)
-        
-        if len(self.price_history) < self.window_size:
-            return None
-        
-        sma = np.mean(self.price_history)
-        
-        if current_mid > sma:
-            side = 'buy'
-        elif current_mid < sma:
-            side = 'sell'
-        else:
-            return None
-        
-        trade_size = random.randint(5, 15)
-        
-        return {
-            'type': 'PLACE_MARKET',
-            'side': side,
-            'qty': trade_size,
-            'agent_id': self.agent_id
-        }
+import numpy as np
+from engine.order import BUY, SELL
+from engine.ticks import TickGrid, DEFAULT_TICK_SIZE
+from analytics.indicators import SMA
+import random
+from abc import ABC, abstractmethod
+
+# Intent kinds; the two placements share their codes with engine.order.OrderType
+PLACE_LIMIT, PLACE_MARKET, CANCEL = 0, 1, 2
+
+
+class Intent:
+    """One decision: place a limit order (`ticks` set), a market order (`ticks` None) or cancel `order_id`.
+
+    After dispatch() a placement's `order_id` holds the engine id of the order.
+    """
+    __slots__ = ('kind', 'side', 'ticks', 'qty', 'order_id')
+
+    def __init__(self):
+        self.kind = CANCEL
+        self.side = BUY
+        self.ticks = None
+        self.qty = 0
+        self.order_id = None
+
+    def __repr__(self):
+        return f"Intent(kind={self.kind}, side={self.side}, ticks={self.ticks}, qty={self.qty}, order_id={self.order_id})"
+
+
+class IntentBuffer:
+    """An agent's reusable list of Intents; act() clears it, fills it and returns it.
+
+    Intent objects are recycled across calls, so a decision allocates nothing
+    once the buffer has grown to the agent's largest decision.
+    """
+    __slots__ = ('items', 'count')
+
+    def __init__(self):
+        self.items = []
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def _next(self):
+        if self.count == len(self.items):
+            self.items.append(Intent())
+        intent = self.items[self.count]
+        self.count += 1
+        return intent
+
+    def limit(self, side, ticks, qty):
+        intent = self._next()
+        intent.kind, intent.side, intent.ticks, intent.qty, intent.order_id = PLACE_LIMIT, side, ticks, qty, None
+
+    def market(self, side, qty):
+        intent = self._next()
+        intent.kind, intent.side, intent.ticks, intent.qty, intent.order_id = PLACE_MARKET, side, None, qty, None
+
+    def cancel(self, order_id):
+        intent = self._next()
+        intent.kind, intent.order_id = CANCEL, order_id
+
+    def placed_ids(self):
+        """Engine ids of the orders placed from this buffer by the last dispatch()."""
+        return [intent.order_id for intent in self.items[:self.count]
+                if intent.kind != CANCEL and intent.order_id is not None]
+
+    def __iter__(self):
+        return iter(self.items[:self.count])
+
+    def __len__(self):
+        return self.count
+
+
+def dispatch(engine, agent_id, intents, timestamp, cancels=True):
+    """Execute one decision's intents on `engine`, in order; every driver goes through here.
+
+    Placements use engine.submit() (agents quote on the engine's tick grid)
+    and get their engine id written back into the intent; cancels are
+    skipped when `cancels` is False.
+    """
+    submit, cancel_order = engine.submit, engine.cancel_order
+    for intent in intents.items[:intents.count]:
+        if intent.kind == CANCEL:
+            if cancels:
+                cancel_order(intent.order_id, timestamp)
+        else:
+            intent.order_id = submit(intent.side, intent.ticks, intent.qty, agent_id, timestamp)[0]
+
+
+class BaseAgent(ABC):
+    def __init__(self, agent_id, tick_size=DEFAULT_TICK_SIZE):
+        self.agent_id = agent_id
+        self.ledger = None
+        self.slot = None
+        self._inventory = 0
+        self._balance = 0
+        # Quote on the engine's price grid instead of rounding to cents
+        self.grid = TickGrid(tick_size)
+        self.intents = IntentBuffer()
+
+    def attach(self, ledger, cash=0.0):
+        """Keep inventory and balance in a shared PositionLedger slot instead of on the agent."""
+        self.slot = ledger.register(self.agent_id, cash=cash)
+        self.ledger = ledger
+
+    @property
+    def inventory(self):
+        if self.ledger is None:
+            return self._inventory
+        return int(self.ledger.position[self.slot])
+
+    @inventory.setter
+    def inventory(self, value):
+        if self.ledger is None:
+            self._inventory = value
+        else:
+            self.ledger.position[self.slot] = value
+
+    @property
+    def balance(self):
+        if self.ledger is None:
+            return self._balance
+        return float(self.ledger.cash[self.slot])
+
+    @balance.setter
+    def balance(self, value):
+        if self.ledger is None:
+            self._balance = value
+        else:
+            self.ledger.cash[self.slot] = value
+
+    @abstractmethod
+    def act(self, snapshot):
+        """Decide on `snapshot`; returns self.intents, refilled (possibly empty)."""
+        pass
+    
+class MarketMaker(BaseAgent):
+    def __init__(self, agent_id, inventory_limit=1000, skew_factor=0.01, tick_size=DEFAULT_TICK_SIZE):
+        super().__init__(agent_id, tick_size)
+        self.inventory_limit = inventory_limit
+        self.skew_factor = skew_factor
+
+    def act(self, snapshot):
+        mid_price = snapshot.get('mid_price', 100.0)
+        last_spread = snapshot.get('spread', 0.10)
+        
+        intents = self.intents
+
+        # --- FIX: CANCEL OLD ORDERS ---
+        # This is the critical missing piece! 
+        # Without this, the book fills up and the spread freezes.
+        # dispatch() wrote the engine ids of last round's quotes into their intents.
+        active_orders = intents.placed_ids()
+        intents.clear()
+        for oid in active_orders:
+            intents.cancel(oid)
+
+        q = self.inventory
+        if abs(q) >= self.inventory_limit:
+            return intents # Return just cancels if inventory full
+
+        reservation_price = mid_price - (q * self.skew_factor)
+        
+        # Dynamic spread logic with jitter
+        grid = self.grid
+        target_spread = max(2 * grid.tick_size, last_spread * random.uniform(0.9, 1.1))
+        half_spread = target_spread / 2
+        
+        bid_ticks = max(1, grid.to_ticks(reservation_price - half_spread))
+        ask_ticks = max(1, grid.to_ticks(reservation_price + half_spread))
+        
+        if ask_ticks <= bid_ticks:
+            ask_ticks = bid_ticks + grid.to_ticks(0.05)
+
+        qty = random.randint(1, 10)
+        
+        # Place new quotes; the engine assigns their ids
+        intents.limit(BUY, bid_ticks, qty)
+        intents.limit(SELL, ask_ticks, qty)
+        
+        return intents
+
+SIDE_CHOICES = (BUY, SELL)
+
+class NoiseTrader(BaseAgent):
+    def __init__(self, agent_id, sigma=0.5, tick_size=DEFAULT_TICK_SIZE):
+        super().__init__(agent_id, tick_size)
+        self.sigma = sigma
+        
+    def act(self, snapshot):
+        fair_value = snapshot.get('fair_value', snapshot.get('mid_price', 100.0))
+        
+        side = random.choice(SIDE_CHOICES)
+        trade_size = random.randint(1, 20)
+        
+        price_variation = np.random.normal(0, self.sigma)
+        price = fair_value + price_variation if side == BUY else fair_value - price_variation
+
+        intents = self.intents
+        intents.clear()
+        intents.limit(side, max(1, self.grid.to_ticks(price)), trade_size)
+        return intents
+
+class MomentumTrader(BaseAgent):
+    def __init__(self, agent_id, window_size=50, tick_size=DEFAULT_TICK_SIZE):
+        super().__init__(agent_id, tick_size)
+        self.window_size = window_size
+        self.sma = SMA(window_size)
+    
+    def act(self, snapshot):
+        current_mid = snapshot.get('mid_price', 100.0)
+        sma = self.sma.update(current_mid)
+        intents = self.intents
+        intents.clear()
+        
+        if not self.sma.ready:
+            return intents
+        
+        if current_mid > sma:
+            side = BUY
+        elif current_mid < sma:
+            side = SELL
+        else:
+            return intents
+        
+        trade_size = random.randint(5, 15)
+        
+        intents.market(side, trade_size)
+        return intents
@@ -0,0 +1,110 @@
+import math
+from abc import ABC, abstractmethod
+
+from engine.order import BUY, SELL
+from engine.ticks import TickGrid, DEFAULT_TICK_SIZE
+from analytics.indicators import RollingVariance
+from .agents import IntentBuffer
+
+
+class CrossAssetAgent(ABC):
+    """An agent that trades several symbols from one decision.
+
+    act() gets {symbol: top of book dict} for its symbols, all taken at the same
+    simulated time, and returns self.intents: one IntentBuffer per symbol.
+    `positions` holds its inventory per symbol; the driver that books its fills
+    keeps it current (see MarketUniverse).
+    """
+
+    def __init__(self, agent_id, symbols, tick_size=DEFAULT_TICK_SIZE):
+        self.agent_id = agent_id
+        self.symbols = tuple(symbols)
+        self.grid = TickGrid(tick_size)
+        self.intents = {symbol: IntentBuffer() for symbol in self.symbols}
+        self.positions = dict.fromkeys(self.symbols, 0)
+
+    @abstractmethod
+    def act(self, snapshots):
+        """Decide on `snapshots`; returns self.intents, refilled (buffers may be empty)."""
+        pass
+
+
+class CrossMarketMaker(CrossAssetAgent):
+    """Quotes both sides of every symbol, skewed by its net inventory across all of them.
+
+    Treats the symbols as one risk bucket: a long position in any of them lowers
+    every quote, so fills on one book push inventory off through the others.
+    """
+
+    def __init__(self, agent_id, symbols, qty=5, inventory_limit=200, skew_factor=0.005, tick_size=DEFAULT_TICK_SIZE):
+        super().__init__(agent_id, symbols, tick_size)
+        self.qty = qty
+        self.inventory_limit = inventory_limit
+        self.skew_factor = skew_factor
+
+    def act(self, snapshots):
+        grid = self.grid
+        net = sum(self.positions.values())
+        for symbol in self.symbols:
+            intents = self.intents[symbol]
+            active_orders = intents.placed_ids()
+            intents.clear()
+            for oid in active_orders:
+                intents.cancel(oid)
+
+            snap = snapshots[symbol]
+            reservation_price = snap['mid_price'] - net * self.skew_factor
+            half_spread = max(2 * grid.tick_size, snap['spread']) / 2
+            bid_ticks = max(1, grid.to_ticks(reservation_price - half_spread))
+            ask_ticks = max(bid_ticks + 1, grid.to_ticks(reservation_price + half_spread))
+
+            position = self.positions[symbol]
+            if position < self.inventory_limit:
+                intents.limit(BUY, bid_ticks, self.qty)
+            if position > -self.inventory_limit:
+                intents.limit(SELL, ask_ticks, self.qty)
+        return self.intents
+
+
+class PairsTrader(CrossAssetAgent):
+    """Trades the log price ratio of two symbols back to its rolling mean.
+
+    Sells the rich leg and buys the cheap one with market orders when the ratio is
+    more than `entry` standard deviations from its mean over the last `window`
+    decisions, and flattens both legs once it is back within `exit`.
+    """
+
+    def __init__(self, agent_id, leg_a, leg_b, window=60, entry=2.0, exit=0.5, qty=10, max_position=50,
+                 tick_size=DEFAULT_TICK_SIZE):
+        super().__init__(agent_id, (leg_a, leg_b), tick_size)
+        self.ratio = RollingVariance(window)
+        self.entry = entry
+        self.exit = exit
+        self.qty = qty
+        self.max_position = max_position
+
+    def act(self, snapshots):
+        leg_a, leg_b = self.symbols
+        intents_a, intents_b = self.intents[leg_a], self.intents[leg_b]
+        intents_a.clear()
+        intents_b.clear()
+
+        x = math.log(snapshots[leg_a]['mid_price'] / snapshots[leg_b]['mid_price'])
+        ratio = self.ratio
+        # Score against the window before this observation joins it
+        z = (x - ratio.mean) / ratio.std if ratio.ready and ratio.std > 0 else 0.0
+        ratio.update(x)
+
+        position = self.positions[leg_a]
+        if z > self.entry and position > -self.max_position:
+            intents_a.market(SELL, self.qty)
+            intents_b.market(BUY, self.qty)
+        elif z < -self.entry and position < self.max_position:
+            intents_a.market(BUY, self.qty)
+            intents_b.market(SELL, self.qty)
+        elif abs(z) < self.exit:
+            for symbol, intents in self.intents.items():
+                held = self.positions[symbol]
+                if held:
+                    intents.market(SELL if held > 0 else BUY, abs(held))
+        return self.intents
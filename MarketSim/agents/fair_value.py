@@ -0,0 +1,18 @@
+import numpy as np
+
+class FairvalueProcess:
+    def __init__(self, initial_value=100.0, mu=0.0, sigma=0.0005):
+        self.current_value = initial_value
+        self.mu = mu
+        self.sigma = sigma
+    
+    def step(self, dt):
+        dW = np.random.normal(0, np.sqrt(dt))
+        self.current_value *= np.exp((self.mu - 0.5 * self.sigma**2) * dt + self.sigma * dW)
+        return self.current_value
+
+    def step_block(self, dts, dW):
+        """Advance through consecutive steps of length `dts` with Brownian increments `dW`; returns the path."""
+        path = self.current_value * np.exp(np.cumsum((self.mu - 0.5 * self.sigma**2) * dts + self.sigma * dW))
+        self.current_value = path[-1]
+        return path
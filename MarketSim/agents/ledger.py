@@ -0,0 +1,76 @@
+import numpy as np
+
+class PositionLedger:
+    """Positions, cash and realized PnL for a population of agents, one array slot each.
+
+    Subscribe it to an engine with engine.add_fill_listener(ledger.on_fill) and
+    every fill is booked straight into the owning agents' slots. Fills for ids
+    that were never registered are ignored. Realized PnL uses average cost.
+    """
+
+    def __init__(self, capacity=64):
+        self.slots = {}
+        self.agent_ids = []
+        self.position = np.zeros(capacity, dtype=np.int64)
+        self.cash = np.zeros(capacity)
+        self.avg_price = np.zeros(capacity)
+        self.realized_pnl = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.agent_ids)
+
+    def register(self, agent_id, cash=0.0):
+        slot = self.slots.get(agent_id)
+        if slot is None:
+            slot = len(self.agent_ids)
+            if slot == len(self.position):
+                self._grow()
+            self.slots[agent_id] = slot
+            self.agent_ids.append(agent_id)
+            self.cash[slot] = cash
+        return slot
+
+    def _grow(self):
+        for name in ['position', 'cash', 'avg_price', 'realized_pnl']:
+            old = getattr(self, name)
+            new = np.zeros(2 * len(old), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def on_fill(self, timestamp, price, qty, buyer_id, seller_id, aggressor_side):
+        buyer = self.slots.get(buyer_id)
+        seller = self.slots.get(seller_id)
+        if buyer == seller:
+            return  # Self-trade (or nobody we track): no change in position or cash
+        if buyer is not None:
+            self._book(buyer, qty, price)
+        if seller is not None:
+            self._book(seller, -qty, price)
+
+    def _book(self, slot, signed_qty, price):
+        position = int(self.position[slot])
+        avg = float(self.avg_price[slot])
+        new_position = position + signed_qty
+
+        if position == 0 or (position > 0) == (signed_qty > 0):
+            avg = (avg * abs(position) + price * abs(signed_qty)) / abs(new_position)
+        else:
+            closed = min(abs(signed_qty), abs(position))
+            self.realized_pnl[slot] += closed * (price - avg) * (1 if position > 0 else -1)
+            if new_position == 0:
+                avg = 0.0
+            elif (new_position > 0) != (position > 0):
+                avg = price  # Flipped through flat: the remainder opened at this price
+
+        self.position[slot] = new_position
+        self.avg_price[slot] = avg
+        self.cash[slot] -= signed_qty * price
+
+    def mark_to_market(self, price):
+        """Cash plus position value for every agent at `price` (scalar or per-agent array)."""
+        n = len(self.agent_ids)
+        return self.cash[:n] + self.position[:n] * price
+
+    def unrealized_pnl(self, price):
+        n = len(self.agent_ids)
+        return self.position[:n] * (price - self.avg_price[:n])
@@ -0,0 +1,219 @@
+import numpy as np
+from engine.ticks import TickGrid, DEFAULT_TICK_SIZE
+from analytics.indicators import SMA
+
+NOISE, MARKET_MAKER, MOMENTUM = 0, 1, 2
+
+class AgentPopulation:
+    """Many NoiseTraders, MarketMakers and MomentumTraders driven as one agent.
+
+    Parameters and per-agent state live in arrays indexed by member number, and
+    randomness is drawn a block of arrivals at a time. Noise-trader decisions for a
+    whole block are computed in one vectorized pass and every long run of
+    consecutive noise arrivals reaches the engine through a single add_orders()
+    call. Market makers and momentum traders depend on the book at their arrival
+    time, so they decide one by one from the same pre-drawn block, without
+    per-agent objects.
+
+    Arrivals follow a Poisson process at `arrival_rate` per second and pick an
+    agent uniformly, like run_simulation's background_step. `fair_value` is an
+    object with step_block(dts, dW) returning the path at each arrival; without it
+    noise traders quote around the mid at the start of their run.
+    """
+
+    # Shorter runs of noise arrivals are submitted one by one through MatchingEngine.submit()
+    BATCH_MIN = 32
+
+    def __init__(self, noise_count=0, mm_count=0, mom_count=0, sigma=0.5, inventory_limit=1000,
+                 skew_factor=0.01, window_size=50, arrival_rate=15.0, tick_size=DEFAULT_TICK_SIZE,
+                 fair_value=None, seed=None, block_size=1024):
+        counts = [noise_count, mm_count, mom_count]
+        if sum(counts) == 0:
+            raise ValueError("Population needs at least one agent")
+        self.agent_ids = ([f"NT_{i}" for i in range(noise_count)] +
+                          [f"MM_{i}" for i in range(mm_count)] +
+                          [f"MOM_{i}" for i in range(mom_count)])
+        self.kind = np.repeat([NOISE, MARKET_MAKER, MOMENTUM], counts)
+        self.member = np.concatenate([np.arange(c) for c in counts])
+        self.mm_offset = noise_count
+
+        # Per-agent parameters; scalars are broadcast, arrays give each member its own value
+        self.sigma = np.broadcast_to(np.asarray(sigma, dtype=np.float64), (noise_count,)).copy()
+        self.inventory_limit = np.broadcast_to(np.asarray(inventory_limit, dtype=np.int64), (mm_count,)).copy()
+        self.skew_factor = np.broadcast_to(np.asarray(skew_factor, dtype=np.float64), (mm_count,)).copy()
+        self.window_size = np.broadcast_to(np.asarray(window_size, dtype=np.int64), (mom_count,)).copy()
+
+        # Per-agent state: resting quote ids and momentum moving averages
+        self.mm_orders = np.zeros((mm_count, 2), dtype=np.int64)
+        self.mom_sma = [SMA(int(window)) for window in self.window_size]
+
+        self.arrival_rate = arrival_rate
+        self.grid = TickGrid(tick_size)
+        self.fair_value = fair_value
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        self.block = None
+        self.cursor = 0
+        self.clock = 0.0
+        self.arrivals = 0
+        self.loop = self.engine = None
+        self.ledger = None
+        self.slots = None
+
+    def attach(self, ledger, cash=0.0):
+        """Book every member's fills in `ledger`; market makers read their inventory from it."""
+        self.ledger = ledger
+        self.slots = np.array([ledger.register(agent_id, cash=cash) for agent_id in self.agent_ids], dtype=np.int64)
+
+    def start(self, loop, engine, interval=1.0, priority=0):
+        """Drive the population from `loop`, submitting due arrivals every `interval` seconds.
+
+        Runs before same-time callbacks with a higher priority number, so recorders
+        scheduled on the same grid see every arrival up to their timestamp. Returns
+        the loop's Timer; cancel it to stop the population.
+        """
+        self.clock = loop.current_time
+        self.loop, self.engine = loop, engine
+        return loop.schedule_every(interval, self._tick, priority, delay=0)
+
+    def _tick(self):
+        # A bound method rather than a closure, so a started population can be pickled
+        self.run_until(self.engine, self.loop.current_time)
+
+    def _draw_block(self):
+        n = self.block_size
+        rng = self.rng
+        delays = rng.exponential(1.0 / self.arrival_rate, n)
+        times = self.clock + np.concatenate(([0.0], np.cumsum(delays[:-1])))
+        self.clock = times[-1] + delays[-1]
+
+        picks = rng.integers(0, len(self.agent_ids), n)
+        kinds = self.kind[picks]
+        members = self.member[picks]
+        block = {
+            'time': times,
+            'agent': picks,
+            'kind': kinds,
+            'member': members,
+            'special': np.flatnonzero(kinds != NOISE),
+            'buy': rng.random(n) < 0.5,
+            'noise_qty': rng.integers(1, 21, n),
+            'noise_shift': rng.standard_normal(n) * self.sigma[np.where(kinds == NOISE, members, 0)]
+                           if len(self.sigma) else np.zeros(n),
+            'mm_jitter': rng.uniform(0.9, 1.1, n),
+            'mm_qty': rng.integers(1, 11, n),
+            'mom_qty': rng.integers(5, 16, n),
+            'fair_value': None
+        }
+        if self.fair_value is not None:
+            block['fair_value'] = self.fair_value.step_block(delays, rng.standard_normal(n) * np.sqrt(delays))
+        self.block = block
+        self.cursor = 0
+
+    def run_until(self, engine, until):
+        """Submit every arrival with a timestamp at or before `until`."""
+        while True:
+            if self.block is None or self.cursor == self.block_size:
+                self._draw_block()
+            block = self.block
+            stop = int(np.searchsorted(block['time'], until, side='right'))
+            if stop > self.cursor:
+                self._process(engine, self.cursor, stop)
+                self.arrivals += stop - self.cursor
+                self.cursor = stop
+            if stop < self.block_size:
+                return
+
+    def _process(self, engine, start, stop):
+        block = self.block
+        special = block['special']
+        lo, hi = np.searchsorted(special, [start, stop])
+        position = start
+        for i in special[lo:hi].tolist():
+            if i > position:
+                self._submit_noise(engine, position, i)
+            if block['kind'][i] == MARKET_MAKER:
+                self._quote(engine, int(block['member'][i]), block['time'][i],
+                            block['mm_jitter'][i], int(block['mm_qty'][i]))
+            else:
+                self._momentum(engine, i)
+            position = i + 1
+        if stop > position:
+            self._submit_noise(engine, position, stop)
+
+    def _submit_noise(self, engine, start, stop):
+        block = self.block
+        buy = block['buy'][start:stop]
+        if block['fair_value'] is not None:
+            fair_value = block['fair_value'][start:stop]
+        else:
+            fair_value = engine.get_snapshot().mid_price
+        shift = block['noise_shift'][start:stop]
+        price = np.where(buy, fair_value + shift, fair_value - shift)
+        ticks = np.maximum(1, self.grid.to_ticks_array(price))
+        if stop - start < self.BATCH_MIN:
+            # add_orders' fixed validation cost outweighs its savings on short runs
+            submit, agent_ids = engine.submit, self.agent_ids
+            for is_buy, k, q, a, ts in zip(buy.tolist(), ticks.astype(np.int64).tolist(),
+                                           block['noise_qty'][start:stop].tolist(),
+                                           block['agent'][start:stop].tolist(), block['time'][start:stop].tolist()):
+                submit(0 if is_buy else 1, k, q, agent_ids[a], ts)
+            return
+        engine.add_orders(
+            side=np.where(buy, 0, 1),
+            price=ticks * self.grid.tick_size,
+            qty=block['noise_qty'][start:stop],
+            agent=block['agent'][start:stop],
+            timestamp=block['time'][start:stop],
+            agent_ids=self.agent_ids
+        )
+
+    def _quote(self, engine, j, timestamp, jitter, qty):
+        snap = engine.get_snapshot()
+        for oid in self.mm_orders[j].tolist():
+            if oid:
+                engine.cancel_order(oid, timestamp)
+        self.mm_orders[j] = 0
+
+        q = int(self.ledger.position[self.slots[self.mm_offset + j]]) if self.ledger is not None else 0
+        if abs(q) >= self.inventory_limit[j]:
+            return
+
+        grid = self.grid
+        reservation_price = snap.mid_price - q * self.skew_factor[j]
+        half_spread = max(2 * grid.tick_size, snap.spread * jitter) / 2
+        bid_ticks = max(1, grid.to_ticks(reservation_price - half_spread))
+        ask_ticks = max(1, grid.to_ticks(reservation_price + half_spread))
+        if ask_ticks <= bid_ticks:
+            ask_ticks = bid_ticks + grid.to_ticks(0.05)
+
+        agent_id = self.agent_ids[self.mm_offset + j]
+        self.mm_orders[j, 0] = engine.submit(0, bid_ticks, qty, agent_id, timestamp)[0]
+        self.mm_orders[j, 1] = engine.submit(1, ask_ticks, qty, agent_id, timestamp)[0]
+
+    def _momentum(self, engine, i):
+        block = self.block
+        mid = engine.get_snapshot().mid_price
+        indicator = self.mom_sma[block['member'][i]]
+        sma = indicator.update(mid)
+        if not indicator.ready:
+            return
+
+        if mid > sma:
+            side = 0
+        elif mid < sma:
+            side = 1
+        else:
+            return
+        engine.submit(side, None, int(block['mom_qty'][i]), self.agent_ids[int(block['agent'][i])], block['time'][i])
+
+    def warmup(self, engine, rounds=100, timestamp=0.0):
+        """Let randomly picked market makers quote `rounds` times before the session starts."""
+        mm_count = len(self.inventory_limit)
+        if mm_count == 0:
+            return
+        rng = self.rng
+        for j, jitter, qty in zip(rng.integers(0, mm_count, rounds).tolist(),
+                                  rng.uniform(0.9, 1.1, rounds).tolist(),
+                                  rng.integers(1, 11, rounds).tolist()):
+            self._quote(engine, j, timestamp, jitter, qty)
@@ -1,5 +1,16 @@
-from .tape import Tape
-
-__all__ = [
-    "Tape"
+from .tape import Tape
+from .metrics import BarBuilder, MarketMetrics
+from .indicators import SMA, EMA, RunningVariance, RollingVariance, RollingMin, RollingMax, OrderFlowImbalance
+
+__all__ = [
+    "Tape",
+    "BarBuilder",
+    "MarketMetrics",
+    "SMA",
+    "EMA",
+    "RunningVariance",
+    "RollingVariance",
+    "RollingMin",
+    "RollingMax",
+    "OrderFlowImbalance"
 ]
\ No newline at end of file
@@ -0,0 +1,245 @@
+import math
+from collections import deque
+
+# Streaming indicators: each update() is O(1) (amortized) regardless of window size.
+# Windowed indicators keep their values in a ring buffer and rebuild their running
+# sums from it once per lap, so floating-point drift never outlives one window.
+
+
+class SMA:
+    """Simple moving average of the last `window` values."""
+    __slots__ = ('window', 'values', 'head', 'count', 'total')
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.values = [0.0] * window
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+
+    @property
+    def ready(self):
+        return self.count == self.window
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else math.nan
+
+    def update(self, x):
+        head = self.head
+        if self.count == self.window:
+            self.total -= self.values[head]
+        else:
+            self.count += 1
+        self.values[head] = x
+        self.total += x
+        head += 1
+        if head == self.window:
+            head = 0
+            self.total = math.fsum(self.values)
+        self.head = head
+        return self.total / self.count
+
+
+class EMA:
+    """Exponential moving average; give either `span` (alpha = 2 / (span + 1)) or `alpha`."""
+    __slots__ = ('alpha', 'value', 'count')
+
+    def __init__(self, span=None, alpha=None):
+        if alpha is None:
+            if span is None:
+                raise ValueError("EMA needs a span or an alpha")
+            alpha = 2.0 / (span + 1)
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        self.alpha = alpha
+        self.value = math.nan
+        self.count = 0
+
+    @property
+    def ready(self):
+        return self.count > 0
+
+    def update(self, x):
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+
+class RunningVariance:
+    """Mean and variance of every value seen so far (Welford)."""
+    __slots__ = ('ddof', 'count', 'mean', 'm2')
+
+    def __init__(self, ddof=1):
+        self.ddof = ddof
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - self.ddof) if self.count > self.ddof else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        return self.variance
+
+
+class RollingVariance:
+    """Mean and variance of the last `window` values (Welford with removal)."""
+    __slots__ = ('window', 'ddof', 'values', 'head', 'count', 'mean', 'm2')
+
+    def __init__(self, window, ddof=1):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.ddof = ddof
+        self.values = [0.0] * window
+        self.head = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def ready(self):
+        return self.count == self.window
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - self.ddof) if self.count > self.ddof else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def update(self, x):
+        head = self.head
+        if self.count == self.window:
+            old = self.values[head]
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 = max(0.0, self.m2 + (x - old) * (x - self.mean + old - old_mean))
+        else:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+        self.values[head] = x
+        head += 1
+        if head == self.window:
+            head = 0
+            mean = math.fsum(self.values) / self.window
+            self.mean = mean
+            self.m2 = math.fsum((v - mean) ** 2 for v in self.values)
+        self.head = head
+        return self.variance
+
+
+class RollingMin:
+    """Minimum of the last `window` values (monotonic queue)."""
+    __slots__ = ('window', 'queue', 'count')
+
+    # RollingMax reuses the queue on negated values
+    sign = 1
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.queue = deque()  # (index, sign * value), values increasing from the left
+        self.count = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    @property
+    def value(self):
+        return self.sign * self.queue[0][1] if self.queue else math.nan
+
+    def update(self, x):
+        x = self.sign * x
+        queue = self.queue
+        while queue and queue[-1][1] >= x:
+            queue.pop()
+        queue.append((self.count, x))
+        self.count += 1
+        if queue[0][0] <= self.count - 1 - self.window:
+            queue.popleft()
+        return self.sign * queue[0][1]
+
+
+class RollingMax(RollingMin):
+    """Maximum of the last `window` values (monotonic queue)."""
+    __slots__ = ()
+    sign = -1
+
+
+class OrderFlowImbalance:
+    """Order-flow imbalance of successive top-of-book quotes (Cont, Kukanov & Stoikov).
+
+    Each update contributes the change in bid queue minus the change in ask queue,
+    counting a better price as a fresh queue and a worse one as a removed queue.
+    The value is the sum of contributions over the last `window` updates, or since
+    the start when `window` is None. An empty side counts as zero quantity at a
+    price infinitely far from the other side.
+    """
+    __slots__ = ('window', 'values', 'head', 'count', 'total', 'bid', 'bid_qty', 'ask', 'ask_qty')
+
+    def __init__(self, window=None):
+        if window is not None and window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.values = [0.0] * window if window is not None else None
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        self.bid = self.ask = None
+
+    @property
+    def value(self):
+        return self.total
+
+    def update(self, bid, bid_qty, ask, ask_qty):
+        if bid is None:
+            bid, bid_qty = -math.inf, 0
+        if ask is None:
+            ask, ask_qty = math.inf, 0
+
+        flow = 0.0
+        if self.bid is not None:
+            if bid >= self.bid:
+                flow += bid_qty
+            if bid <= self.bid:
+                flow -= self.bid_qty
+            if ask <= self.ask:
+                flow -= ask_qty
+            if ask >= self.ask:
+                flow += self.ask_qty
+        self.bid, self.bid_qty, self.ask, self.ask_qty = bid, bid_qty, ask, ask_qty
+
+        self.count += 1
+        if self.window is None:
+            self.total += flow
+            return self.total
+        head = self.head
+        self.total += flow - self.values[head]
+        self.values[head] = flow
+        head += 1
+        if head == self.window:
+            head = 0
+            self.total = math.fsum(self.values)
+        self.head = head
+        return self.total
@@ -1,45 +1,241 @@
-import pandas as pd
-import numpy as np
-from .tape import Tape
-from .snapshots import SnapshotRecorder
-
-class MarketMetrics:
-    def __init__(self, tape: Tape):
-        self.tape = tape
-
-    def compute_vwap(self):
-        df = self.tape.to_dataframe()
-        if df.empty:
-            return None
-        total_dollar_volume=(df['price']*df['qty']).sum()
-        total_volume = df['qty'].sum()
-        vwap = total_dollar_volume / total_volume
-        return vwap
-
-    def get_session_volatility(self):
-        df = self.l1_dataframe()
-        if df.empty:
-            return None
-        
-        resampled_mid = df['mid_price'].resample('1S').last().dropna()
-        log_returns = np.log(resampled_mid / resampled_mid.shift(1)).dropna()
-        volatility = log_returns.std()
-        return volatility
-    
-    def get_rolling_volatility(self, window_size=60):
-        df = self.l1_dataframe()
-        if df.empty:
-            return None
-        
-        resampled_mid = df['mid_price'].resample('1S').last().dropna()
-        log_returns = np.log(resampled_mid / resampled_mid.shift(1)).dropna()
-        rolling_volatility = log_returns.rolling(window=window_size).std()
-        return rolling_volatility
-    def get_ohlc_data(self, freq='1Min'):
-        df = self.l1_dataframe()
-        if df.empty:
-            return None
-        
-        ohlc = df['mid_price'].resample(freq).ohlc()
-        return ohlc
-    
\ No newline at end of file
+import copy
+import math
+import pandas as pd
+import numpy as np
+from .tape import Tape
+from .indicators import RunningVariance, RollingVariance
+
+BAR_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'trades')
+
+
+def freq_seconds(freq):
+    """Bar width in seconds from a number of seconds or a pandas frequency string ('1s', '30s', '1min')."""
+    if isinstance(freq, str):
+        return pd.Timedelta(freq).total_seconds()
+    return float(freq)
+
+
+class BarBuilder:
+    """Time bars of width `freq` (open, high, low, close, volume, trade count), built one price at a time.
+
+    Bars are aligned on multiples of the width, like DataFrame.resample();
+    intervals without any update produce no bar. update() and the current /
+    last bar are O(1); to_dataframe() exports the closed bars plus the open one.
+    """
+
+    def __init__(self, freq):
+        self.freq = freq
+        self.width = freq_seconds(freq)
+        if self.width <= 0:
+            raise ValueError(f"Bar width must be positive, got {freq!r}")
+        self.start = None
+        self.open = self.high = self.low = self.close = math.nan
+        self.volume = 0
+        self.trades = 0
+        self.starts = []
+        self.closed = {name: [] for name in BAR_COLUMNS}
+
+    def update(self, timestamp, price, volume=0, trades=0):
+        start = math.floor(timestamp / self.width) * self.width
+        if self.start is None or start > self.start:
+            if self.start is not None:
+                self._close_bar()
+            self.start = start
+            self.open = self.high = self.low = price
+            self.volume = 0
+            self.trades = 0
+        elif price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.trades += trades
+
+    def _close_bar(self):
+        self.starts.append(self.start)
+        closed = self.closed
+        closed['open'].append(self.open)
+        closed['high'].append(self.high)
+        closed['low'].append(self.low)
+        closed['close'].append(self.close)
+        closed['volume'].append(self.volume)
+        closed['trades'].append(self.trades)
+
+    def __len__(self):
+        return len(self.starts) + (self.start is not None)
+
+    @property
+    def current(self):
+        """The bar still being built, as a dict, or None before the first update."""
+        if self.start is None:
+            return None
+        return dict(start=self.start, open=self.open, high=self.high, low=self.low, close=self.close,
+                    volume=self.volume, trades=self.trades)
+
+    @property
+    def last(self):
+        """The most recently completed bar, as a dict, or None."""
+        if not self.starts:
+            return None
+        return dict(start=self.starts[-1], **{name: values[-1] for name, values in self.closed.items()})
+
+    def to_dataframe(self, include_current=True):
+        starts = list(self.starts)
+        data = {name: list(values) for name, values in self.closed.items()}
+        if include_current and self.start is not None:
+            starts.append(self.start)
+            for name in BAR_COLUMNS:
+                data[name].append(getattr(self, name))
+        df = pd.DataFrame(data, index=pd.to_datetime(np.asarray(starts, dtype=np.float64), unit='s'))
+        df.index.name = 'datetime'
+        return df
+
+
+class MarketMetrics:
+    """Market statistics maintained online, one trade and one book snapshot at a time.
+
+    Trades arrive through on_trade() (a MatchingEngine fill listener) or sync(),
+    which reads whatever the `tape` gained since the last call; don't use both.
+    Snapshots arrive through on_snapshot(timestamp, mid, spread). Every query
+    (VWAP, current bars, volatilities, average spread) is O(1); the get_*
+    methods export the accumulated state as DataFrames / Series.
+    """
+
+    def __init__(self, tape: Tape = None, window_size=60, bar_freqs=('1s', '1min')):
+        self.tape = tape
+        self.cursor = tape.dropped if tape is not None else 0
+        self.window_size = window_size
+
+        # Trades
+        self.notional = 0.0
+        self.volume = 0
+        self.trade_count = 0
+        self.trade_bars = {freq: BarBuilder(freq) for freq in bar_freqs}
+
+        # Snapshots: mid bars, log returns of the mid and the quoted spread
+        self.mid_bars = {freq: BarBuilder(freq) for freq in bar_freqs}
+        self.last_mid = None
+        self.session_returns = RunningVariance()
+        self.rolling_returns = RollingVariance(window_size)
+        self.realized_variance = 0.0
+        self.spreads = RunningVariance(ddof=0)
+
+    @classmethod
+    def from_history(cls, l1, trades=None, **kwargs):
+        """Metrics over a recorded run: `l1` columns (timestamp, mid_price, spread) and tape columns."""
+        metrics = cls(**kwargs)
+        if trades is not None:
+            for row in zip(trades['timestamp'].tolist(), trades['price'].tolist(), trades['qty'].tolist()):
+                metrics.on_trade(*row)
+        for row in zip(np.asarray(l1['timestamp']).tolist(), np.asarray(l1['mid_price']).tolist(),
+                       np.asarray(l1['spread']).tolist()):
+            metrics.on_snapshot(*row)
+        return metrics
+
+    def detached(self):
+        """A copy without the tape reference, e.g. to ship with a ScenarioResult; it can't sync()."""
+        tape, self.tape = self.tape, None
+        try:
+            return copy.deepcopy(self)
+        finally:
+            self.tape = tape
+
+    def on_trade(self, timestamp, price, qty, *_):
+        self.notional += price * qty
+        self.volume += qty
+        self.trade_count += 1
+        for bars in self.trade_bars.values():
+            bars.update(timestamp, price, qty, 1)
+
+    def sync(self):
+        """Feed every trade appended to the tape since the previous sync; returns how many."""
+        tape = self.tape
+        if tape is None:
+            return 0
+        # Trades the tape already released can no longer be read
+        columns, cursor = tape.read(max(self.cursor, tape.dropped))
+        self.cursor = cursor
+        n = len(columns['qty'])
+        if n:
+            on_trade = self.on_trade
+            for row in zip(columns['timestamp'].tolist(), columns['price'].tolist(), columns['qty'].tolist()):
+                on_trade(*row)
+        return n
+
+    def on_snapshot(self, timestamp, mid_price, spread=None):
+        if mid_price is None or not mid_price > 0:
+            return
+        for bars in self.mid_bars.values():
+            bars.update(timestamp, mid_price)
+        if spread is not None and math.isfinite(spread):
+            self.spreads.update(spread)
+        self.update(mid_price)
+
+    def update(self, mid_price):
+        """Add the log return since the previous mid to the streaming volatility estimates."""
+        if mid_price is None or mid_price <= 0:
+            return
+        if self.last_mid is not None:
+            log_return = math.log(mid_price / self.last_mid)
+            self.session_returns.update(log_return)
+            self.rolling_returns.update(log_return)
+            self.realized_variance += log_return * log_return
+        self.last_mid = mid_price
+
+    # --- O(1) queries ---
+
+    def vwap(self):
+        return self.notional / self.volume if self.volume else None
+
+    def compute_vwap(self):
+        self.sync()
+        return self.vwap()
+
+    def current_session_volatility(self):
+        return self.session_returns.std if self.session_returns.count > 1 else None
+
+    def current_rolling_volatility(self):
+        return self.rolling_returns.std if self.rolling_returns.ready else None
+
+    def realized_volatility(self):
+        """Square root of the summed squared log returns of the mid."""
+        return math.sqrt(self.realized_variance)
+
+    def average_spread(self):
+        return self.spreads.mean if self.spreads.count else None
+
+    def bars(self, freq, source='mid'):
+        """The BarBuilder for `freq` (matched by width, so '1min' finds '60s') of the mid or of trades."""
+        builders = self.mid_bars if source == 'mid' else self.trade_bars
+        width = freq_seconds(freq)
+        for builder in builders.values():
+            if builder.width == width:
+                return builder
+        raise KeyError(f"No {source} bars at {freq!r}; built frequencies are {list(builders)}")
+
+    def current_bar(self, freq, source='mid'):
+        return self.bars(freq, source).current
+
+    # --- DataFrame exports of the accumulated state ---
+
+    def get_session_volatility(self):
+        return self.current_session_volatility()
+
+    def get_rolling_volatility(self, window_size=None):
+        """Rolling std of log returns between closes of the finest mid bars."""
+        if not self.mid_bars:
+            return None
+        finest = min(self.mid_bars.values(), key=lambda builder: builder.width)
+        closes = finest.to_dataframe()['close']
+        if closes.empty:
+            return None
+        log_returns = np.log(closes / closes.shift(1)).dropna()
+        return log_returns.rolling(window=window_size or self.window_size).std()
+
+    def get_ohlc_data(self, freq='1min', source='mid'):
+        """OHLC bars of the mid (source='mid') or of trade prices with volume and count (source='trades')."""
+        df = self.bars(freq, source).to_dataframe()
+        if df.empty:
+            return None
+        return df if source == 'trades' else df[['open', 'high', 'low', 'close']]
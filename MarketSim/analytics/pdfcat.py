@@ -0,0 +1,95 @@
+import re
+
+# Just enough PDF to join the single-file documents matplotlib's pdf backend
+# writes (one classic xref table, no object streams, generation 0 only) into
+# one document. Each part keeps its objects, renumbered past the previous
+# parts; its page tree hangs under a new root page tree, and its catalog and
+# info are dropped. Anything outside that subset raises ValueError rather
+# than merging wrongly.
+
+XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+REF = re.compile(rb'(\d+) 0 R\b')
+OBJ_HEADER = re.compile(rb'(\d+) (\d+) obj')
+STREAM = re.compile(rb'>>\s*stream\r?\n')
+
+
+def _objects(data):
+    """{object number: body between 'N 0 obj' and 'endobj'} plus the trailer dictionary."""
+    xref_at = int(data[data.rindex(b'startxref') + len(b'startxref'):].split()[0])
+    if not data.startswith(b'xref', xref_at):
+        raise ValueError("PDF uses an xref stream; only classic xref tables are supported")
+    trailer_at = data.index(b'trailer', xref_at)
+    table = data[xref_at:trailer_at]
+    first = int(table.split()[1])
+    offsets = []
+    for i, (offset, generation, kind) in enumerate(XREF_ENTRY.findall(table)):
+        if kind == b'n':
+            if int(generation) != 0:
+                raise ValueError(f"PDF object {first + i} has generation {int(generation)}; only 0 is supported")
+            offsets.append((int(offset), first + i))
+    offsets.sort()
+    objects = {}
+    for i, (offset, number) in enumerate(offsets):
+        end = offsets[i + 1][0] if i + 1 < len(offsets) else xref_at
+        chunk = data[offset:end]
+        header = OBJ_HEADER.match(chunk)
+        if header is None or int(header.group(1)) != number or int(header.group(2)) != 0:
+            raise ValueError(f"Object {number} is not at its xref offset")
+        objects[number] = chunk[header.end():chunk.rindex(b'endobj')]
+    return objects, data[trailer_at:]
+
+
+def _ref(dictionary, key):
+    return int(re.search(rb'/' + key + rb' (\d+) 0 R', dictionary).group(1))
+
+
+def _renumber(body, base):
+    # Only the dictionary before a stream can hold references; stream data is left alone
+    stream = STREAM.search(body)
+    split = stream.end() if stream is not None else len(body)
+    head, tail = body[:split], body[split:]
+    return REF.sub(lambda m: b'%d 0 R' % (int(m.group(1)) + base), head) + tail
+
+
+def concat_pdfs(parts):
+    """One PDF document holding the pages of every PDF in `parts` (bytes), in order."""
+    parsed = []
+    base = 0
+    for data in parts:
+        part, trailer = _objects(data)
+        catalog = _ref(trailer, b'Root')
+        if re.search(rb'/(Outlines|Names|AcroForm)\b', part[catalog]):
+            raise ValueError("PDF catalog holds outlines, names or forms, which merging would drop")
+        info = re.search(rb'/Info (\d+) 0 R', trailer)
+        parsed.append((part, base, catalog, _ref(part[catalog], b'Pages'), info and int(info.group(1))))
+        base += max(part) + 1
+    root_pages, root = base, base + 1
+
+    out = bytearray(b'%PDF-1.4\n%\xac\xdc \xab\xba\n')
+    offsets = {}
+    kids = []
+    count = 0
+    for part, base, catalog, pages, info in parsed:
+        kids.append(b'%d 0 R' % (pages + base))
+        count += int(re.search(rb'/Count (\d+)', part[pages]).group(1))
+        for number, body in part.items():
+            if number == catalog or number == info:
+                continue
+            body = _renumber(body, base)
+            if number == pages:
+                body = body.replace(b'/Type /Pages', b'/Type /Pages /Parent %d 0 R' % root_pages, 1)
+            offsets[number + base] = len(out)
+            out += b'%d 0 obj' % (number + base) + body + b'endobj\n'
+    offsets[root_pages] = len(out)
+    out += b'%d 0 obj\n<< /Type /Pages /Kids [ %s ] /Count %d >>\nendobj\n' % (root_pages, b' '.join(kids), count)
+    offsets[root] = len(out)
+    out += b'%d 0 obj\n<< /Type /Catalog /Pages %d 0 R >>\nendobj\n' % (root, root_pages)
+
+    xref_at = len(out)
+    size = root + 1
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % size
+    for number in range(1, size):
+        offset = offsets.get(number)
+        out += b'%010d 00000 n \n' % offset if offset is not None else b'0000000000 65535 f \n'
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, root, xref_at)
+    return bytes(out)
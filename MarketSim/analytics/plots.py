@@ -1,77 +1,216 @@
-import pandas as pd
-import mplfinance as mpf
-import matplotlib.pyplot as plt
-from .metrics import MarketMetrics
-
-class MarketPlots:
-    def __init__(self, recorder, tape):
-        self.recorder = recorder
-        self.tape = tape
-
-    def generate_scenario_report(self, pdf, scenario_name):
-        print(f"Generating report for: {scenario_name}...")
-        
-        df_l1 = self.recorder.get_l1_dataframe()
-        
-        if df_l1.empty:
-            print(f"Warning: No data found for {scenario_name}.")
-            return
-
-        # Skip warmup noise
-        if len(df_l1) > 100:
-            df_l1 = df_l1.iloc[50:]
-        
-        try:
-            duration = (df_l1.index[-1] - df_l1.index[0]).total_seconds()
-            freq = '30s' if duration > 600 else '1s'
-            ohlc = df_l1['mid_price'].resample(freq).ohlc().dropna()
-        except Exception as e:
-            print(f"Resampling error: {e}")
-            return
-
-        if ohlc.empty:
-            return
-
-        avg_spread = df_l1['spread'].mean()
-        returns = df_l1['mid_price'].pct_change().dropna()
-        volatility = returns.std() * (len(df_l1)**0.5) if not returns.empty else 0.0
-
-        fig = plt.figure(figsize=(11, 8.5))
-        gs = fig.add_gridspec(3, 1, height_ratios=[0.15, 2, 1], hspace=0.35)
-        
-        # Header
-        ax_header = fig.add_subplot(gs[0])
-        ax_header.axis('off')
-        ax_header.text(0.5, 0.75, f"{scenario_name}", ha='center', va='center', fontsize=16, fontweight='bold', color='#333')
-        ax_header.text(0.5, 0.25, f"Avg Spread: ${avg_spread:.4f}  |  Realized Vol: {volatility:.4f}", 
-                       ha='center', va='center', fontsize=12, color='#555')
-
-        # Candle Chart
-        ax1 = fig.add_subplot(gs[1])
-        mc = mpf.make_marketcolors(up='#00b060', down='#fe3032', edge='inherit', wick='inherit', volume='in')
-        s = mpf.make_mpf_style(marketcolors=mc, gridstyle=':', gridcolor='#d9d9d9', y_on_right=True)
-        
-        mpf.plot(ohlc, type='candle', ax=ax1, style=s, 
-                 warn_too_much_data=10000,
-                 ylabel='Price ($)',
-                 axtitle=f'Mid-Price Dynamics ({freq} Candles)')
-
-        # Spread Chart
-        ax2 = fig.add_subplot(gs[2], sharex=ax1)
-        ax2.plot(df_l1.index, df_l1['spread'], color='#ff7f0e', linewidth=1.0, label='Spread')
-        ax2.fill_between(df_l1.index, df_l1['spread'], color='#ff7f0e', alpha=0.2)
-        
-        # Robust Scaling: Ignore outliers, but ensure minimum view
-        robust_max = df_l1['spread'].quantile(0.95)
-        view_limit = max(0.10, robust_max * 1.5)
-        
-        ax2.set_ylim(0, view_limit)
-        ax2.set_title("Bid-Ask Spread Stress (Robust)", fontsize=10, fontweight='bold', loc='left')
-        ax2.set_ylabel("Spread ($)")
-        ax2.grid(True, linestyle=':', alpha=0.6)
-        
-        fig.autofmt_xdate()
-
-        pdf.savefig(fig)
-        plt.close(fig)
-        print(f"Successfully saved page for {scenario_name}")
+import io
+import logging
+import numpy as np
+import pandas as pd
+import mplfinance as mpf
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from .metrics import MarketMetrics
+from .pdfcat import concat_pdfs
+
+logger = logging.getLogger(__name__)
+
+FIGSIZE = (11, 8.5)
+DPI = 100
+
+
+def minmax_indices(x, y, width):
+    """Indices of the lowest and highest finite `y` in each of `width` equal slices of `x`, in order.
+
+    Drawn as a line, the result covers the same pixels as the full series at
+    that width.
+    """
+    keep = np.flatnonzero(np.isfinite(y))
+    if len(keep) <= 2 * width:
+        return keep
+    xs, ys = x[keep], y[keep]
+    span = xs[-1] - xs[0]
+    if span > 0:
+        buckets = np.minimum(((xs - xs[0]) * (width / span)).astype(np.int64), width - 1)
+    else:
+        buckets = np.zeros(len(xs), dtype=np.int64)
+    order = np.lexsort((ys, buckets))   # by bucket, then by value
+    firsts = np.flatnonzero(np.diff(buckets[order], prepend=-1))
+    lasts = np.append(firsts[1:], len(order)) - 1
+    return keep[np.unique(np.concatenate((order[firsts], order[lasts])))]
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of `n_out` finite points picked by Largest-Triangle-Three-Buckets."""
+    keep = np.flatnonzero(np.isfinite(y))
+    n = len(keep)
+    if n_out >= n or n_out < 3:
+        return keep
+    xs, ys = x[keep].astype(np.float64), y[keep]
+    # n_out - 2 buckets between the fixed first and last points; `edges` adds the last point as a final bucket
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx = xs[hi:edges[i + 2]].mean()
+        cy = ys[hi:edges[i + 2]].mean()
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return keep[picked]
+
+
+DECIMATORS = {
+    'minmax': lambda x, y, width: minmax_indices(x, y, width),
+    'lttb': lambda x, y, width: lttb_indices(x, y, 2 * width),
+}
+
+
+class MarketPlots:
+    """One report page per scenario: a header, mid-price candles and the spread.
+
+    By default every L1 point is drawn, as recorded. With `decimate` ('minmax'
+    or 'lttb') the spread series is reduced to about `width` pixel columns
+    (default: the page width at 100 dpi) and, when `metrics` (the run's
+    MarketMetrics) is given, the candles come from its streamed bars instead of
+    a resample of the L1 history.
+    """
+
+    def __init__(self, recorder, tape, metrics: MarketMetrics = None, decimate=None, width=None):
+        if decimate is not None and decimate not in DECIMATORS:
+            raise ValueError(f"Unknown decimation '{decimate}', expected one of {list(DECIMATORS)}")
+        self.recorder = recorder
+        self.tape = tape
+        self.metrics = metrics
+        self.decimate = decimate
+        self.width = width or int(FIGSIZE[0] * DPI)
+
+    def generate_scenario_report(self, pdf, scenario_name):
+        logger.info("Generating report for: %s...", scenario_name)
+        fig = self.build_figure(scenario_name)
+        if fig is None:
+            return
+        pdf.savefig(fig)
+        plt.close(fig)
+        logger.info("Successfully saved page for %s", scenario_name)
+
+    def _ohlc(self, df_l1, freq):
+        if self.metrics is not None:
+            try:
+                bars = self.metrics.get_ohlc_data(freq)
+            except KeyError:
+                bars = None
+            if bars is not None:
+                # Streamed bars cover the warmup too; start at the first bar of the plotted window
+                return bars[bars.index >= df_l1.index[0].floor(freq)]
+        return df_l1['mid_price'].resample(freq).ohlc().dropna()
+
+    def _coarsen(self, ohlc, freq):
+        # Keep candles at least ~3 pixels wide by merging neighbours
+        factor = -(-len(ohlc) * 3 // self.width)
+        if factor <= 1:
+            return ohlc, freq
+        freq = pd.Timedelta(freq) * factor
+        ohlc = ohlc.resample(freq).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'}).dropna()
+        return ohlc, f"{int(freq.total_seconds())}s"
+
+    def build_figure(self, scenario_name):
+        """The report page as a Figure, or None when there is nothing to plot."""
+        df_l1 = self.recorder.get_l1_dataframe()
+
+        if df_l1.empty:
+            logger.warning("No data found for %s.", scenario_name)
+            return None
+
+        # Skip warmup noise
+        if len(df_l1) > 100:
+            df_l1 = df_l1.iloc[50:]
+
+        try:
+            duration = (df_l1.index[-1] - df_l1.index[0]).total_seconds()
+            freq = '30s' if duration > 600 else '1s'
+            ohlc = self._ohlc(df_l1, freq)
+        except Exception as e:
+            logger.warning("Resampling error: %s", e)
+            return None
+
+        if ohlc.empty:
+            return None
+
+        avg_spread = df_l1['spread'].mean()
+        returns = df_l1['mid_price'].pct_change().dropna()
+        volatility = returns.std() * (len(df_l1)**0.5) if not returns.empty else 0.0
+
+        spread = df_l1['spread']
+        if self.decimate is not None:
+            ohlc, freq = self._coarsen(ohlc, freq)
+            picked = DECIMATORS[self.decimate](df_l1['timestamp'].to_numpy(), spread.to_numpy(), self.width)
+            spread = spread.iloc[picked]
+
+        fig = plt.figure(figsize=FIGSIZE)
+        gs = fig.add_gridspec(3, 1, height_ratios=[0.15, 2, 1], hspace=0.35)
+
+        # Header
+        ax_header = fig.add_subplot(gs[0])
+        ax_header.axis('off')
+        ax_header.text(0.5, 0.75, f"{scenario_name}", ha='center', va='center', fontsize=16, fontweight='bold', color='#333')
+        ax_header.text(0.5, 0.25, f"Avg Spread: ${avg_spread:.4f}  |  Realized Vol: {volatility:.4f}",
+                       ha='center', va='center', fontsize=12, color='#555')
+
+        # Candle Chart
+        ax1 = fig.add_subplot(gs[1])
+        mc = mpf.make_marketcolors(up='#00b060', down='#fe3032', edge='inherit', wick='inherit', volume='in')
+        s = mpf.make_mpf_style(marketcolors=mc, gridstyle=':', gridcolor='#d9d9d9', y_on_right=True)
+
+        # The decimated page puts candles on the date axis so they line up with the spread below
+        mpf.plot(ohlc, type='candle', ax=ax1, style=s,
+                 warn_too_much_data=10000,
+                 show_nontrading=self.decimate is not None,
+                 ylabel='Price ($)',
+                 axtitle=f'Mid-Price Dynamics ({freq} Candles)')
+
+        # Spread Chart
+        ax2 = fig.add_subplot(gs[2], sharex=ax1)
+        ax2.plot(spread.index, spread, color='#ff7f0e', linewidth=1.0, label='Spread')
+        ax2.fill_between(spread.index, spread, color='#ff7f0e', alpha=0.2)
+
+        # Robust Scaling: Ignore outliers, but ensure minimum view
+        robust_max = df_l1['spread'].quantile(0.95)
+        view_limit = max(0.10, robust_max * 1.5)
+
+        ax2.set_ylim(0, view_limit)
+        ax2.set_title("Bid-Ask Spread Stress (Robust)", fontsize=10, fontweight='bold', loc='left')
+        ax2.set_ylabel("Spread ($)")
+        ax2.grid(True, linestyle=':', alpha=0.6)
+
+        fig.autofmt_xdate()
+        return fig
+
+
+def _render_page(result, decimate, width):
+    # Drawing happens here, in the worker; only the finished page's PDF bytes go back
+    plotter = MarketPlots(result, result.tape, metrics=result.metrics, decimate=decimate, width=width)
+    fig = plotter.build_figure(result.name)
+    if fig is None:
+        return None
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='pdf')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def write_report(path, results, workers=None, decimate='minmax', width=None):
+    """Write one page per ScenarioResult to the PDF at `path`, in order.
+
+    Pages are drawn and rendered to single-page PDFs in a process pool
+    (workers=1 renders them here); the parent only concatenates them.
+    """
+    args = [(result, decimate, width) for result in results]
+    if workers == 1 or len(args) <= 1:
+        pages = [_render_page(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pages = list(pool.map(_render_page, *zip(*args)))
+
+    for result, page in zip(results, pages):
+        if page is None:
+            logger.warning("No report page for %s.", result.name)
+    with open(path, 'wb') as f:
+        f.write(concat_pdfs([page for page in pages if page is not None]))
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from engine.tape import TradeTape
+
+L1_COLUMNS = ['timestamp', 'best_bid', 'best_ask', 'mid_price', 'spread']
+
+
+class ScenarioResult:
+    """Compact, picklable outcome of one scenario run.
+
+    Holds the recorded L1 series and the trade tape as NumPy columns plus final
+    per-agent positions and PnL, so a worker process can ship it back cheaply
+    and the parent can build the report without the engine or agents.
+    """
+
+    def __init__(self, name, config, l1, trades, participants, agents, l2=None):
+        self.name = name
+        self.config = config
+        # column -> float array, as SnapshotRecorder records it: an empty side reads best_bid 0.0 /
+        # best_ask inf, and mid_price / spread then hold the engine's last values
+        self.l1 = l1
+        self.trades = trades              # TradeTape column -> array
+        self.participants = participants  # agent ids indexed by the tape's buyer/seller codes
+        self.agents = agents              # 'agent_id' list plus per-agent position/cash/realized_pnl/pnl
+        self.l2 = l2                      # SnapshotRecorder.get_l2_arrays() columns, when collected
+        self.stats = None                 # SimulationStats.snapshot() when the run was profiled
+        self.metrics = None               # MarketMetrics streamed during the run, when available
+
+    @classmethod
+    def collect(cls, name, config, recorder, tape, ledger):
+        l1 = recorder.get_l1_arrays()
+        trades = {column: values.copy() for column, values in tape.columns().items()}
+
+        n = len(ledger)
+        last_mid = l1['mid_price'][-1] if len(l1['mid_price']) else np.nan
+        agents = {
+            'agent_id': list(ledger.agent_ids),
+            'position': ledger.position[:n].copy(),
+            'cash': ledger.cash[:n].copy(),
+            'realized_pnl': ledger.realized_pnl[:n].copy(),
+            'pnl': ledger.realized_pnl[:n] + ledger.unrealized_pnl(last_mid)
+        }
+        return cls(name, config, l1, trades, list(tape.participants), agents, l2=recorder.get_l2_arrays())
+
+    def get_l1_dataframe(self):
+        # Same layout as SnapshotRecorder.get_l1_dataframe, so MarketPlots can render either
+        df = pd.DataFrame({column: self.l1[column] for column in L1_COLUMNS[1:] + L1_COLUMNS[:1]})
+        if not df.empty:
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+            df.set_index('datetime', inplace=True)
+        return df
+
+    @property
+    def tape(self):
+        return TradeTape.from_columns(self.trades, self.participants)
+
+    def agent_dataframe(self):
+        return pd.DataFrame(self.agents).set_index('agent_id')
+
+    def equals(self, other):
+        """True when both runs produced bit-identical series, trades and agent state."""
+        def same(a, b):
+            return a.keys() == b.keys() and all(np.array_equal(a[k], b[k], equal_nan=True) if isinstance(a[k], np.ndarray)
+                                                else a[k] == b[k] for k in a)
+        return (same(self.l1, other.l1) and same(self.trades, other.trades)
+                and self.participants == other.participants and same(self.agents, other.agents)
+                and (self.l2 is None or other.l2 is None or same(self.l2, other.l2)))
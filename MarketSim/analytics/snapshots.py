@@ -1,42 +1,209 @@
-import pandas as pd
-import heapq
-from engine.matching_engine import MatchingEngine
-
-class SnapshotRecorder:
-    def __init__(self):
-        self.l1_snapshots = []
-        self.l2_snapshots = []
-
-    def record_snapshot(self, engine: MatchingEngine, timestamp):
-        l1_data = engine.get_snapshot()
-        l1_data['timestamp'] = timestamp
-        self.l1_snapshots.append(l1_data)
-
-        depth = 5
-        
-        best_bids = heapq.nsmallest(depth, engine.bids)
-        best_asks = heapq.nsmallest(depth, engine.asks)
-        
-        bids_l2 = [(-p, o.qty) for p, t, o in best_bids]
-        asks_l2 = [(p, o.qty) for p, t, o in best_asks]
-
-        self.l2_snapshots.append({
-            'timestamp': timestamp,
-            'bids': bids_l2,
-            'asks': asks_l2
-        })
-
-        return l1_data['mid_price'], l1_data['spread'], self.l1_snapshots[-1], self.l2_snapshots[-1]
-
-    def get_l1_dataframe(self):
-        df = pd.DataFrame(self.l1_snapshots)
-        if not df.empty and 'timestamp' in df.columns:
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
-            df.set_index('datetime', inplace=True)
-        return df
-    
-    def get_l2_dataframe(self):
-        df = pd.DataFrame(self.l2_snapshots)
-        if not df.empty and 'timestamp' in df.columns:
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
-        return df
+import os
+import pandas as pd
+import numpy as np
+from engine.matching_engine import MatchingEngine
+
+L1_COLUMNS = ('timestamp', 'best_bid', 'best_ask', 'mid_price', 'spread')
+L2_COLUMNS = ('l2_ticks', 'l2_qty', 'l2_orders', 'l2_levels')
+
+
+class SnapshotRecorder:
+    """Book history in fixed-size NumPy chunks of `capacity` rows.
+
+    Each record_snapshot() writes one row: the L1 columns (timestamp, best bid
+    and ask, mid, spread) and the top `depth` L2 levels as [row, side, level]
+    arrays, side 0 = bids and 1 = asks. A full chunk is either kept in memory
+    or, with `spill_dir`, saved there as one .npy file per column, after which
+    its buffer is reused. Readers see one continuous history: spilled chunks are
+    memory-mapped on demand, and time-range queries only touch chunks that
+    overlap the range.
+    """
+
+    def __init__(self, depth=5, capacity=4096, spill_dir=None):
+        self.depth = depth
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.grid = None
+        self.count = 0          # rows recorded in total
+        self.row = 0            # rows in the open chunk
+        self.chunks = []        # completed chunks: {column: array} in memory or {column: .npy path} when spilled
+        self.chunk_times = []   # (first, last) timestamp of each completed chunk
+        self._allocate()
+
+    def _allocate(self):
+        n, depth = self.capacity, self.depth
+        self.buffer = {name: np.zeros(n) for name in L1_COLUMNS}
+        self.buffer['l2_ticks'] = np.zeros((n, 2, depth), dtype=np.int64)
+        self.buffer['l2_qty'] = np.zeros((n, 2, depth), dtype=np.int64)
+        self.buffer['l2_orders'] = np.zeros((n, 2, depth), dtype=np.int64)
+        self.buffer['l2_levels'] = np.zeros((n, 2), dtype=np.int64)
+
+    def record_snapshot(self, engine: MatchingEngine, timestamp):
+        """Record L1 and L2 state; returns mid, spread and the row's index in the history."""
+        snap = engine.get_snapshot()
+        buffer, i = self.buffer, self.row
+        buffer['timestamp'][i] = timestamp
+        buffer['best_bid'][i] = snap.best_bid
+        buffer['best_ask'][i] = snap.best_ask
+        buffer['mid_price'][i] = snap.mid_price
+        buffer['spread'][i] = snap.spread
+        buffer['l2_levels'][i] = engine.copy_depth(self.depth, buffer['l2_ticks'][i], buffer['l2_qty'][i],
+                                                   buffer['l2_orders'][i])
+        self.grid = engine.grid
+        self.row += 1
+        self.count += 1
+        if self.row == self.capacity:
+            self._close_chunk()
+        return snap.mid_price, snap.spread, self.count - 1
+
+    def _close_chunk(self):
+        buffer = self.buffer
+        self.chunk_times.append((buffer['timestamp'][0], buffer['timestamp'][self.row - 1]))
+        if self.spill_dir is None:
+            self.chunks.append(buffer)
+            self._allocate()
+        else:
+            paths = {}
+            for name, values in buffer.items():
+                paths[name] = os.path.join(self.spill_dir, f"chunk{len(self.chunks):06d}_{name}.npy")
+                np.save(paths[name], values)
+            self.chunks.append(paths)
+        self.row = 0
+
+    def __len__(self):
+        return self.count
+
+    def _chunk(self, k):
+        chunk = self.chunks[k]
+        if self.spill_dir is None:
+            return chunk
+        return {name: np.load(path, mmap_mode='r') for name, path in chunk.items()}
+
+    def iter_chunks(self, start=None, stop=None, columns=None):
+        """Yield {column: array} per chunk, oldest first, trimmed to timestamps in [start, stop].
+
+        Spilled chunks come back as read-only memory maps; the open chunk as views
+        that the next record_snapshot() may overwrite.
+        """
+        columns = list(columns) if columns is not None else list(L1_COLUMNS + L2_COLUMNS)
+        bounds = self.chunk_times + ([(self.buffer['timestamp'][0], self.buffer['timestamp'][self.row - 1])]
+                                     if self.row else [])
+        for k, (first, last) in enumerate(bounds):
+            if (start is not None and last < start) or (stop is not None and first > stop):
+                continue
+            if k < len(self.chunks):
+                chunk, rows = self._chunk(k), self.capacity
+            else:
+                chunk, rows = self.buffer, self.row
+            timestamps = chunk['timestamp'][:rows]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = rows if stop is None else int(np.searchsorted(timestamps, stop, side='right'))
+            yield {name: chunk[name][lo:hi] for name in columns}
+
+    def _concat(self, columns, start=None, stop=None):
+        parts = list(self.iter_chunks(start, stop, columns))
+        if not parts:
+            return {name: self.buffer[name][:0].copy() for name in columns}
+        return {name: np.concatenate([part[name] for part in parts]) for name in columns}
+
+    def _rows(self, first_row):
+        # Raw columns of every row from absolute index `first_row` on
+        parts = []
+        for k in range(first_row // self.capacity, len(self.chunks) + 1):
+            if k < len(self.chunks):
+                chunk, rows = self._chunk(k), self.capacity
+            else:
+                chunk, rows = self.buffer, self.row
+            lo = max(0, first_row - k * self.capacity)
+            parts.append({name: np.array(values[lo:rows]) for name, values in chunk.items()})
+        return {name: np.concatenate([part[name] for part in parts]) for name in self.buffer}
+
+    def _extend(self, rows):
+        # Append raw rows chunk by chunk, as if each had been recorded
+        n = len(rows['timestamp'])
+        done = 0
+        while done < n:
+            take = min(n - done, self.capacity - self.row)
+            for name, values in self.buffer.items():
+                values[self.row:self.row + take] = rows[name][done:done + take]
+            self.row += take
+            self.count += take
+            done += take
+            if self.row == self.capacity:
+                self._close_chunk()
+
+    @property
+    def l1_snapshots(self):
+        """The L1 history as one dict per row (for older callers; prefer get_l1_arrays())."""
+        arrays = self.get_l1_arrays()
+        names = L1_COLUMNS[1:] + L1_COLUMNS[:1]
+        return [dict(zip(names, row)) for row in zip(*(arrays[name].tolist() for name in names))]
+
+    # Checkpointing (see engine.checkpoint): history only grows, so each checkpoint
+    # stores the rows recorded since the previous one.
+    def checkpoint_marker(self):
+        return self.count
+
+    def checkpoint_delta(self, marker):
+        delta = {
+            'depth': self.depth,
+            'capacity': self.capacity,
+            'spill_dir': self.spill_dir,
+            'grid': self.grid,
+            'rows': self._rows(marker or 0)
+        }
+        return delta, self.checkpoint_marker()
+
+    @classmethod
+    def restore_checkpoint(cls, deltas):
+        last = deltas[-1]
+        recorder = cls(depth=last['depth'], capacity=last['capacity'], spill_dir=last['spill_dir'])
+        recorder.grid = last['grid']
+        for d in deltas:
+            recorder._extend(d['rows'])
+        return recorder
+
+    def get_l1_arrays(self, start=None, stop=None):
+        """L1 columns for rows with timestamps in [start, stop] (default: everything)."""
+        return self._concat(L1_COLUMNS, start, stop)
+
+    def get_l1_dataframe(self, start=None, stop=None):
+        arrays = self.get_l1_arrays(start, stop)
+        df = pd.DataFrame({name: arrays[name] for name in L1_COLUMNS[1:] + L1_COLUMNS[:1]})
+        if not df.empty:
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+            df.set_index('datetime', inplace=True)
+        return df
+
+    def get_l2_arrays(self, start=None, stop=None):
+        """Recorded L2 history as arrays indexed [row, side, level]; empty levels hold NaN prices."""
+        arrays = self._concat(('timestamp',) + L2_COLUMNS, start, stop)
+        levels = arrays['l2_levels']
+        present = np.arange(self.depth) < levels[:, :, None]
+        tick_size = self.grid.tick_size if self.grid is not None else 0.0
+        decimals = self.grid.decimals if self.grid is not None else 0
+        price = np.where(present, np.round(arrays['l2_ticks'] * tick_size, decimals), np.nan)
+        return {
+            'timestamp': arrays['timestamp'],
+            'price': price,
+            'qty': arrays['l2_qty'],
+            'orders': arrays['l2_orders'],
+            'levels': levels
+        }
+
+    def get_l2_dataframe(self, start=None, stop=None):
+        arrays = self.get_l2_arrays(start, stop)
+        price, qty, levels = arrays['price'].tolist(), arrays['qty'].tolist(), arrays['levels'].tolist()
+        rows = []
+        for i, timestamp in enumerate(arrays['timestamp'].tolist()):
+            rows.append({
+                'timestamp': timestamp,
+                'bids': list(zip(price[i][0][:levels[i][0]], qty[i][0][:levels[i][0]])),
+                'asks': list(zip(price[i][1][:levels[i][1]], qty[i][1][:levels[i][1]]))
+            })
+        df = pd.DataFrame(rows)
+        if not df.empty and 'timestamp' in df.columns:
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+        return df
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Tables a ScenarioResult is split into; all but 'agents' are partitioned by time
+TABLES = ('l1', 'l2', 'trades', 'agents')
+TIMED_TABLES = ('l1', 'l2', 'trades')
+
+
+def config_key(config):
+    """Short stable hash of a run config, seed excluded, so seeds of one configuration share a key."""
+    settings = {key: value for key, value in config.items() if key != 'seed'}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+class ResultStore:
+    """Directory of scenario results, partitioned by config, seed, table and time.
+
+    Layout: <root>/<config key>/seed=<seed>/<table>/<t0>/<column>.npy, where
+    each time partition covers `partition_seconds` of simulated time, plus
+    <root>/index.json listing every run (config, seed, participants) and
+    partition (table, time span, rows, columns). Queries filter runs on the
+    index and open only the partitions and columns they need, as read-only
+    memory maps. An existing store keeps the partition width it was created
+    with. One process should write to a store at a time.
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, root, partition_seconds=600.0):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, self.INDEX)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {'partition_seconds': partition_seconds, 'runs': {}, 'partitions': []}
+        self.partition_seconds = self.index['partition_seconds']
+
+    def _save_index(self):
+        path = os.path.join(self.root, self.INDEX)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.index, f)
+        os.replace(path + '.tmp', path)
+
+    def write(self, result):
+        """Persist a ScenarioResult; returns its run id. Writing a run again replaces it."""
+        config = result.config
+        seed = config.get('seed')
+        run_id = f"{config_key(config)}-{seed}"
+        path = os.path.join(config_key(config), f"seed={seed}")
+        self.index['partitions'] = [p for p in self.index['partitions'] if p['run'] != run_id]
+        shutil.rmtree(os.path.join(self.root, path), ignore_errors=True)
+        self.index['runs'][run_id] = {
+            'name': result.name,
+            'config': dict(config),
+            'seed': seed,
+            'path': path,
+            'participants': list(result.participants),
+        }
+
+        tables = {'l1': result.l1, 'trades': result.trades,
+                  'agents': {name: np.asarray(values) for name, values in result.agents.items()}}
+        if result.l2 is not None:
+            tables['l2'] = result.l2
+        for table, columns in tables.items():
+            self._write_table(run_id, table, columns)
+        self._save_index()
+        return run_id
+
+    def _write_table(self, run_id, table, columns):
+        base = os.path.join(self.root, self.index['runs'][run_id]['path'], table)
+        if table in TIMED_TABLES and len(columns['timestamp']):
+            keys = np.floor(columns['timestamp'] / self.partition_seconds).astype(np.int64)
+            bounds = np.flatnonzero(np.diff(keys)) + 1
+            slices = zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(keys)])))
+        else:
+            slices = [(0, len(next(iter(columns.values()))))]
+
+        for lo, hi in slices:
+            if table in TIMED_TABLES and hi > lo:
+                start = float(np.floor(columns['timestamp'][lo] / self.partition_seconds) * self.partition_seconds)
+                span = [start, start + self.partition_seconds]
+            else:
+                span = None
+            directory = os.path.join(base, 'all' if span is None else f"{span[0]:g}")
+            os.makedirs(directory, exist_ok=True)
+            for name, values in columns.items():
+                np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values[lo:hi]))
+            self.index['partitions'].append({
+                'run': run_id, 'table': table, 'span': span, 'rows': int(hi - lo),
+                'path': os.path.relpath(directory, self.root), 'columns': list(columns)
+            })
+
+    def runs(self, **filters):
+        """Run ids whose config matches every filter (e.g. scenario_name="B", seed=7, mm_count=20)."""
+        matches = []
+        for run_id, run in self.index['runs'].items():
+            config = run['config']
+            if all(config.get(key) == value for key, value in filters.items()):
+                matches.append(run_id)
+        return matches
+
+    def run_info(self, run_id):
+        return self.index['runs'][run_id]
+
+    def partitions(self, table, start=None, stop=None, **filters):
+        """Index entries of `table` for matching runs whose time span overlaps [start, stop]."""
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}', expected one of {TABLES}")
+        runs = set(self.runs(**filters))
+        selected = []
+        for partition in self.index['partitions']:
+            if partition['table'] != table or partition['run'] not in runs:
+                continue
+            span = partition['span']
+            if span is not None and ((start is not None and span[1] <= start) or (stop is not None and span[0] > stop)):
+                continue
+            selected.append(partition)
+        return selected
+
+    def scan(self, table, columns=None, start=None, stop=None, **filters):
+        """Yield (run id, {column: array}) per partition, lazily, as read-only memory maps.
+
+        Only the requested columns of the selected partitions are opened. Rows of
+        timed tables are trimmed to timestamps in [start, stop].
+        """
+        for partition in self.partitions(table, start, stop, **filters):
+            names = list(columns) if columns is not None else partition['columns']
+            directory = os.path.join(self.root, partition['path'])
+            arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in names}
+            if partition['span'] is not None and (start is not None or stop is not None):
+                timestamps = np.load(os.path.join(directory, 'timestamp.npy'), mmap_mode='r')
+                lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+                hi = len(timestamps) if stop is None else int(np.searchsorted(timestamps, stop, side='right'))
+                arrays = {name: values[lo:hi] for name, values in arrays.items()}
+            yield partition['run'], arrays
+
+    def load(self, table, columns=None, start=None, stop=None, **filters):
+        """One DataFrame of the selected rows and columns, with 'run', 'scenario' and 'seed' columns added.
+
+        Multi-dimensional columns (L2 [row, side, level] arrays) can't go in a
+        DataFrame; use scan() for those.
+        """
+        frames = []
+        for run_id, arrays in self.scan(table, columns, start, stop, **filters):
+            run = self.index['runs'][run_id]
+            frame = pd.DataFrame({name: np.asarray(values) for name, values in arrays.items()})
+            frame.insert(0, 'seed', run['seed'])
+            frame.insert(0, 'scenario', run['name'])
+            frame.insert(0, 'run', run_id)
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,326 @@
+"""Performance benchmarks for the engine, event loop, recorders and end-to-end runs.
+
+    python benchmark.py --output bench.json            # run everything, save results
+    python benchmark.py --quick --filter engine        # smaller sizes, matching names only
+    python benchmark.py --compare bench.json           # run again and flag regressions
+
+Every benchmark reports a rate (operations per second, higher is better) as
+the best of `--repeats` timed runs, since on a shared machine the fastest run
+is the one least disturbed by other load. --compare exits with status 1 when
+any rate dropped by more than --threshold.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from engine.matching_engine import MatchingEngine
+from engine.event_loop import EventLoop
+from engine.order import Order
+from analytics.snapshots import SnapshotRecorder
+
+BENCHMARKS = {}
+
+
+def benchmark(name, **params):
+    """Register `func(quick, **params)`; it returns (operations, seconds) for one timed run."""
+    def register(func):
+        BENCHMARKS[name] = (func, params)
+        return func
+    return register
+
+
+def _flow(rng, n, depth, cancel_ratio, tick_size=0.01, mid_ticks=10000):
+    # Limit orders within `depth` ticks either side of a fixed mid, a share of them
+    # marketable; cancels pick a random earlier order (which may have traded already)
+    sides = rng.integers(0, 2, n)
+    offsets = rng.integers(-depth // 10 - 1, depth + 1, n)
+    ticks = np.where(sides == 0, mid_ticks - offsets, mid_ticks + offsets)
+    qty = rng.integers(1, 20, n)
+    is_cancel = rng.random(n) < cancel_ratio
+    targets = (rng.random(n) * np.arange(n)).astype(np.int64)
+    return sides.tolist(), (ticks * tick_size).tolist(), qty.tolist(), is_cancel.tolist(), targets.tolist()
+
+
+def _prefilled_engine(rng, depth):
+    engine = MatchingEngine()
+    for side, offset in ((0, 1), (1, 1)):
+        for level in range(depth):
+            ticks = 10000 - offset - level if side == 0 else 10000 + offset + level
+            engine.submit(side, ticks, int(rng.integers(1, 50)), "LP", 0.0)
+    return engine
+
+
+def _engine_orders(quick, depth, cancel_ratio):
+    n = 20_000 if quick else 100_000
+    rng = np.random.default_rng(1)
+    engine = _prefilled_engine(rng, depth)
+    sides, prices, qty, is_cancel, targets = _flow(rng, n, depth, cancel_ratio)
+    first_id = engine.next_order_id
+    add_order, cancel_order = engine.add_order, engine.cancel_order
+    start = time.perf_counter()
+    for i in range(n):
+        if is_cancel[i]:
+            cancel_order(first_id + targets[i])
+        else:
+            add_order(Order("A", sides[i], qty[i], prices[i], timestamp=float(i)))
+    return n, time.perf_counter() - start
+
+
+def _engine_submit(quick, depth, cancel_ratio):
+    n = 20_000 if quick else 100_000
+    rng = np.random.default_rng(1)
+    engine = _prefilled_engine(rng, depth)
+    sides, prices, qty, is_cancel, targets = _flow(rng, n, depth, cancel_ratio)
+    ticks = [round(p / engine.tick_size) for p in prices]
+    first_id = engine.next_order_id
+    submit, cancel_order = engine.submit, engine.cancel_order
+    start = time.perf_counter()
+    for i in range(n):
+        if is_cancel[i]:
+            cancel_order(first_id + targets[i])
+        else:
+            submit(sides[i], ticks[i], qty[i], "A", float(i))
+    return n, time.perf_counter() - start
+
+
+for _depth in (10, 100, 1000):
+    for _ratio in (0.0, 0.5, 0.9):
+        benchmark(f"engine.add_order[depth={_depth},cancel={_ratio}]", depth=_depth, cancel_ratio=_ratio)(_engine_orders)
+        benchmark(f"engine.submit[depth={_depth},cancel={_ratio}]", depth=_depth, cancel_ratio=_ratio)(_engine_submit)
+
+
+@benchmark("engine.get_snapshot[changed]")
+def _snapshot_changed(quick):
+    # Every call follows a book change, so the snapshot is rebuilt each time
+    n = 20_000 if quick else 100_000
+    engine = _prefilled_engine(np.random.default_rng(1), 100)
+    get_snapshot = engine.get_snapshot
+    invalidate = engine.invalidate_snapshot
+    start = time.perf_counter()
+    for _ in range(n):
+        invalidate()
+        get_snapshot()
+    return n, time.perf_counter() - start
+
+
+@benchmark("engine.get_snapshot[cached]")
+def _snapshot_cached(quick):
+    n = 100_000 if quick else 500_000
+    engine = _prefilled_engine(np.random.default_rng(1), 100)
+    get_snapshot = engine.get_snapshot
+    start = time.perf_counter()
+    for _ in range(n):
+        get_snapshot()
+    return n, time.perf_counter() - start
+
+
+@benchmark("recorder.record_snapshot[depth=5]", depth=5)
+@benchmark("recorder.record_snapshot[depth=20]", depth=20)
+def _record_snapshot(quick, depth):
+    n = 10_000 if quick else 50_000
+    engine = _prefilled_engine(np.random.default_rng(1), 100)
+    recorder = SnapshotRecorder(depth=depth)
+    record = recorder.record_snapshot
+    invalidate = engine.invalidate_snapshot
+    start = time.perf_counter()
+    for i in range(n):
+        invalidate()
+        record(engine, float(i))
+    return n, time.perf_counter() - start
+
+
+def _event_loop(quick, backend, pending):
+    # `pending` timers keep the queue at a steady size; each event reschedules itself
+    n = 100_000 if quick else 500_000
+    loop = EventLoop(backend=backend)
+    rng = np.random.default_rng(1)
+    delays = (rng.exponential(1.0, 4096) * pending / 15).tolist()
+    state = {'count': 0}
+
+    def callback():
+        count = state['count'] = state['count'] + 1
+        loop.schedule(delays[count & 4095], callback)
+
+    for i in range(pending):
+        loop.schedule(delays[i & 4095], callback)
+    start = time.perf_counter()
+    while state['count'] < n:
+        loop.process_next_event()
+    return n, time.perf_counter() - start
+
+
+for _backend in ('heap', 'calendar'):
+    for _pending in (1, 1000, 100_000):
+        benchmark(f"event_loop.dispatch[{_backend},pending={_pending}]",
+                  backend=_backend, pending=_pending)(_event_loop)
+
+
+@benchmark("event_loop.run_until[heap]")
+def _event_loop_run_until(quick):
+    n = 100_000 if quick else 500_000
+    loop = EventLoop()
+    delays = (np.random.default_rng(1).exponential(1.0, n)).tolist()
+    noop = int
+    for delay in delays:
+        loop.schedule(delay, noop)
+    start = time.perf_counter()
+    loop.run_until(float('inf'))
+    return n, time.perf_counter() - start
+
+
+def _scenario(quick, noise_count, mm_count, mom_count, vectorized):
+    # Rate is agent arrivals (decisions) per second of wall time, warmup included
+    from run_simulation import ScenarioRun
+    horizon = 300.0 if quick else 1800.0
+    start = time.perf_counter()
+    run = ScenarioRun("bench", noise_count, mm_count, mom_count, horizon=horizon, vectorized=vectorized)
+    run.run()
+    elapsed = time.perf_counter() - start
+    return run.agent_arrivals(), elapsed
+
+
+for _name, _counts in (("A", (100, 0, 0)), ("B", (80, 20, 0)), ("C", (80, 0, 20))):
+    for _vectorized in (False, True):
+        benchmark(f"scenario.{_name}[{'vectorized' if _vectorized else 'objects'}]",
+                  noise_count=_counts[0], mm_count=_counts[1], mom_count=_counts[2],
+                  vectorized=_vectorized)(_scenario)
+
+
+@benchmark("gym.step")
+def _gym_step(quick):
+    from environment.market_environment import GymTradingEnvironment
+    n = 1000 if quick else 5000
+    env = GymTradingEnvironment()
+    env.reset(seed=0)
+    actions = np.random.default_rng(1).integers(0, 3, n).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        terminated, truncated = env.step(action)[2:4]
+        if terminated or truncated:
+            env.reset()
+    elapsed = time.perf_counter() - start
+    env.close()
+    return n, elapsed
+
+
+@benchmark("gym.reset[fresh]", template_pool=0)
+@benchmark("gym.reset[template]", template_pool=4)
+def _gym_reset(quick, template_pool):
+    from environment.market_environment import GymTradingEnvironment
+    n = 20 if quick else 100
+    env = GymTradingEnvironment(template_pool=template_pool, background_refresh=False)
+    env.reset(seed=0)
+    start = time.perf_counter()
+    for _ in range(n):
+        env.reset()
+    elapsed = time.perf_counter() - start
+    env.close()
+    return n, elapsed
+
+
+@benchmark("universe.run[symbols=32,workers=4]", workers=4)
+@benchmark("universe.run[symbols=32,workers=0]", workers=0)
+def _universe_run(quick, workers):
+    # Rate is symbol-seconds simulated per second of wall time, shard startup included
+    from environment.universe import MarketUniverse
+    from agents.cross_asset import CrossMarketMaker, PairsTrader
+    horizon = 60.0 if quick else 600.0
+    symbols = [f"S{i:02d}" for i in range(32)]
+    agents = ([CrossMarketMaker(f"XMM_{i}", symbols[i::4]) for i in range(4)] +
+              [PairsTrader(f"PAIR_{i}", symbols[2 * i], symbols[2 * i + 1]) for i in range(8)])
+    start = time.perf_counter()
+    with MarketUniverse(symbols, agents, workers=workers, seed=1) as universe:
+        universe.run(horizon)
+    return len(symbols) * horizon, time.perf_counter() - start
+
+
+def run_benchmarks(names=None, quick=False, repeats=3, log=print):
+    """Run the named benchmarks (default: all) and return {name: result dict}."""
+    results = {}
+    for name in names if names is not None else BENCHMARKS:
+        func, params = BENCHMARKS[name]
+        rates = []
+        for _ in range(repeats):
+            ops, seconds = func(quick, **params)
+            rates.append(ops / seconds)
+        results[name] = {'rate': max(rates), 'unit': 'ops/s', 'runs': rates}
+        if log is not None:
+            log(f"{name:55s} {max(rates):14,.0f} ops/s")
+    return results
+
+
+def compare(results, baseline, threshold=0.10):
+    """Rows (name, baseline rate, new rate, ratio, status) for benchmarks in both runs.
+
+    Status is 'regression' when the new rate is more than `threshold` below the
+    baseline, 'improvement' when more than `threshold` above, else 'ok'.
+    """
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['rate'], result['rate']
+        ratio = new / old if old else float('inf')
+        if ratio < 1 - threshold:
+            status = 'regression'
+        elif ratio > 1 + threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, old, new, ratio, status))
+    return rows
+
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative slowdown flagged as a regression")
+    parser.add_argument('--filter', action='append', help="only run benchmarks whose name contains this text")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help="smaller problem sizes")
+    parser.add_argument('--list', action='store_true', help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.filter or any(text in name for text in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = run_benchmarks(names, quick=args.quick, repeats=args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment_info(), 'quick': args.quick, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print("Warning: baseline and this run used different problem sizes (--quick)")
+        rows = compare(results, baseline['results'], args.threshold)
+        print(f"\n{'benchmark':55s} {'baseline':>14s} {'current':>14s} {'ratio':>7s}")
+        for name, old, new, ratio, status in rows:
+            flag = '  <-- REGRESSION' if status == 'regression' else ''
+            print(f"{name:55s} {old:14,.0f} {new:14,.0f} {ratio:7.2f}{flag}")
+        regressions = [row for row in rows if row[4] == 'regression']
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
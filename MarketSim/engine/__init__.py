@@ -1,10 +1,15 @@
-from .order import Order, Trade
-from .matching_engine import MatchingEngine
-from .event_loop import EventLoop
-
-__all__ = [
-    "Order",
-    "Trade",
-    "MatchingEngine",
-    "EventLoop"
+from .order import Order, Trade
+from .matching_engine import MatchingEngine
+from .exchange import Exchange
+from .event_loop import EventLoop
+from .order_book import HeapBook, PriceLevelBook
+
+__all__ = [
+    "Order",
+    "Trade",
+    "MatchingEngine",
+    "Exchange",
+    "EventLoop",
+    "HeapBook",
+    "PriceLevelBook"
     ]
\ No newline at end of file
@@ -0,0 +1,153 @@
+import io
+import os
+import pickle
+import struct
+import zlib
+from .order import Order, FILLED
+
+MAGIC = b'MSCK2\n'
+RECORD_HEADER = struct.Struct('<QI')  # payload length, crc32 of the payload
+# Payloads start with a compression flag (Z / P) and a kind: a full record
+# restores on its own, a delta record on top of the records since the last full one
+FULL, DELTA = b'F', b'D'
+
+
+class _StorePickler(pickle.Pickler):
+    # Append-only stores are written as deltas next to the pickle, not inside it.
+    # So are done orders: once numbered by the engine and filled, cancelled or
+    # rejected an Order never changes again, so each is written once per full cycle
+    def __init__(self, file, stores, frozen):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.store_ids = {id(store): i for i, store in enumerate(stores)}
+        self.frozen = frozen
+        self.new_frozen = []
+
+    def persistent_id(self, obj):
+        pid = self.store_ids.get(id(obj))
+        if pid is not None or obj.__class__ is not Order or obj.status < FILLED or obj.order_id is None:
+            return pid
+        entry = self.frozen.get(id(obj))
+        if entry is None:
+            # Keeping the order pins its id() for the rest of the cycle
+            entry = self.frozen[id(obj)] = (len(self.store_ids) + len(self.frozen), obj)
+            self.new_frozen.append(obj)
+        return entry[0]
+
+
+class _StoreUnpickler(pickle.Unpickler):
+    def __init__(self, file, stores, frozen):
+        super().__init__(file)
+        self.stores = stores
+        self.frozen = frozen
+
+    def persistent_load(self, pid):
+        return self.stores[pid] if pid < len(self.stores) else self.frozen[pid - len(self.stores)]
+
+
+class CheckpointWriter:
+    """Appends checkpoints of a simulation object to one binary file.
+
+    `stores` are the append-only parts of the state (trade tape, snapshot
+    history). Every `full_every`-th checkpoint is a full record: the stores'
+    whole contents, every done order and a pickle of everything else. The
+    checkpoints in between are deltas holding only what the stores and the
+    done orders gained since the previous record (via
+    store.checkpoint_delta(marker)), plus the pickle of the live state, whose
+    size is bounded by the live book rather than the run length. Loading reads
+    from the last full record on. Records are length-prefixed and CRC-checked,
+    so a crash mid-write only loses the last checkpoint. Stores must provide a
+    restore_checkpoint(deltas) classmethod.
+    """
+
+    def __init__(self, path, stores, compress=True, resume=False, full_every=4):
+        self.path = path
+        self.stores = list(stores)
+        self.compress = compress
+        self.full_every = full_every
+        self.count = 0
+        if resume and os.path.exists(path):
+            # Drop a torn trailing record and continue after the last good one
+            self.count, valid_length = _scan(path)[1:]
+            with open(path, 'r+b') as f:
+                f.truncate(valid_length)
+        else:
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+        # The first record written, fresh or resumed, is a full one
+        self.until_full = 0
+        self.markers = [None] * len(self.stores)
+        self.frozen = {}
+
+    def write(self, state):
+        full = self.until_full == 0
+        if full:
+            self.until_full = self.full_every
+            self.markers = [None] * len(self.stores)
+            self.frozen = {}
+        self.until_full -= 1
+
+        deltas = []
+        for i, store in enumerate(self.stores):
+            delta, self.markers[i] = store.checkpoint_delta(self.markers[i])
+            deltas.append(delta)
+
+        core = io.BytesIO()
+        pickler = _StorePickler(core, self.stores, self.frozen)
+        pickler.dump(state)
+        payload = pickle.dumps({'index': self.count, 'deltas': deltas, 'frozen': pickler.new_frozen,
+                                'core': core.getvalue()}, protocol=pickle.HIGHEST_PROTOCOL)
+        kind = FULL if full else DELTA
+        if self.compress:
+            payload = b'Z' + kind + zlib.compress(payload, 1)
+        else:
+            payload = b'P' + kind + payload
+
+        with open(self.path, 'ab') as f:
+            f.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.count += 1
+        return len(payload) + RECORD_HEADER.size
+
+
+def _decode(payload):
+    body = payload[2:]
+    return pickle.loads(zlib.decompress(body) if payload[:1] == b'Z' else body)
+
+
+def _scan(path):
+    """Every intact record in `path`, the number of them and the byte length they span."""
+    records = []
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a MarketSim checkpoint file")
+        valid_length = len(MAGIC)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            records.append(payload)
+            valid_length += RECORD_HEADER.size + length
+    return records, len(records), valid_length
+
+
+def load_checkpoint(path, store_types):
+    """Rebuild the state saved by the last intact checkpoint in `path`.
+
+    `store_types` lists the classes of the writer's stores, in the same order.
+    Only the last full record and the deltas after it are decoded.
+    """
+    payloads = _scan(path)[0]
+    full = [i for i, payload in enumerate(payloads) if payload[1:2] == FULL]
+    if not full:
+        raise ValueError(f"{path} holds no complete checkpoint")
+    records = [_decode(payload) for payload in payloads[full[-1]:]]
+    stores = [store_type.restore_checkpoint([record['deltas'][i] for record in records])
+              for i, store_type in enumerate(store_types)]
+    frozen = [order for record in records for order in record['frozen']]
+    return _StoreUnpickler(io.BytesIO(records[-1]['core']), stores, frozen).load()
@@ -1,37 +1,274 @@
-import heapq
-
-class EventLoop:
-    def __init__(self):
-        self.current_time = 0.0
-        self.event_queue = []
-        self.sequence_counter = 0
-
-    def schedule(self, delay, callback,priority=1):
-        target_time = self.current_time + delay
-        self.sequence_counter += 1
-        
-        event = (target_time, priority, self.sequence_counter, callback)
-        
-        heapq.heappush(self.event_queue, event)
-    
-    def process_next_event(self):
-        if not self.event_queue:
-            return False
-            
-        timestamp, priority, _, callback = heapq.heappop(self.event_queue)
-        
-        self.current_time = timestamp
-        
-        callback()
-        return True
-
-    def run_until(self, max_time):
-        
-        while self.event_queue:
-            next_time = self.event_queue[0][0]
-            
-            if next_time > max_time:
-                break
-                
-            self.process_next_event()
-        self.current_time = max_time
\ No newline at end of file
+import heapq
+from heapq import heappush, heappop
+
+from .stats import LoopStats
+
+# Events are (time, priority, seq, callback) tuples ordered by (time, priority, seq);
+# seq is unique, so callbacks are never compared. The tuple doubles as the handle
+# returned by schedule(). Cancelling records its seq and the entry is dropped
+# when it reaches the front of the queue, so the hot path stays a bare heappop.
+
+
+class HeapQueue:
+    """Single binary heap over every pending event."""
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        return iter(self.heap)
+
+    def push(self, entry):
+        heappush(self.heap, entry)
+
+    def pop(self):
+        return heappop(self.heap) if self.heap else None
+
+    def peek(self):
+        return self.heap[0] if self.heap else None
+
+
+class CalendarQueue:
+    """Events bucketed by time slices of `bucket_width` seconds.
+
+    Only the bucket being dispatched is kept as a heap; later buckets are plain
+    lists that are appended to in O(1) and heapified once when their slice comes
+    up. With many pending events, such as one arrival timer per agent, each
+    operation costs log(events in one slice) instead of log(all pending events).
+    """
+
+    def __init__(self, bucket_width=1.0):
+        if bucket_width <= 0:
+            raise ValueError(f"bucket_width must be positive, got {bucket_width}")
+        self.bucket_width = bucket_width
+        self.buckets = {}
+        self.keys = []          # heap of keys in `buckets`
+        self.current = []       # heap for the slice being dispatched
+        self.current_key = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        yield from self.current
+        for bucket in self.buckets.values():
+            yield from bucket
+
+    def push(self, entry):
+        self.size += 1
+        key = int(entry[0] // self.bucket_width)
+        if key == self.current_key:
+            heappush(self.current, entry)
+            return
+        if self.current_key is not None and key < self.current_key:
+            # An earlier slice than the one already opened: park the open one again
+            if self.current:
+                self.buckets[self.current_key] = self.current
+                heappush(self.keys, self.current_key)
+            self.current = [entry]
+            self.current_key = key
+            return
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [entry]
+            heappush(self.keys, key)
+        else:
+            bucket.append(entry)
+
+    def _open_next(self):
+        while not self.current:
+            if not self.keys:
+                return False
+            key = heappop(self.keys)
+            self.current = self.buckets.pop(key)
+            self.current_key = key
+            heapq.heapify(self.current)
+        return True
+
+    def pop(self):
+        if not self.current and not self._open_next():
+            return None
+        self.size -= 1
+        return heappop(self.current)
+
+    def peek(self):
+        if not self.current and not self._open_next():
+            return None
+        return self.current[0]
+
+
+EVENT_QUEUES = {
+    'heap': HeapQueue,
+    'calendar': CalendarQueue,
+}
+
+
+class Timer:
+    """Handle for a recurring callback created by EventLoop.schedule_every()."""
+    __slots__ = ('loop', 'interval', 'callback', 'priority', 'entry', 'fire')
+
+    def __init__(self, loop, interval, callback, priority):
+        self.loop = loop
+        self.interval = interval
+        self.callback = callback
+        self.priority = priority
+        self.entry = None
+        self.fire = self._fire  # bound once, re-queued as is on every run
+
+    @property
+    def active(self):
+        return self.entry is not None
+
+    def _fire(self):
+        self.callback()
+        if self.entry is not None:  # the callback may have cancelled the timer
+            self.entry = self.loop.schedule(self.interval, self.fire, self.priority)
+
+    def cancel(self):
+        if self.entry is not None:
+            self.loop.cancel(self.entry)
+            self.entry = None
+
+
+class EventLoop:
+    """Discrete-event scheduler.
+
+    schedule() and schedule_at() return the queued event as a handle for
+    cancel(); schedule_every() returns a Timer that re-queues itself after each
+    run. `backend` picks the queue: 'heap' (default) or 'calendar' (see
+    CalendarQueue), with `bucket_width` for the latter.
+    """
+
+    def __init__(self, backend='heap', bucket_width=1.0):
+        if backend not in EVENT_QUEUES:
+            raise ValueError(f"Unknown event queue '{backend}', expected one of {sorted(EVENT_QUEUES)}")
+        self.current_time = 0.0
+        self.queue = CalendarQueue(bucket_width) if backend == 'calendar' else HeapQueue()
+        # The heap backend is driven with heapq directly on the hot paths
+        self.heap = self.queue.heap if backend == 'heap' else None
+        self.sequence_counter = 0
+        self.cancelled = set()
+        self.stats = None
+
+    def __len__(self):
+        """Queued events, including cancelled ones not yet dropped."""
+        return len(self.queue)
+
+    def schedule(self, delay, callback, priority=1):
+        self.sequence_counter += 1
+        event = (self.current_time + delay, priority, self.sequence_counter, callback)
+        if self.heap is not None:
+            heappush(self.heap, event)
+        else:
+            self.queue.push(event)
+        return event
+
+    def schedule_at(self, target_time, callback, priority=1):
+        self.sequence_counter += 1
+        event = (target_time, priority, self.sequence_counter, callback)
+        self.queue.push(event)
+        return event
+
+    def schedule_every(self, interval, callback, priority=1, delay=None):
+        """Run `callback` every `interval` seconds, first after `delay` (default: one interval)."""
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        timer = Timer(self, interval, callback, priority)
+        timer.entry = self.schedule(interval if delay is None else delay, timer.fire, priority)
+        return timer
+
+    def enable_stats(self):
+        """Start timing callbacks scheduled from now on (see LoopStats)."""
+        if self.stats is None:
+            self.stats = LoopStats(self)
+        return self.stats
+
+    def cancel(self, event):
+        cancelled = self.cancelled
+        cancelled.add(event[2])
+        if len(cancelled) > 2 * len(self.queue) + 64:
+            # Mostly handles of events that already ran: keep only seqs still queued
+            cancelled.intersection_update([entry[2] for entry in self.queue])
+
+    def process_next_event(self):
+        queue, cancelled = self.queue, self.cancelled
+        while True:
+            event = queue.pop()
+            if event is None:
+                return False
+            if cancelled and event[2] in cancelled:
+                cancelled.remove(event[2])
+                continue
+            self.current_time = event[0]
+            event[3]()
+            return True
+
+    def run_until(self, max_time):
+        cancelled = self.cancelled
+        heap = self.heap
+        if heap is not None:
+            while heap and heap[0][0] <= max_time:
+                timestamp, _, seq, callback = heappop(heap)
+                if cancelled and seq in cancelled:
+                    cancelled.remove(seq)
+                    continue
+                self.current_time = timestamp
+                callback()
+        else:
+            queue = self.queue
+            while True:
+                event = queue.peek()
+                if event is None or event[0] > max_time:
+                    break
+                timestamp, _, seq, callback = queue.pop()
+                if cancelled and seq in cancelled:
+                    cancelled.remove(seq)
+                    continue
+                self.current_time = timestamp
+                callback()
+        self.current_time = max_time
+
+    def _pop_due(self, until):
+        batch = []
+        heap = self.heap
+        if heap is not None:
+            while heap and heap[0][0] <= until:
+                batch.append(heappop(heap))
+        else:
+            queue = self.queue
+            event = queue.peek()
+            while event is not None and event[0] <= until:
+                batch.append(queue.pop())
+                event = queue.peek()
+        return batch
+
+    def drain(self, until):
+        """Run every event due at or before `until`, a whole batch per pass.
+
+        Each pass pops everything already due in one go and then runs it in order.
+        Events that callbacks schedule inside the window wait for the next pass,
+        so this suits time-stepped callbacks (recorders, batched agents) rather
+        than chains of short self-rescheduling delays: an event due before the end
+        of the previous pass runs late, at the time that pass reached. Returns the
+        number of callbacks run.
+        """
+        cancelled = self.cancelled
+        dispatched = 0
+        while True:
+            batch = self._pop_due(until)
+            if not batch:
+                break
+            for timestamp, _, seq, callback in batch:
+                if cancelled and seq in cancelled:
+                    cancelled.remove(seq)
+                    continue
+                if timestamp > self.current_time:
+                    self.current_time = timestamp
+                callback()
+                dispatched += 1
+        self.current_time = until
+        return dispatched
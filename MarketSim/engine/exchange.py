@@ -0,0 +1,71 @@
+from functools import partial
+
+from .matching_engine import MatchingEngine
+from .ticks import DEFAULT_TICK_SIZE
+
+
+class Exchange:
+    """Many single-instrument MatchingEngines, one per symbol, behind one interface.
+
+    Books share nothing: every symbol keeps its own engine ids, tape and price
+    ladders, so any subset of symbols can live in another process (see
+    environment.universe) without changing what a book does. Orders and cancels
+    are routed by symbol; fill listeners get the symbol as an extra first argument.
+    """
+
+    def __init__(self, symbols=(), backend=None, tick_size=DEFAULT_TICK_SIZE, long_horizon=False):
+        self.backend = backend
+        self.tick_size = tick_size
+        self.long_horizon = long_horizon
+        self.books = {}
+        self.fill_listeners = []
+        for symbol in symbols:
+            self.list_symbol(symbol)
+
+    def list_symbol(self, symbol, tick_size=None):
+        """Open a book for `symbol` and return its engine."""
+        if symbol in self.books:
+            raise ValueError(f"Symbol '{symbol}' is already listed")
+        tick_size = self.tick_size if tick_size is None else tick_size
+        if self.long_horizon:
+            engine = MatchingEngine.long_horizon(backend=self.backend, tick_size=tick_size)
+        else:
+            engine = MatchingEngine(backend=self.backend, tick_size=tick_size)
+        for listener in self.fill_listeners:
+            engine.add_fill_listener(partial(listener, symbol))
+        self.books[symbol] = engine
+        return engine
+
+    @property
+    def symbols(self):
+        return list(self.books)
+
+    def __getitem__(self, symbol):
+        return self.books[symbol]
+
+    def __contains__(self, symbol):
+        return symbol in self.books
+
+    def __iter__(self):
+        return iter(self.books)
+
+    def __len__(self):
+        return len(self.books)
+
+    def submit(self, symbol, side, ticks, qty, agent_id, timestamp):
+        """MatchingEngine.submit() on `symbol`'s book; returns (order_id, remaining_qty, status code)."""
+        return self.books[symbol].submit(side, ticks, qty, agent_id, timestamp)
+
+    def cancel_order(self, symbol, order_id, timestamp=None):
+        return self.books[symbol].cancel_order(order_id, timestamp)
+
+    def add_fill_listener(self, listener):
+        """Call `listener(symbol, timestamp, price, qty, buyer_id, seller_id, aggressor_side)` on every fill."""
+        self.fill_listeners.append(listener)
+        for symbol, engine in self.books.items():
+            engine.add_fill_listener(partial(listener, symbol))
+
+    def snapshots(self, symbols=None):
+        """{symbol: top of book dict}; copies, since each engine refreshes its BookSnapshot in place."""
+        books = self.books
+        return {symbol: books[symbol].get_snapshot().to_dict() for symbol in (books if symbols is None else symbols)}
@@ -1,129 +1,564 @@
-import heapq
-from .order import Order, Trade
-
-class MatchingEngine:
-    def __init__(self):
-        self.bids = [] 
-        self.asks = [] 
-        self.tape = [] 
-        self.orders = {}
-        self.last_mid = 100.0
-        self.last_spread = 0.05 # Default tight spread
-
-    def add_order(self, order):
-        order.status = 'open'
-        self.orders[order.order_id] = order
-        if order.qty <= 0:
-            return
-
-        if order.side == 'buy':
-            self.match(order, self.asks)
-        else:
-            self.match(order, self.bids)
-
-        if order.qty > 0:
-            if order.order_type == 'market':
-                order.status = 'cancelled' if order.status == 'open' else 'filled'
-                return 
-            
-            if order.side == 'buy':
-                heapq.heappush(self.bids, (-order.price, order.timestamp, order))
-            else:
-                heapq.heappush(self.asks, (order.price, order.timestamp, order))
-
-    def match(self, incoming_order, book):
-        while incoming_order.qty > 0 and len(book) > 0:
-            best_price, best_timestamp, resting_order = book[0]
-            
-            if resting_order.status in ['filled', 'cancelled']:
-                heapq.heappop(book)
-                continue
-
-            if incoming_order.side == 'sell':
-                match_price = -best_price
-            else:
-                match_price = best_price
-
-            if incoming_order.order_type == 'limit':
-                if incoming_order.side == 'buy' and match_price > incoming_order.price:
-                    break 
-                if incoming_order.side == 'sell' and match_price < incoming_order.price:
-                    break 
-
-            executed_qty = min(incoming_order.qty, resting_order.qty)
-            
-            incoming_order.qty -= executed_qty
-            resting_order.qty -= executed_qty
-
-            if incoming_order.qty == 0:
-                incoming_order.status = 'filled'
-            else:
-                incoming_order.status = 'partial'
-            
-            if resting_order.qty == 0:
-                resting_order.status = 'filled'
-                heapq.heappop(book)
-            else:
-                resting_order.status = 'partial'
-            
-            # ATTRIBUTION FIX
-            buyer_id = incoming_order.agent_id if incoming_order.side == 'buy' else resting_order.agent_id
-            seller_id = incoming_order.agent_id if incoming_order.side == 'sell' else resting_order.agent_id
-            
-            new_trade = Trade(
-                timestamp=incoming_order.timestamp,
-                price=match_price,
-                qty=executed_qty,
-                buyer_id=buyer_id,
-                seller_id=seller_id,
-                aggressor_side=incoming_order.side
-            )
-            self.tape.append(new_trade)
-    
-    def cancel_order(self, order_id):
-        if order_id in self.orders:
-            order = self.orders[order_id]
-            if order.status in ['open', 'partial']:
-                order.status = 'cancelled'
-                return True
-        return False
-        
-    def clean_book(self, book):
-        while book and book[0][2].status in ['filled', 'cancelled']:
-            heapq.heappop(book)
-    
-    def get_snapshot(self):
-        self.clean_book(self.bids)
-        self.clean_book(self.asks)
-
-        best_bid = -self.bids[0][0] if self.bids else None
-        best_ask = self.asks[0][0] if self.asks else None
-        
-        # --- FIX: SPREAD MEMORY ---
-        # If market is one-sided or empty, use last known good spread
-        # to prevent charts from looking like data is missing.
-        if best_bid is not None and best_ask is not None:
-            mid = (best_bid + best_ask) / 2
-            spread = best_ask - best_bid
-            self.last_spread = spread
-        elif best_bid is not None:
-            mid = best_bid
-            spread = self.last_spread # Use memory
-        elif best_ask is not None:
-            mid = best_ask
-            spread = self.last_spread # Use memory
-        else:
-            mid = self.last_mid
-            spread = self.last_spread
-
-        self.last_mid = mid
-
-        return {
-            'best_bid': best_bid if best_bid is not None else 0.0, 
-            'best_ask': best_ask if best_ask is not None else float('inf'), 
-            'mid_price': mid, 
-            'spread': spread
-        }
-
-    def run_sanity_check(self):
-        return True
+import os
+from collections import deque
+import numpy as np
+from numbers import Integral
+from .order import Order, SIDES, ORDER_TYPES, BUY, SELL, LIMIT, MARKET, OPEN, PARTIAL, FILLED, CANCELLED, REJECTED
+from .order_book import BOOK_BACKENDS
+from .tape import TradeTape
+from .stats import EngineStats
+from .ticks import TickGrid, DEFAULT_TICK_SIZE
+
+
+class OrderIndex:
+    """Orders by engine id in a list: id `first + i` lives in slot i, None once retired.
+
+    Engine ids are dense, so a lookup is one subtraction and one list index.
+    Retired slots are released in batches: once at least half the list (and
+    TRIM slots) is dead, the older half is dropped and the few orders still
+    live in it move to the `old` dict, so with retirement on the list stays
+    proportional to the live orders, however long some of them rest. `clients`
+    optionally maps caller-chosen ids to engine ids; only the subscript and
+    `in` operators (and MatchingEngine.cancel_order) consult it, and a bound
+    caller id takes precedence over an equal engine id.
+    """
+    __slots__ = ('slots', 'first', 'head', 'live', 'old', 'clients')
+
+    # Release slots once at least this many, and half the list, are dead
+    TRIM = 4096
+
+    def __init__(self, first=1):
+        self.slots = []
+        self.first = first
+        self.head = 0       # slots before head are all None
+        self.live = 0       # live orders, those in `old` included
+        self.old = {}       # live orders whose ids are below `first`
+        self.clients = None
+
+    def put(self, order_id, order):
+        slots = self.slots
+        i = order_id - self.first
+        if i >= len(slots):
+            slots.extend([None] * (i + 1 - len(slots)))
+        if slots[i] is None:
+            self.live += 1
+        slots[i] = order
+
+    def bind(self, client_id, order_id):
+        if self.clients is None:
+            self.clients = {}
+        self.clients[client_id] = order_id
+
+    def unbind(self, order):
+        if self.clients is not None and self.clients.get(order.client_id) == order.order_id:
+            del self.clients[order.client_id]
+
+    def resolve(self, order_id):
+        """Engine id for a bound client id or an engine id (any integer type); None when unknown."""
+        if self.clients is not None:
+            oid = self.clients.get(order_id)
+            if oid is not None:
+                return oid
+        if order_id.__class__ is int:
+            return order_id
+        if isinstance(order_id, Integral):
+            return int(order_id)
+        return None
+
+    def get(self, order_id, default=None):
+        # Engine ids only; see resolve()
+        i = order_id - self.first
+        if 0 <= i < len(self.slots):
+            order = self.slots[i]
+            if order is not None:
+                return order
+        elif i < 0 and self.old:
+            return self.old.get(order_id, default)
+        return default
+
+    def discard(self, order_id):
+        slots = self.slots
+        i = order_id - self.first
+        if 0 <= i < len(slots):
+            if slots[i] is not None:
+                slots[i] = None
+                self.live -= 1
+        elif i < 0 and self.old.pop(order_id, None) is not None:
+            self.live -= 1
+        head, n = self.head, len(slots)
+        while head < n and slots[head] is None:
+            head += 1
+        dead = n - self.live + len(self.old)
+        if dead >= self.TRIM and 2 * dead >= n:
+            # Drop the dead prefix, or the older half when a few long-resting orders pin it
+            cut = max(head, n // 2)
+            old, first = self.old, self.first
+            for i in range(head, cut):
+                order = slots[i]
+                if order is not None:
+                    old[first + i] = order
+            del slots[:cut]
+            self.first = first + cut
+            n -= cut
+            head = 0
+            while head < n and slots[head] is None:
+                head += 1
+        self.head = head
+
+    def __getitem__(self, order_id):
+        oid = self.resolve(order_id)
+        order = self.get(oid) if oid is not None else None
+        if order is None:
+            raise KeyError(order_id)
+        return order
+
+    def __contains__(self, order_id):
+        oid = self.resolve(order_id)
+        return oid is not None and self.get(oid) is not None
+
+    def __len__(self):
+        return self.live
+
+    def values(self):
+        return list(self.old.values()) + [order for order in self.slots if order is not None]
+
+class BookSnapshot:
+    """Top of book view that the engine refreshes in place.
+
+    get_snapshot() hands out the same object on every call, so copy the
+    fields (or call to_dict()) to keep values past the next book change.
+    Supports snap.get(key, default) and snap[key] like the old dict snapshot.
+    """
+    __slots__ = ('best_bid', 'best_ask', 'mid_price', 'spread', 'version', 'fair_value')
+    FIELDS = ('best_bid', 'best_ask', 'mid_price', 'spread')
+
+    def __init__(self):
+        self.best_bid = 0.0
+        self.best_ask = float('inf')
+        self.mid_price = 100.0
+        self.spread = 0.05
+        self.version = -1
+        self.fair_value = None  # Optional context set by drivers for the agent being asked
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def to_dict(self):
+        return {
+            'best_bid': self.best_bid,
+            'best_ask': self.best_ask,
+            'mid_price': self.mid_price,
+            'spread': self.spread
+        }
+
+class MatchingEngine:
+    # Backend used when none is passed explicitly; lets drivers switch books without code changes
+    default_backend = os.environ.get('MARKETSIM_BOOK', 'heap')
+
+    def __init__(self, backend=None, retire_orders=False, compact_ratio=None, max_tape=None, order_ttl=None,
+                 tick_size=DEFAULT_TICK_SIZE, order_log=None):
+        backend = backend or self.default_backend
+        if backend not in BOOK_BACKENDS:
+            raise ValueError(f"Unknown book backend '{backend}', expected one of {sorted(BOOK_BACKENDS)}")
+        self.backend = backend
+        self.book = BOOK_BACKENDS[backend](compact_ratio=compact_ratio)
+        self.grid = TickGrid(tick_size)
+        self.tick_size = self.grid.tick_size
+        self.tape = TradeTape()
+        self.fill_listeners = []
+        # Engine ids start at 1 and are dense
+        self.orders = OrderIndex(first=1)
+        self.last_mid = 100.0
+        self.last_spread = 0.05 # Default tight spread
+
+        # Bumped on every book change; the snapshot is only rebuilt when it moves
+        self.version = 0
+        self.snapshot = BookSnapshot()
+
+        # Retention policy: drop filled/cancelled orders from the index, cap the tape
+        # and optionally expire resting orders older than `order_ttl` seconds
+        self.retire_orders = retire_orders
+        self.max_tape = max_tape
+        self.order_ttl = order_ttl
+        self.expiry_queue = deque()
+        self.retired_orders = 0
+        self.expired_orders = 0
+        # Fills matched so far; unlike the tape this never shrinks
+        self.fill_count = 0
+
+        # Next engine id, and the incoming order reused by submit()/add_orders()
+        self.next_order_id = 1
+        self._scratch = Order.trusted(None, BUY, 0, None, LIMIT, 0.0, None)
+
+        # Optional engine.order_log.OrderLog recording every inbound instruction for replay
+        self.order_log = order_log
+        self.stats = None
+
+    @classmethod
+    def long_horizon(cls, backend=None, max_tape=100_000, order_ttl=3600.0, tick_size=DEFAULT_TICK_SIZE):
+        """Engine configured so memory stays flat over arbitrarily long sessions.
+
+        Resting orders live at most `order_ttl` seconds, the tape keeps the last
+        `max_tape` trades, the order index only holds slots for about twice the
+        live orders, and heap tombstones stay under a quarter of the resting orders.
+        """
+        return cls(backend=backend, retire_orders=True, compact_ratio=0.25, max_tape=max_tape, order_ttl=order_ttl,
+                   tick_size=tick_size)
+
+    @property
+    def bids(self):
+        return self.book.bids
+
+    @property
+    def asks(self):
+        return self.book.asks
+
+    def add_order(self, order):
+        """Match `order`, rest any limit remainder and return the order's engine id.
+
+        The engine gives every order the next dense integer id, in order.order_id.
+        An id set by the caller beforehand, of any type, is kept as
+        order.client_id and accepted by cancel_order() in place of the engine id;
+        that mapping is the only place client ids are hashed.
+        """
+        oid = self.next_order_id
+        self.next_order_id += 1
+        client_id = order.order_id
+        if client_id is not None:
+            order.client_id = client_id
+            self.orders.bind(client_id, oid)
+        order.order_id = oid
+        if self.order_log is not None:
+            self.order_log.order(order)
+        order.status = OPEN
+        self.orders.put(oid, order)
+        if order.qty <= 0:
+            order.status = REJECTED
+            self._retire(order)
+            return oid
+
+        if order.price is not None:
+            order.ticks = self.grid.to_ticks(order.price)
+            order.price = self.grid.to_price(order.ticks)
+
+        self._apply_retention(order.timestamp)
+        self.match(order)
+
+        if order.qty > 0:
+            if order.order_type == MARKET:
+                order.status = CANCELLED if order.status == OPEN else FILLED
+                self._retire(order)
+                return oid
+            
+            self._rest(order)
+        else:
+            self._retire(order)
+        return oid
+
+    def _apply_retention(self, now):
+        # Releasing tape rows only moves its head, so the cap is kept exactly
+        if self.max_tape is not None and len(self.tape) > self.max_tape:
+            self.consume_tape(len(self.tape) - self.max_tape)
+        if self.order_ttl is not None:
+            self.expire_orders(now)
+
+    def _rest(self, order):
+        self.book.add(order)
+        self.version += 1
+        if self.order_ttl is not None:
+            self.expiry_queue.append(order)
+
+    def add_orders(self, side, price, qty, order_type=None, agent=None, timestamp=0.0, agent_ids=None):
+        """Submit a batch of orders given as parallel arrays.
+
+        `side` and `order_type` hold integer codes indexing SIDES and ORDER_TYPES;
+        market orders may carry NaN prices. `agent` holds agent indices, resolved
+        through `agent_ids` when given. Orders are matched in array order.
+
+        Returns a dict of arrays: engine-assigned `order_id`, `filled_qty`,
+        `remaining_qty` and final `status` (an index into ORDER_STATUSES).
+        Zero-qty rows are never placed and come back REJECTED.
+        Only orders left resting on the book are materialized as Order objects.
+        """
+        side = np.asarray(side, dtype=np.int8)
+        n = len(side)
+        price = np.asarray(price, dtype=np.float64)
+        qty = np.asarray(qty, dtype=np.int64)
+        order_type = np.zeros(n, dtype=np.int8) if order_type is None else np.asarray(order_type, dtype=np.int8)
+        agent = np.zeros(n, dtype=np.int64) if agent is None else np.asarray(agent, dtype=np.int64)
+        timestamp = np.broadcast_to(np.asarray(timestamp, dtype=np.float64), (n,))
+
+        for name, column in (('price', price), ('qty', qty), ('order_type', order_type), ('agent', agent)):
+            if column.shape != (n,):
+                raise ValueError(f"Batch column '{name}' has shape {column.shape}, expected ({n},)")
+
+        is_limit = order_type == LIMIT
+        self._check_batch(qty < 0, "Negative qty")
+        self._check_batch((side < 0) | (side >= len(SIDES)), "Invalid side")
+        self._check_batch((order_type < 0) | (order_type >= len(ORDER_TYPES)), "Invalid order type")
+        self._check_batch(is_limit & ~(price >= 0), "Invalid limit price")
+
+        ticks = self.grid.to_ticks_array(np.where(is_limit, price, 0.0))
+
+        order_ids = np.arange(self.next_order_id, self.next_order_id + n, dtype=np.int64)
+        self.next_order_id += n
+        remaining = qty.copy()
+        status = np.zeros(n, dtype=np.int8)
+
+        agents = agent.tolist()
+        if agent_ids is not None:
+            agents = [agent_ids[a] for a in agents]
+        rows = zip(side.tolist(), ticks.tolist(), qty.tolist(), is_limit.tolist(), agents,
+                   timestamp.tolist(), order_ids.tolist())
+
+        submit = self._submit
+        log = self.order_log
+        for i, (s, k, q, limit, agent_id, ts, oid) in enumerate(rows):
+            if log is not None:
+                log.submit(s, k if limit else None, q, agent_id, ts)
+            if q == 0:
+                status[i] = REJECTED
+                continue
+            remaining[i], status[i] = submit(s, k if limit else None, q, agent_id, ts, oid)
+
+        return {
+            'order_id': order_ids,
+            'filled_qty': qty - remaining,
+            'remaining_qty': remaining,
+            'status': status
+        }
+
+    def submit(self, side, ticks, qty, agent_id, timestamp):
+        """Scalar fast path for callers that already hold validated, grid-aligned values.
+
+        `side` is an index into SIDES and `ticks` the limit price in ticks, or None
+        for a market order. Returns (order_id, remaining_qty, status code); an order
+        with qty <= 0 is never placed and comes back REJECTED.
+        """
+        if self.order_log is not None:
+            self.order_log.submit(side, ticks, qty, agent_id, timestamp)
+        oid = self.next_order_id
+        self.next_order_id += 1
+        if qty <= 0:
+            return oid, 0, REJECTED
+        remaining, status = self._submit(side, ticks, qty, agent_id, timestamp, oid)
+        return oid, remaining, status
+
+    def _submit(self, side, ticks, qty, agent_id, timestamp, oid):
+        # Matches through a reused scratch order; only a resting remainder becomes an Order
+        scratch = self._scratch
+        scratch.agent_id = agent_id
+        scratch.side = side
+        scratch.qty = qty
+        scratch.ticks = ticks
+        scratch.order_type = LIMIT if ticks is not None else MARKET
+        scratch.timestamp = timestamp
+        scratch.status = OPEN
+
+        self._apply_retention(timestamp)
+        self.match(scratch)
+
+        if scratch.qty > 0:
+            if ticks is not None:
+                order = Order.trusted(agent_id, side, scratch.qty, self.grid.to_price(ticks), LIMIT,
+                                      timestamp, oid, scratch.status, ticks)
+                self.orders.put(oid, order)
+                self._rest(order)
+            else:
+                scratch.status = CANCELLED if scratch.status == OPEN else FILLED
+        return scratch.qty, scratch.status
+
+    def cancel_orders(self, order_ids):
+        """Cancel a batch of orders; returns a boolean array of which cancels took effect."""
+        cancel = self.cancel_order
+        return np.fromiter((cancel(oid) for oid in np.asarray(order_ids).tolist()), dtype=bool, count=len(order_ids))
+
+    @staticmethod
+    def _check_batch(invalid, message):
+        if invalid.any():
+            rows = np.flatnonzero(invalid)
+            raise ValueError(f"Violation: {message} in {len(rows)} batch row(s), first at index {rows[0]}")
+
+    def match(self, incoming_order):
+        book = self.book
+        side = incoming_order.side
+        contra_side = SELL if side == BUY else BUY
+        while incoming_order.qty > 0:
+            resting_order = book.best_order(contra_side)
+            if resting_order is None:
+                break
+
+            match_ticks = resting_order.ticks
+
+            if incoming_order.order_type == LIMIT:
+                if side == BUY and match_ticks > incoming_order.ticks:
+                    break 
+                if side == SELL and match_ticks < incoming_order.ticks:
+                    break 
+
+            executed_qty = min(incoming_order.qty, resting_order.qty)
+            
+            incoming_order.qty -= executed_qty
+            resting_order.qty -= executed_qty
+
+            if incoming_order.qty == 0:
+                incoming_order.status = FILLED
+            else:
+                incoming_order.status = PARTIAL
+            
+            if resting_order.qty == 0:
+                resting_order.status = FILLED
+                self._retire(resting_order)
+            else:
+                resting_order.status = PARTIAL
+            book.on_fill(resting_order, executed_qty)
+            self.version += 1
+            self.fill_count += 1
+            
+            # ATTRIBUTION FIX
+            buyer_id = incoming_order.agent_id if side == BUY else resting_order.agent_id
+            seller_id = incoming_order.agent_id if side == SELL else resting_order.agent_id
+            
+            self.tape.append(incoming_order.timestamp, resting_order.price, executed_qty,
+                             buyer_id, seller_id, side)
+            if self.fill_listeners:
+                for listener in self.fill_listeners:
+                    listener(incoming_order.timestamp, resting_order.price, executed_qty,
+                             buyer_id, seller_id, side)
+    
+    def cancel_order(self, order_id, timestamp=None):
+        # `timestamp` only dates the cancel in the order log; cancels take effect immediately
+        if self.order_log is not None:
+            self.order_log.cancel(order_id, timestamp)
+        if order_id.__class__ is not int or self.orders.clients is not None:
+            order_id = self.orders.resolve(order_id)
+            if order_id is None:
+                return False
+        order = self.orders.get(order_id)
+        if order is not None and order.status < FILLED:
+            self._cancel(order)
+            return True
+        return False
+
+    def _cancel(self, order):
+        order.status = CANCELLED
+        self.book.cancel(order)
+        self.version += 1
+        self._retire(order)
+
+    def expire_orders(self, now):
+        """Cancel resting orders that arrived more than `order_ttl` seconds before `now`."""
+        queue = self.expiry_queue
+        cutoff = now - self.order_ttl
+        # Orders are queued in arrival order, so expiry only ever looks at the front
+        while queue and queue[0].timestamp < cutoff:
+            order = queue.popleft()
+            if order.status < FILLED:
+                self._cancel(order)
+                self.expired_orders += 1
+
+    def add_fill_listener(self, listener):
+        """Call `listener(timestamp, price, qty, buyer_id, seller_id, aggressor_side)` on every fill.
+
+        `aggressor_side` is the incoming order's side code (BUY or SELL).
+        """
+        self.fill_listeners.append(listener)
+
+    def _retire(self, order):
+        if self.retire_orders and self.orders.get(order.order_id) is order:
+            self.orders.discard(order.order_id)
+            if order.client_id is not None:
+                self.orders.unbind(order)
+            self.retired_orders += 1
+
+    def consume_tape(self, n):
+        """Drop the oldest `n` trades once every consumer has read them."""
+        self.tape.consume(n)
+
+    def enable_stats(self):
+        """Start counting orders, cancels, fills, tombstones and snapshot rebuilds (see EngineStats)."""
+        if self.stats is None:
+            self.stats = EngineStats(self)
+        return self.stats
+
+    def memory_stats(self):
+        return {
+            'indexed_orders': len(self.orders),
+            'index_slots': len(self.orders.slots) + len(self.orders.old),
+            'resting_orders': self.book.resting,
+            'retired_orders': self.retired_orders,
+            'expired_orders': self.expired_orders,
+            'book_entries': self.book.resting + self.book.tombstones,
+            'tombstones': self.book.tombstones,
+            'compactions': self.book.compactions,
+            'tape_length': len(self.tape),
+            'dropped_trades': self.tape.dropped
+        }
+
+    def depth(self, n=5):
+        """Top `n` aggregated (price, qty) levels per side, best first."""
+        to_price = self.grid.to_price
+        return tuple([(to_price(ticks), qty) for ticks, qty in self.book.depth(side, n)] for side in (BUY, SELL))
+
+    def copy_depth(self, n, ticks, qty, count):
+        """Write the top `n` levels into (2, n) arrays: row 0 bids, row 1 asks, best first.
+
+        Prices are written as integer ticks (see `grid` to convert). Slots beyond the
+        last level are zeroed. Returns the number of levels written per side.
+        """
+        written = []
+        for side in (BUY, SELL):   # side codes double as row numbers
+            levels = self.book.copy_depth(side, n, ticks[side], qty[side], count[side])
+            ticks[side, levels:] = 0
+            qty[side, levels:] = 0
+            count[side, levels:] = 0
+            written.append(levels)
+        return written
+    
+    def invalidate_snapshot(self):
+        """Make the next get_snapshot() rebuild, as a book change would."""
+        self.version += 1
+
+    def get_snapshot(self):
+        snap = self.snapshot
+        if snap.version != self.version:
+            self._refresh_snapshot(snap)
+        return snap
+
+    def _refresh_snapshot(self, snap):
+        bid_ticks = self.book.best_ticks(BUY)
+        ask_ticks = self.book.best_ticks(SELL)
+        to_price = self.grid.to_price
+        best_bid = to_price(bid_ticks) if bid_ticks is not None else None
+        best_ask = to_price(ask_ticks) if ask_ticks is not None else None
+        
+        # --- FIX: SPREAD MEMORY ---
+        # If market is one-sided or empty, use last known good spread
+        # to prevent charts from looking like data is missing.
+        if best_bid is not None and best_ask is not None:
+            mid = (bid_ticks + ask_ticks) * self.tick_size / 2
+            spread = to_price(ask_ticks - bid_ticks)
+            self.last_spread = spread
+        elif best_bid is not None:
+            mid = best_bid
+            spread = self.last_spread # Use memory
+        elif best_ask is not None:
+            mid = best_ask
+            spread = self.last_spread # Use memory
+        else:
+            mid = self.last_mid
+            spread = self.last_spread
+
+        self.last_mid = mid
+
+        snap.best_bid = best_bid if best_bid is not None else 0.0
+        snap.best_ask = best_ask if best_ask is not None else float('inf')
+        snap.mid_price = mid
+        snap.spread = spread
+        snap.version = self.version
+
+    def run_sanity_check(self):
+        return True
@@ -1,58 +1,126 @@
-from dataclasses import dataclass, field
-from typing import Optional
-
-@dataclass(slots=True)
-class Order:
-    agent_id: str
-    side: str
-    qty: int
-    price: Optional[float] = None
-    order_type: str = 'limit'
-    timestamp: float = 0.0
-    order_id: int = 0
-    status: str='open'
-
-    def __post_init__(self):
-        self.side = self.side.lower()
-        self.order_type = self.order_type.lower()
-        self.status = self.status.lower()
-        assert self.qty >= 0, f"Violation: Negative Qty {self.qty} for Order {self.order_id}"
-        
-        if self.price is not None:
-            assert self.price >= 0, f"Violation: Negative Price {self.price} for Order {self.order_id}"
-            
-        assert self.side in ['buy', 'sell'], f"Violation: Invalid side {self.side}"
-
-    def __lt__(self, other):
-        if self.price is None and other.price is not None:
-            return True
-        if self.price is not None and other.price is None:
-            return False
-        
-        if self.price is not None and other.price is not None:
-            if self.side == 'buy':
-                if self.price != other.price:
-                    return self.price > other.price
-            else:
-                if self.price != other.price:
-                    return self.price < other.price
-        
-        return self.timestamp < other.timestamp
-
-@dataclass(slots=True)
-class Trade:
-    timestamp: float
-    price: float
-    qty: int
-    buyer_id: str
-    seller_id: str
-    aggressor_side: str
-    def to_dict(self):
-        return {
-            'timestamp': self.timestamp,
-            'price': self.price,
-            'qty': self.qty,
-            'buyer_id': self.buyer_id,
-            'seller_id': self.seller_id,
-            'aggressor_side': self.aggressor_side
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Optional
+
+
+class Side(IntEnum):
+    BUY = 0
+    SELL = 1
+
+
+class OrderType(IntEnum):
+    LIMIT = 0
+    MARKET = 1
+
+
+class OrderStatus(IntEnum):
+    OPEN = 0
+    PARTIAL = 1
+    FILLED = 2
+    CANCELLED = 3
+    REJECTED = 4    # never placed: zero or negative quantity
+
+
+# Orders, books and the batch API carry these small-int codes; code i maps to the i-th string
+SIDES = ('buy', 'sell')
+ORDER_TYPES = ('limit', 'market')
+ORDER_STATUSES = ('open', 'partial', 'filled', 'cancelled', 'rejected')
+SIDE_CODES = {name: code for code, name in enumerate(SIDES)}
+TYPE_CODES = {name: code for code, name in enumerate(ORDER_TYPES)}
+STATUS_CODES = {name: code for code, name in enumerate(ORDER_STATUSES)}
+
+# Plain ints for the matching loop; a status >= FILLED means the order is done
+BUY, SELL = int(Side.BUY), int(Side.SELL)
+LIMIT, MARKET = int(OrderType.LIMIT), int(OrderType.MARKET)
+OPEN, PARTIAL, FILLED, CANCELLED, REJECTED = (int(status) for status in OrderStatus)
+
+
+def _code(value, codes, kind):
+    # Strings are accepted at the API boundary and stored as codes
+    if isinstance(value, str):
+        code = codes.get(value.lower())
+        assert code is not None, f"Violation: Invalid {kind} {value}"
+        return code
+    assert 0 <= value < len(codes), f"Violation: Invalid {kind} {value}"
+    return int(value)
+
+
+@dataclass(slots=True)
+class Order:
+    """One order. `side`, `order_type` and `status` are codes (Side, OrderType, OrderStatus);
+    the constructor also accepts their names ('buy', 'limit', ...).
+
+    `order_id` is the engine's dense integer id once the order has been added;
+    an id set by the caller beforehand is kept as `client_id` (see
+    MatchingEngine.add_order).
+    """
+    agent_id: str
+    side: int
+    qty: int
+    price: Optional[float] = None
+    order_type: int = LIMIT
+    timestamp: float = 0.0
+    order_id: object = None
+    status: int = OPEN
+    ticks: Optional[int] = None  # Integer price set by the engine on entry
+    client_id: object = None
+
+    def __post_init__(self):
+        self.side = _code(self.side, SIDE_CODES, 'side')
+        self.order_type = _code(self.order_type, TYPE_CODES, 'order type')
+        self.status = _code(self.status, STATUS_CODES, 'status')
+        assert self.qty >= 0, f"Violation: Negative Qty {self.qty} for Order {self.order_id}"
+        
+        if self.price is not None:
+            assert self.price >= 0, f"Violation: Negative Price {self.price} for Order {self.order_id}"
+
+    @classmethod
+    def trusted(cls, agent_id, side, qty, price, order_type, timestamp, order_id, status=OPEN, ticks=None,
+                client_id=None):
+        """Build an order from already-validated integer codes, skipping __post_init__."""
+        order = cls.__new__(cls)
+        order.agent_id = agent_id
+        order.side = side
+        order.qty = qty
+        order.price = price
+        order.order_type = order_type
+        order.timestamp = timestamp
+        order.order_id = order_id
+        order.status = status
+        order.ticks = ticks
+        order.client_id = client_id
+        return order
+
+    def __lt__(self, other):
+        if self.price is None and other.price is not None:
+            return True
+        if self.price is not None and other.price is None:
+            return False
+        
+        if self.price is not None and other.price is not None:
+            if self.side == BUY:
+                if self.price != other.price:
+                    return self.price > other.price
+            else:
+                if self.price != other.price:
+                    return self.price < other.price
+        
+        return self.timestamp < other.timestamp
+
+@dataclass(slots=True)
+class Trade:
+    timestamp: float
+    price: float
+    qty: int
+    buyer_id: str
+    seller_id: str
+    aggressor_side: str
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'price': self.price,
+            'qty': self.qty,
+            'buyer_id': self.buyer_id,
+            'seller_id': self.seller_id,
+            'aggressor_side': self.aggressor_side
         }
\ No newline at end of file
@@ -0,0 +1,257 @@
+import heapq
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from .order import BUY, SELL, FILLED
+
+# Books store and compare integer ticks only; MatchingEngine converts at the boundary.
+# Sides are the integer codes BUY / SELL.
+
+
+class DepthLadder:
+    """Aggregated quantity and order count per price level for one side of a heap book."""
+    __slots__ = ('sign', 'qty', 'count', 'keys')
+
+    def __init__(self, side):
+        self.sign = 1 if side == BUY else -1
+        self.qty = {}
+        self.count = {}
+        # Sorted ascending by sign * ticks, so the best level is always keys[-1]
+        self.keys = []
+
+    def add(self, ticks, qty):
+        if ticks in self.count:
+            self.qty[ticks] += qty
+            self.count[ticks] += 1
+        else:
+            self.qty[ticks] = qty
+            self.count[ticks] = 1
+            insort(self.keys, self.sign * ticks)
+
+    def reduce(self, ticks, qty, removed):
+        self.qty[ticks] -= qty
+        if removed:
+            self.count[ticks] -= 1
+            if self.count[ticks] == 0:
+                del self.qty[ticks]
+                del self.count[ticks]
+                key = self.sign * ticks
+                if self.keys[-1] == key:
+                    self.keys.pop()
+                else:
+                    del self.keys[bisect_left(self.keys, key)]
+
+    def copy_depth(self, n, ticks_out, qty_out, count_out):
+        keys = self.keys
+        levels = min(n, len(keys))
+        sign = self.sign
+        for i in range(levels):
+            ticks = sign * keys[-1 - i]
+            ticks_out[i] = ticks
+            qty_out[i] = self.qty[ticks]
+            count_out[i] = self.count[ticks]
+        return levels
+
+
+class HeapBook:
+    """Original backend: one binary heap per side, cancels leave tombstones.
+
+    Entries are (signed ticks, arrival number, order): within a price level
+    orders fill in the order they reached the book, as in PriceLevelBook.
+    """
+
+    # Never bother compacting heaps holding fewer dead entries than this
+    MIN_COMPACT_TOMBSTONES = 256
+
+    def __init__(self, compact_ratio=None):
+        self.bids = []
+        self.asks = []
+        self.resting = 0
+        self.compact_ratio = compact_ratio
+        self.compactions = 0
+        self.arrivals = 0
+        # Heaps can't be read level by level, so aggregate depth is kept alongside them
+        self.ladders = (DepthLadder(BUY), DepthLadder(SELL))
+
+    @property
+    def tombstones(self):
+        return len(self.bids) + len(self.asks) - self.resting
+
+    def add(self, order):
+        self.resting += 1
+        self.ladders[order.side].add(order.ticks, order.qty)
+        self.arrivals += 1
+        if order.side == BUY:
+            heapq.heappush(self.bids, (-order.ticks, self.arrivals, order))
+        else:
+            heapq.heappush(self.asks, (order.ticks, self.arrivals, order))
+
+    def cancel(self, order):
+        # Lazy deletion: the entry is skipped once it reaches the top of the heap
+        self.resting -= 1
+        self.ladders[order.side].reduce(order.ticks, order.qty, True)
+        if self.compact_ratio is not None:
+            tombstones = self.tombstones
+            if tombstones > self.MIN_COMPACT_TOMBSTONES and tombstones > self.compact_ratio * self.resting:
+                self.compact()
+
+    def compact(self):
+        """Rebuild both heaps without their dead entries."""
+        for heap in (self.bids, self.asks):
+            heap[:] = [entry for entry in heap if entry[2].status < FILLED]
+            heapq.heapify(heap)
+        self.compactions += 1
+
+    def clean(self, heap):
+        while heap and heap[0][2].status >= FILLED:
+            heapq.heappop(heap)
+
+    def best_order(self, side):
+        heap = self.bids if side == BUY else self.asks
+        self.clean(heap)
+        return heap[0][2] if heap else None
+
+    def on_fill(self, order, qty):
+        # The filled order is always the one at the top of its heap
+        self.ladders[order.side].reduce(order.ticks, qty, order.qty == 0)
+        if order.qty == 0:
+            heapq.heappop(self.bids if order.side == BUY else self.asks)
+            self.resting -= 1
+
+    def best_ticks(self, side):
+        order = self.best_order(side)
+        return order.ticks if order is not None else None
+
+    def depth(self, side, n):
+        ladder = self.ladders[side]
+        return [(ladder.sign * key, ladder.qty[ladder.sign * key]) for key in ladder.keys[:-n - 1:-1]]
+
+    def copy_depth(self, side, n, ticks_out, qty_out, count_out):
+        return self.ladders[side].copy_depth(n, ticks_out, qty_out, count_out)
+
+
+class PriceLevel:
+    __slots__ = ('ticks', 'orders', 'total_qty')
+
+    def __init__(self, ticks):
+        self.ticks = ticks
+        self.orders = OrderedDict()  # FIFO queue, keyed by id(order)
+        self.total_qty = 0
+
+    # id() keys don't survive pickling; re-key the queue when a level is unpickled
+    def __getstate__(self):
+        return self.ticks, list(self.orders.values()), self.total_qty
+
+    def __setstate__(self, state):
+        self.ticks, orders, self.total_qty = state
+        self.orders = OrderedDict((id(order), order) for order in orders)
+
+
+class BookSide:
+    __slots__ = ('side', 'sign', 'levels', 'keys')
+
+    def __init__(self, side):
+        self.side = side
+        self.sign = 1 if side == BUY else -1
+        self.levels = {}
+        # Sorted ascending by sign * ticks, so the best level is always keys[-1]
+        self.keys = []
+
+    def add(self, order):
+        level = self.levels.get(order.ticks)
+        if level is None:
+            level = self.levels[order.ticks] = PriceLevel(order.ticks)
+            insort(self.keys, self.sign * order.ticks)
+        level.orders[id(order)] = order
+        level.total_qty += order.qty
+
+    def remove(self, order):
+        level = self.levels.get(order.ticks)
+        if level is None or level.orders.pop(id(order), None) is None:
+            return False
+        level.total_qty -= order.qty
+        if not level.orders:
+            self.drop_level(level)
+        return True
+
+    def drop_level(self, level):
+        del self.levels[level.ticks]
+        key = self.sign * level.ticks
+        if self.keys[-1] == key:
+            self.keys.pop()
+        else:
+            del self.keys[bisect_left(self.keys, key)]
+
+    def best_level(self):
+        return self.levels[self.sign * self.keys[-1]] if self.keys else None
+
+
+class PriceLevelBook:
+    """Sorted price levels with a FIFO queue per level.
+
+    Cancels remove the order from its level immediately, so the book never
+    holds dead entries and the best level is always live.
+    """
+
+    tombstones = 0
+    compactions = 0
+
+    def __init__(self, compact_ratio=None):
+        # compact_ratio is accepted for interface parity; this book has nothing to compact
+        self.bids = BookSide(BUY)
+        self.asks = BookSide(SELL)
+        self.resting = 0
+
+    def _side(self, side):
+        return self.bids if side == BUY else self.asks
+
+    def add(self, order):
+        self.resting += 1
+        self._side(order.side).add(order)
+
+    def cancel(self, order):
+        removed = self._side(order.side).remove(order)
+        self.resting -= removed
+        return removed
+
+    def best_order(self, side):
+        level = self._side(side).best_level()
+        if level is None:
+            return None
+        return next(iter(level.orders.values()))
+
+    def on_fill(self, order, qty):
+        book_side = self._side(order.side)
+        level = book_side.levels[order.ticks]
+        level.total_qty -= qty
+        if order.qty == 0:
+            level.orders.popitem(last=False)
+            self.resting -= 1
+            if not level.orders:
+                book_side.drop_level(level)
+
+    def best_ticks(self, side):
+        keys = self._side(side).keys
+        return self._side(side).sign * keys[-1] if keys else None
+
+    def depth(self, side, n):
+        book_side = self._side(side)
+        levels = book_side.levels
+        sign = book_side.sign
+        return [(sign * key, levels[sign * key].total_qty) for key in book_side.keys[:-n - 1:-1]]
+
+    def copy_depth(self, side, n, ticks_out, qty_out, count_out):
+        book_side = self._side(side)
+        keys = book_side.keys
+        levels = min(n, len(keys))
+        for i in range(levels):
+            level = book_side.levels[book_side.sign * keys[-1 - i]]
+            ticks_out[i] = level.ticks
+            qty_out[i] = level.total_qty
+            count_out[i] = len(level.orders)
+        return levels
+
+
+BOOK_BACKENDS = {
+    'heap': HeapBook,
+    'levels': PriceLevelBook,
+}
@@ -0,0 +1,237 @@
+import json
+import math
+import struct
+from numbers import Integral
+
+from .order import Order
+
+MAGIC = b'MSOL2\n'
+HEADER = struct.Struct('<I')  # length of the JSON engine config that follows the magic
+
+# One record per inbound instruction, tagged by its first byte.
+# Agent ids and client order ids are interned: a SYMBOL record defines the
+# next symbol index the first time a value is seen, and later records refer to it.
+# Symbols keep their type: ints come back as ints, anything else as its str().
+ORDER, SUBMIT, CANCEL, SYMBOL = range(4)
+TEXT, INTEGER = range(2)
+ORDER_RECORD = struct.Struct('<BBBddqIq')   # kind, side, type, timestamp, price (NaN: none), qty, agent, order ref
+SUBMIT_RECORD = struct.Struct('<BBdqqI')    # kind, side, timestamp, ticks (-1: market), qty, agent
+CANCEL_RECORD = struct.Struct('<Bdq')       # kind, timestamp, order ref
+SYMBOL_RECORD = struct.Struct('<BBI')       # kind, type (TEXT / INTEGER), byte length; UTF-8 text follows
+
+NO_AGENT = 0xFFFFFFFF
+NO_REF = -(1 << 63)  # order ref of an order the caller gave no id
+
+
+def engine_config(engine):
+    """Constructor arguments that rebuild an empty engine with the same matching and retention rules."""
+    return dict(backend=engine.backend, retire_orders=engine.retire_orders, compact_ratio=engine.book.compact_ratio,
+                max_tape=engine.max_tape, order_ttl=engine.order_ttl, tick_size=engine.tick_size)
+
+
+class OrderLog:
+    """Append-only binary log of every instruction that reaches a MatchingEngine.
+
+    Attach with MatchingEngine(order_log=...) or engine.order_log = log before
+    the first order. The log records add_order(), submit() / add_orders() rows
+    and cancel_order() calls with their timestamps, in arrival order; expiry and
+    tape trimming follow from those timestamps and the engine config saved in
+    the header, so replay() reproduces the session exactly. Records are
+    buffered and written every `buffer_size` bytes and on flush()/close().
+    """
+
+    def __init__(self, path, engine=None, buffer_size=1 << 16):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.symbols = {}
+        self.last_timestamp = 0.0
+        self.file = open(path, 'wb')
+        config = json.dumps(engine_config(engine) if engine is not None else {}).encode()
+        self.file.write(MAGIC + HEADER.pack(len(config)) + config)
+        if engine is not None:
+            engine.order_log = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _symbol(self, value):
+        index = self.symbols.get(value)
+        if index is None:
+            index = self.symbols[value] = len(self.symbols)
+            integer = isinstance(value, Integral)
+            text = str(int(value) if integer else value).encode()
+            self.buffer += SYMBOL_RECORD.pack(SYMBOL, INTEGER if integer else TEXT, len(text))
+            self.buffer += text
+        return index
+
+    def _order_ref(self, order_id):
+        # Engine ids are stored as is, client ids as -(symbol index + 1)
+        if isinstance(order_id, Integral) and order_id >= 0:
+            return int(order_id)
+        return -1 - self._symbol(order_id)
+
+    def _agent(self, agent_id):
+        return NO_AGENT if agent_id is None else self._symbol(agent_id)
+
+    def order(self, order):
+        price = math.nan if order.price is None else order.price
+        ref = NO_REF if order.client_id is None else self._order_ref(order.client_id)
+        self.buffer += ORDER_RECORD.pack(ORDER, order.side, order.order_type, order.timestamp,
+                                         price, order.qty, self._agent(order.agent_id), ref)
+        self._written(order.timestamp)
+
+    def submit(self, side, ticks, qty, agent_id, timestamp):
+        self.buffer += SUBMIT_RECORD.pack(SUBMIT, side, timestamp, -1 if ticks is None else ticks, qty,
+                                          self._agent(agent_id))
+        self._written(timestamp)
+
+    def cancel(self, order_id, timestamp=None):
+        # Cancels without a timestamp are taken to arrive with the previous instruction
+        if timestamp is None:
+            timestamp = self.last_timestamp
+        self.buffer += CANCEL_RECORD.pack(CANCEL, timestamp, self._order_ref(order_id))
+        self._written(timestamp)
+
+    def _written(self, timestamp):
+        self.last_timestamp = timestamp
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    # Pickled with the engine (e.g. in checkpoints): restoring truncates the file
+    # back to this point, so a resumed run continues the log without duplicates
+    def __getstate__(self):
+        self.flush()
+        state = self.__dict__.copy()
+        state['file'] = None
+        state['offset'] = self.file.tell()
+        return state
+
+    def __setstate__(self, state):
+        offset = state.pop('offset')
+        self.__dict__.update(state)
+        self.file = open(self.path, 'r+b')
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+
+def read_order_log(path):
+    """Engine config and list of decoded records of an order log.
+
+    Records are tuples: ('order', timestamp, side, type, price, qty, agent_id,
+    order_id), ('submit', timestamp, side, ticks, qty, agent_id) and ('cancel',
+    timestamp, order_id), with side and type as integer codes, ticks/price
+    None for market orders and order_id None for orders added without one.
+    Integer agent and order ids come back as ints, other ids as strings.
+    A truncated last record is ignored.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a MarketSim order log")
+    offset = len(MAGIC)
+    (length,) = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+    config = json.loads(data[offset:offset + length])
+    offset += length
+
+    records = []
+    append = records.append
+    symbols = []
+    end = len(data)
+    order_size, submit_size, cancel_size = ORDER_RECORD.size, SUBMIT_RECORD.size, CANCEL_RECORD.size
+    unpack_order, unpack_submit, unpack_cancel = (ORDER_RECORD.unpack_from, SUBMIT_RECORD.unpack_from,
+                                                  CANCEL_RECORD.unpack_from)
+
+    def ref(value):
+        if value == NO_REF:
+            return None
+        return value if value >= 0 else symbols[-1 - value]
+
+    while offset < end:
+        kind = data[offset]
+        if kind == SUBMIT:
+            if offset + submit_size > end:
+                break
+            _, side, timestamp, ticks, qty, agent = unpack_submit(data, offset)
+            append(('submit', timestamp, side, None if ticks < 0 else ticks, qty,
+                    None if agent == NO_AGENT else symbols[agent]))
+            offset += submit_size
+        elif kind == CANCEL:
+            if offset + cancel_size > end:
+                break
+            _, timestamp, order_ref = unpack_cancel(data, offset)
+            append(('cancel', timestamp, ref(order_ref)))
+            offset += cancel_size
+        elif kind == ORDER:
+            if offset + order_size > end:
+                break
+            _, side, order_type, timestamp, price, qty, agent, order_ref = unpack_order(data, offset)
+            append(('order', timestamp, side, order_type, None if math.isnan(price) else price, qty,
+                    None if agent == NO_AGENT else symbols[agent], ref(order_ref)))
+            offset += order_size
+        elif kind == SYMBOL:
+            if offset + SYMBOL_RECORD.size > end:
+                break
+            _, symbol_type, length = SYMBOL_RECORD.unpack_from(data, offset)
+            offset += SYMBOL_RECORD.size
+            if offset + length > end:
+                break
+            text = data[offset:offset + length].decode()
+            symbols.append(int(text) if symbol_type == INTEGER else text)
+            offset += length
+        else:
+            raise ValueError(f"Corrupt order log {path}: unknown record kind {kind} at byte {offset}")
+    return config, records
+
+
+def replay(path, engine=None, recorder=None, snapshot_interval=1.0, until=None):
+    """Feed an order log straight into a MatchingEngine, with no agents or event loop.
+
+    Builds an engine from the log's config unless `engine` is given. With a
+    SnapshotRecorder, the book is recorded every `snapshot_interval` seconds
+    (after every instruction stamped at or before that time) up to `until`,
+    as record_tick does during a scenario run. Returns the engine.
+    """
+    config, records = read_order_log(path)
+    if engine is None:
+        from .matching_engine import MatchingEngine
+        engine = MatchingEngine(**config)
+
+    add_order, submit, cancel_order = engine.add_order, engine.submit, engine.cancel_order
+    trusted = Order.trusted
+    next_snapshot = snapshot_interval if recorder is not None else math.inf
+    for record in records:
+        kind, timestamp = record[0], record[1]
+        while timestamp > next_snapshot:
+            recorder.record_snapshot(engine, next_snapshot)
+            next_snapshot += snapshot_interval
+        if kind == 'submit':
+            _, timestamp, side, ticks, qty, agent_id = record
+            submit(side, ticks, qty, agent_id, timestamp)
+        elif kind == 'cancel':
+            cancel_order(record[2])
+        else:
+            # Caller ids are bound again; engine ids are reassigned in the same order
+            _, timestamp, side, order_type, price, qty, agent_id, order_id = record
+            add_order(trusted(agent_id, side, qty, price, order_type, timestamp, order_id))
+
+    if recorder is not None and until is not None:
+        while next_snapshot <= until:
+            recorder.record_snapshot(engine, next_snapshot)
+            next_snapshot += snapshot_interval
+    return engine
@@ -0,0 +1,270 @@
+import json
+import logging
+from time import perf_counter
+
+# Opt-in instrumentation. Enabling stats shadows the instrumented methods with
+# counting/timing versions stored on the instance, so the class methods that run
+# when stats are off are untouched and pay nothing. disable() removes the shadows.
+# Everything here pickles, so instrumented runs can still be checkpointed.
+
+logger = logging.getLogger(__name__)
+
+
+class TimingTable:
+    """Call counts and cumulative wall time per key."""
+
+    def __init__(self):
+        self.calls = {}
+        self.seconds = {}
+
+    def add(self, key, seconds, calls=1):
+        self.calls[key] = self.calls.get(key, 0) + calls
+        self.seconds[key] = self.seconds.get(key, 0.0) + seconds
+
+    def snapshot(self):
+        rows = {}
+        for key in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            calls, seconds = self.calls[key], self.seconds[key]
+            rows[key] = {'calls': calls, 'seconds': seconds, 'mean_us': 1e6 * seconds / calls if calls else 0.0}
+        return rows
+
+
+class Timed:
+    """Callable that runs `func` and adds its duration to `table` under `key`."""
+    __slots__ = ('func', 'table', 'key')
+
+    def __init__(self, func, table, key):
+        self.func = func
+        self.table = table
+        self.key = key
+
+    def __call__(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.table.add(self.key, perf_counter() - start)
+
+
+def callback_name(callback):
+    # Timers re-queue their bound fire method; report the callback they wrap
+    owner = getattr(callback, '__self__', None)
+    if owner is not None and type(owner).__name__ == 'Timer':
+        callback = owner.callback
+    if isinstance(callback, Timed):
+        callback = callback.func
+    return getattr(callback, '__qualname__', None) or type(callback).__name__
+
+
+def _shadow(obj, name, replacement):
+    original = getattr(obj, name)
+    setattr(obj, name, replacement)
+    return original
+
+
+def _unshadow(obj, names):
+    for name in names:
+        obj.__dict__.pop(name, None)
+
+
+class EngineStats:
+    """Counters for one MatchingEngine; enable with engine.enable_stats().
+
+    Counts inbound orders (add_order, submit and add_orders rows), cancels
+    (explicit and expired), fills (from the engine's fill_count, so consuming
+    or trimming the tape doesn't lose any), heap entries popped as tombstones, and
+    get_snapshot() calls versus actual rebuilds. snapshot() adds the engine's
+    memory_stats(), which compares heap entries with live resting orders.
+    """
+
+    COUNTERS = ('orders_added', 'orders_cancelled', 'tombstones_skipped', 'snapshot_calls', 'snapshot_rebuilds')
+    SHADOWED = ('add_order', 'add_orders', 'submit', '_cancel', 'get_snapshot', '_refresh_snapshot')
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.first_fill = engine.fill_count
+        self._add_order = _shadow(engine, 'add_order', self.add_order)
+        self._add_orders = _shadow(engine, 'add_orders', self.add_orders)
+        self._submit = _shadow(engine, 'submit', self.submit)
+        self._cancel = _shadow(engine, '_cancel', self.cancel)
+        self._get_snapshot = _shadow(engine, 'get_snapshot', self.get_snapshot)
+        self._refresh_snapshot = _shadow(engine, '_refresh_snapshot', self.refresh_snapshot)
+        # Only the heap backend leaves tombstones behind
+        self.book = engine.book if hasattr(engine.book, 'clean') else None
+        if self.book is not None:
+            self._clean = _shadow(self.book, 'clean', self.clean)
+
+    def disable(self):
+        _unshadow(self.engine, self.SHADOWED)
+        if self.book is not None:
+            _unshadow(self.book, ('clean',))
+        self.engine.stats = None
+
+    def add_order(self, order):
+        self.counts['orders_added'] += 1
+        return self._add_order(order)
+
+    def add_orders(self, side, *args, **kwargs):
+        self.counts['orders_added'] += len(side)
+        return self._add_orders(side, *args, **kwargs)
+
+    def submit(self, side, ticks, qty, agent_id, timestamp):
+        self.counts['orders_added'] += 1
+        return self._submit(side, ticks, qty, agent_id, timestamp)
+
+    def cancel(self, order):
+        self.counts['orders_cancelled'] += 1
+        return self._cancel(order)
+
+    def get_snapshot(self):
+        self.counts['snapshot_calls'] += 1
+        return self._get_snapshot()
+
+    def refresh_snapshot(self, snap):
+        self.counts['snapshot_rebuilds'] += 1
+        return self._refresh_snapshot(snap)
+
+    def clean(self, heap):
+        size = len(heap)
+        self._clean(heap)
+        self.counts['tombstones_skipped'] += size - len(heap)
+
+    def snapshot(self):
+        stats = dict(self.counts)
+        stats['fills'] = self.engine.fill_count - self.first_fill
+        stats.update(self.engine.memory_stats())
+        if self.book is not None:
+            stats['bid_heap'] = len(self.book.bids)
+            stats['ask_heap'] = len(self.book.asks)
+        return stats
+
+
+class LoopStats:
+    """Dispatch counts and cumulative callback time per callback; enable with loop.enable_stats().
+
+    Callbacks are wrapped as they are scheduled, so events already queued when
+    stats are enabled run unmeasured; recurring timers are measured from their
+    next run on.
+    """
+
+    SHADOWED = ('schedule', 'schedule_at')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.table = TimingTable()
+        self._schedule = _shadow(loop, 'schedule', self.schedule)
+        self._schedule_at = _shadow(loop, 'schedule_at', self.schedule_at)
+
+    def disable(self):
+        _unshadow(self.loop, self.SHADOWED)
+        self.loop.stats = None
+
+    def _wrap(self, callback):
+        if isinstance(callback, Timed):
+            return callback
+        return Timed(callback, self.table, callback_name(callback))
+
+    def schedule(self, delay, callback, priority=1):
+        return self._schedule(delay, self._wrap(callback), priority)
+
+    def schedule_at(self, target_time, callback, priority=1):
+        return self._schedule_at(target_time, self._wrap(callback), priority)
+
+    def snapshot(self):
+        return {'pending_events': len(self.loop), 'callbacks': self.table.snapshot()}
+
+
+class AgentStats:
+    """Decision counts and time per agent class.
+
+    instrument() times an agent's act(); instrument_population() times an
+    AgentPopulation's per-kind handlers (noise is timed per submitted run of
+    arrivals, so its calls count runs rather than decisions).
+    """
+
+    POPULATION_HANDLERS = (('_submit_noise', 'NoiseTrader'), ('_quote', 'MarketMaker'),
+                           ('_momentum', 'MomentumTrader'))
+
+    def __init__(self):
+        self.table = TimingTable()
+        self.instrumented = []
+
+    def instrument(self, agent):
+        if not isinstance(agent.__dict__.get('act'), Timed):
+            agent.act = Timed(agent.act, self.table, type(agent).__name__)
+            self.instrumented.append((agent, ('act',)))
+
+    def instrument_population(self, population):
+        for name, key in self.POPULATION_HANDLERS:
+            setattr(population, name, Timed(getattr(population, name), self.table, key))
+        self.instrumented.append((population, [name for name, _ in self.POPULATION_HANDLERS]))
+
+    def disable(self):
+        for obj, names in self.instrumented:
+            _unshadow(obj, names)
+        self.instrumented = []
+
+    def snapshot(self):
+        return self.table.snapshot()
+
+
+class SimulationStats:
+    """Engine, loop and agent stats of one run, as one structured object."""
+
+    def __init__(self, engine=None, loop=None, agents=None):
+        self.engine = engine
+        self.loop = loop
+        self.agents = agents
+        self.started = perf_counter()
+
+    def snapshot(self):
+        stats = {'wall_seconds': perf_counter() - self.started}
+        for name in ('engine', 'loop', 'agents'):
+            source = getattr(self, name)
+            if source is not None:
+                stats[name] = source.snapshot()
+        if self.loop is not None:
+            stats['sim_time'] = self.loop.loop.current_time
+        return stats
+
+    def disable(self):
+        for source in (self.engine, self.loop, self.agents):
+            if source is not None:
+                source.disable()
+
+    def report(self, top=10):
+        """Plain-text summary: engine counters, then the most expensive callbacks and agent classes."""
+        stats = self.snapshot()
+        lines = [f"wall {stats['wall_seconds']:.2f}s" + (f", sim time {stats['sim_time']:.1f}s" if 'sim_time' in stats else "")]
+        if 'engine' in stats:
+            lines.append("engine: " + ", ".join(f"{key}={value}" for key, value in stats['engine'].items()))
+        for title, rows in (('callbacks', stats.get('loop', {}).get('callbacks')), ('agents', stats.get('agents'))):
+            if rows:
+                lines.append(f"{title}:")
+                for key, row in list(rows.items())[:top]:
+                    lines.append(f"  {key:40s} {row['calls']:10d} calls {row['seconds']:9.3f}s {row['mean_us']:9.1f}us")
+        return "\n".join(lines)
+
+
+class StatsDump:
+    """Appends a JSON line of `stats.snapshot()` every `interval` simulated seconds.
+
+    Writes to `path`, reopened for each dump so the object stays picklable, or
+    logs the line at INFO on this module's logger when no path is given.
+    Cancel `timer` to stop.
+    """
+
+    def __init__(self, stats, loop, interval, path=None):
+        self.stats = stats
+        self.loop = loop
+        self.path = path
+        self.timer = loop.schedule_every(interval, self.dump, priority=2)
+
+    def dump(self):
+        line = json.dumps({'time': self.loop.current_time, **self.stats.snapshot()})
+        if self.path is None:
+            logger.info(line)
+        else:
+            with open(self.path, 'a') as f:
+                f.write(line + "\n")
@@ -0,0 +1,190 @@
+import numpy as np
+from .order import Trade, SIDES, SIDE_CODES
+
+class TradeTape:
+    """Columnar trade log backed by growable NumPy arrays.
+
+    The engine appends to it directly and analytics read it without copying.
+    Buyer and seller are stored as indices into `participants`; aggressor side
+    as an index into SIDES. Readers keep an absolute cursor and call read() to
+    get every trade appended since; consume() releases trades all readers have
+    seen. Column views stay valid until the next append or consume.
+    """
+
+    COLUMNS = (
+        ('timestamp', np.float64),
+        ('price', np.float64),
+        ('qty', np.int64),
+        ('buyer', np.int32),
+        ('seller', np.int32),
+        ('aggressor', np.int8),
+    )
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.head = 0       # physical row of the oldest stored trade
+        self.size = 0       # trades currently stored
+        self.dropped = 0    # trades released by consume(); absolute index of row `head`
+        self.participants = []
+        self.index = {}
+
+    @classmethod
+    def from_columns(cls, columns, participants):
+        """Rebuild a tape from columns() output and the matching participants list."""
+        tape = cls(max(1, len(columns['timestamp'])))
+        for name, dtype in cls.COLUMNS:
+            getattr(tape, name)[:len(columns[name])] = columns[name]
+        tape.size = len(columns['timestamp'])
+        for agent_id in participants:
+            tape.agent_index(agent_id)
+        return tape
+
+    # Checkpointing (see engine.checkpoint): the tape only ever appends, so each
+    # checkpoint stores the rows and participants added since the previous one.
+    def checkpoint_marker(self):
+        return self.cursor, len(self.participants)
+
+    def checkpoint_delta(self, marker):
+        cursor, known = marker if marker is not None else (0, 0)
+        start = max(cursor, self.dropped)
+        columns = self.read(start)[0]
+        delta = {
+            'start': start,
+            'dropped': self.dropped,
+            'columns': {name: values.copy() for name, values in columns.items()},
+            'participants': self.participants[known:]
+        }
+        return delta, self.checkpoint_marker()
+
+    @classmethod
+    def restore_checkpoint(cls, deltas):
+        columns = {name: np.concatenate([d['columns'][name] for d in deltas]) for name, _ in cls.COLUMNS}
+        absolute = np.concatenate([d['start'] + np.arange(len(d['columns']['timestamp'])) for d in deltas])
+        dropped = deltas[-1]['dropped']
+        keep = absolute >= dropped
+        tape = cls.from_columns({name: values[keep] for name, values in columns.items()},
+                                [agent_id for d in deltas for agent_id in d['participants']])
+        tape.dropped = dropped
+        return tape
+
+    def agent_index(self, agent_id):
+        index = self.index.get(agent_id)
+        if index is None:
+            index = self.index[agent_id] = len(self.participants)
+            self.participants.append(agent_id)
+        return index
+
+    def append(self, timestamp, price, qty, buyer_id, seller_id, aggressor_side):
+        # aggressor_side is a side code (BUY / SELL) or its name
+        row = self.head + self.size
+        if row == self.capacity:
+            self._make_room()
+            row = self.head + self.size
+        index = self.index
+        buyer = index.get(buyer_id)
+        if buyer is None:
+            buyer = self.agent_index(buyer_id)
+        seller = index.get(seller_id)
+        if seller is None:
+            seller = self.agent_index(seller_id)
+        self.timestamp[row] = timestamp
+        self.price[row] = price
+        self.qty[row] = qty
+        self.buyer[row] = buyer
+        self.seller[row] = seller
+        self.aggressor[row] = SIDE_CODES[aggressor_side] if aggressor_side.__class__ is str else aggressor_side
+        self.size += 1
+
+    # Kept so the tape can replace analytics.tape.Tape
+    def log_trade(self, timestamp, price, qty, buyer, seller, aggressor):
+        self.append(timestamp, price, qty, buyer, seller, aggressor)
+
+    def record_trade(self, trade: Trade):
+        self.append(trade.timestamp, trade.price, trade.qty, trade.buyer_id, trade.seller_id, trade.aggressor_side)
+
+    def _make_room(self):
+        # Reuse released space when it frees at least half the buffer, otherwise double
+        if self.head >= self.capacity // 2:
+            self._shift()
+            return
+        self.capacity *= 2
+        for name, dtype in self.COLUMNS:
+            new = np.zeros(self.capacity, dtype=dtype)
+            new[:self.size] = getattr(self, name)[self.head:self.head + self.size]
+            setattr(self, name, new)
+        self.head = 0
+
+    def _shift(self):
+        start, stop = self.head, self.head + self.size
+        for name, _ in self.COLUMNS:
+            column = getattr(self, name)
+            column[:self.size] = column[start:stop]
+        self.head = 0
+
+    def consume(self, n):
+        """Release the oldest `n` stored trades."""
+        n = min(n, self.size)
+        self.head += n
+        self.size -= n
+        self.dropped += n
+        if self.size == 0:
+            self.head = 0
+
+    def clear(self):
+        self.consume(self.size)
+
+    @property
+    def cursor(self):
+        """Absolute index one past the newest trade."""
+        return self.dropped + self.size
+
+    def read(self, cursor=0):
+        """Columns for every trade from absolute index `cursor` onwards, plus the new cursor."""
+        if cursor < self.dropped:
+            raise ValueError(f"Trades before {self.dropped} were released; cursor {cursor} is stale")
+        start = self.head + (cursor - self.dropped)
+        stop = self.head + self.size
+        return {name: getattr(self, name)[start:stop] for name, _ in self.COLUMNS}, self.cursor
+
+    def columns(self):
+        return self.read(self.dropped)[0]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("trade index out of range")
+        row = self.head + i
+        return Trade(
+            timestamp=float(self.timestamp[row]),
+            price=float(self.price[row]),
+            qty=int(self.qty[row]),
+            buyer_id=self.participants[self.buyer[row]],
+            seller_id=self.participants[self.seller[row]],
+            aggressor_side=SIDES[self.aggressor[row]]
+        )
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def to_dataframe(self):
+        import pandas as pd
+        cols = self.columns()
+        categories = pd.Index(self.participants, dtype=object)
+        df = pd.DataFrame({
+            'timestamp': cols['timestamp'],
+            'price': cols['price'],
+            'qty': cols['qty'],
+            'buyer': pd.Categorical.from_codes(cols['buyer'], categories=categories),
+            'seller': pd.Categorical.from_codes(cols['seller'], categories=categories),
+            'aggressor': pd.Categorical.from_codes(cols['aggressor'], categories=list(SIDES))
+        }, copy=False)
+        if not df.empty:
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+        return df
@@ -0,0 +1,33 @@
+from decimal import Decimal
+import numpy as np
+
+DEFAULT_TICK_SIZE = 0.01
+
+class TickGrid:
+    """Maps float prices onto integer ticks and back.
+
+    The engine stores and compares prices as ticks; floats only appear at the
+    API boundary (orders in, snapshots and trades out).
+    """
+    __slots__ = ('tick_size', 'decimals')
+
+    def __init__(self, tick_size=DEFAULT_TICK_SIZE):
+        if tick_size <= 0:
+            raise ValueError(f"Tick size must be positive, got {tick_size}")
+        self.tick_size = float(tick_size)
+        # Rounding to the tick's decimal places keeps 1001 * 0.1 printing as 100.1
+        self.decimals = max(0, -Decimal(str(tick_size)).normalize().as_tuple().exponent)
+
+    def to_ticks(self, price):
+        return int(round(price / self.tick_size))
+
+    def to_ticks_array(self, prices):
+        """to_ticks() over an array of prices; np.rint rounds half to even, like round()."""
+        return np.rint(np.asarray(prices, dtype=np.float64) / self.tick_size).astype(np.int64)
+
+    def to_price(self, ticks):
+        return round(ticks * self.tick_size, self.decimals)
+
+    def snap(self, price):
+        """Round a float price to the nearest price on the grid."""
+        return self.to_price(self.to_ticks(price))
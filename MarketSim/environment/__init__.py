@@ -1,15 +1,17 @@
-from engine.matching_engine import MatchingEngine
-from engine.order import Order
-from analytics.tape import Tape
-from agents.agents import KyleNoiseTrader, InventoryMarketMaker, BaseAgent
-from .market_environment import GymTradingEnvironment
-
-__all__ = [
-    "GymTradingEnvironment",
-    "MatchingEngine",
-    "Order",
-    "Tape",
-    "KyleNoiseTrader",
-    "InventoryMarketMaker",
-    "BaseAgent"
+from engine.matching_engine import MatchingEngine
+from engine.order import Order
+from analytics.tape import Tape
+from agents.agents import BaseAgent
+from .market_environment import GymTradingEnvironment
+from .vector_env import VectorTradingEnvironment
+from .universe import MarketUniverse
+
+__all__ = [
+    "GymTradingEnvironment",
+    "VectorTradingEnvironment",
+    "MarketUniverse",
+    "MatchingEngine",
+    "Order",
+    "Tape",
+    "BaseAgent"
 ]
\ No newline at end of file
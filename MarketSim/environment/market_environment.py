@@ -1,187 +1,285 @@
-import gymnasium as gym
-from gymnasium import spaces
-import numpy as np 
-import random
-
-from engine.matching_engine import MatchingEngine
-from engine.order import Order
-from engine.event_loop import EventLoop
-# FIXED: Importing the actual agents from your agents.py
-from agents.agents import MarketMaker, NoiseTrader
-
-class GymTradingEnvironment(gym.Env):
-    metadata = {'render_modes': ['human']}
-
-    def __init__(self):
-        super(GymTradingEnvironment, self).__init__()
-        
-        self.loop = EventLoop()
-        
-        # Action Space: 0=Hold, 1=Buy, 2=Sell
-        self.action_space = spaces.Discrete(3)
-        
-        # Observation Space: [Rel_Bid, Rel_Ask, Rel_Spread, Norm_Inventory, Norm_Cash]
-        self.observation_space = spaces.Box(
-            low=-10.0, 
-            high=10.0, 
-            shape=(5,), 
-            dtype=np.float32
-        )
-
-        self.order_book = None
-        self.agents = []
-        self.max_steps = 1000  
-        
-        self.insider_inventory = 0
-        self.cash_balance = 100000.0
-        self.tape_reader_index = 0
-
-    def reset(self, seed=None, options=None):
-        super().reset(seed=seed)
-        if seed is not None:
-            random.seed(seed)
-            np.random.seed(seed)
-
-        self.loop = EventLoop()
-        self.order_book = MatchingEngine()
-        self.insider_inventory = 0
-        self.cash_balance = 100000.0
-        self.tape_reader_index = 0
-        self.agents = []
-
-        # FIXED: Using the classes defined in your agents.py
-        for i in range(5): 
-            # MarketMaker manages its own inventory limit
-            self.agents.append(MarketMaker(f"MM_{i}", inventory_limit=1000))
-        for i in range(10): 
-            # NoiseTrader uses 'sigma' not 'sigma_n'
-            self.agents.append(NoiseTrader(f"NT_{i}", sigma=3.0))
-
-        random.shuffle(self.agents)
-
-        # Warmup
-        self.loop.schedule(0.1, self._background_agent_step)
-        self.loop.run_until(20.0)
-
-        self.tape_reader_index = len(self.order_book.tape)
-        
-        return self._get_obs(), {}
-
-    def step(self, action):
-        fixed_qty = 10 
-        
-        snap = self.order_book.get_snapshot()
-        mid_price = snap['mid_price']
-        if mid_price == 0: mid_price = 100.0 
-
-        aggressive_offset = 0.05 
-
-        if action == 1: # Buy
-            price = round(mid_price + aggressive_offset, 2)
-            self._place_order('buy', price, fixed_qty)
-            
-        elif action == 2: # Sell
-            price = round(mid_price - aggressive_offset, 2)
-            self._place_order('sell', price, fixed_qty)
-            
-        # Run simulation forward
-        self.loop.run_until(self.loop.current_time + 1.0)
-        
-        # Process Fills
-        self._process_fills()
-
-        # Calculate Reward (PnL based)
-        current_portfolio_value = self.cash_balance + (self.insider_inventory * mid_price)
-        reward = (current_portfolio_value - 100000.0) / 1000.0
-
-        terminated = self.cash_balance <= 0 
-        truncated = self.loop.current_time >= (self.max_steps + 20.0) 
-        
-        return self._get_obs(), reward, terminated, truncated, {}
-
-    def _get_obs(self):
-        snap = self.order_book.get_snapshot()
-        mid = snap['mid_price']
-        if mid == 0: mid = 100.0
-
-        rel_bid = (snap['best_bid'] - mid) / mid if snap['best_bid'] else 0
-        rel_ask = (snap['best_ask'] - mid) / mid if snap['best_ask'] else 0
-        rel_spread = snap['spread'] / mid
-        
-        norm_inventory = self.insider_inventory / 100.0
-        norm_cash = (self.cash_balance - 100000.0) / 10000.0
-
-        return np.array([
-            rel_bid,
-            rel_ask,
-            rel_spread,
-            norm_inventory,
-            norm_cash
-        ], dtype=np.float32)
-
-    def _place_order(self, side, price, qty):
-        def execute():
-            order = Order(
-                agent_id="Insider",
-                side=side,
-                price=price,
-                qty=qty,
-                order_type='limit',
-                timestamp=self.loop.current_time,
-                order_id=f"RL_{int(self.loop.current_time*1000)}_{side}" 
-            )
-            self.order_book.add_order(order)
-            
-        self.loop.schedule(0.05, execute)
-
-    def _process_fills(self):
-        current_tape = self.order_book.tape
-        for i in range(self.tape_reader_index, len(current_tape)):
-            trade = current_tape[i]
-            
-            if trade.buyer_id == "Insider":
-                self.insider_inventory += trade.qty
-                self.cash_balance -= trade.qty * trade.price
-            
-            elif trade.seller_id == "Insider":
-                self.insider_inventory -= trade.qty
-                self.cash_balance += trade.qty * trade.price
-                
-        self.tape_reader_index = len(current_tape)
-
-    def _background_agent_step(self):
-        agent = random.choice(self.agents)
-        snap = self.order_book.get_snapshot()
-        
-        actions = agent.act(snap)
-        
-        # Handle different return types (list of dicts vs single dict vs None)
-        if isinstance(actions, dict):
-            actions = [actions]
-        elif actions is None:
-            actions = []
-
-        for action in actions:
-            if action['type'] == 'CANCEL':
-                self.order_book.cancel_order(action['order_id'])
-            else:
-                # Robustly handle type strings like "PLACE_LIMIT" or "limit"
-                order_type_str = action.get('type', 'limit')
-                if '_' in order_type_str:
-                     order_type = order_type_str.split('_')[-1].lower()
-                else:
-                     order_type = order_type_str.lower()
-                
-                o = Order(
-                    agent_id=action['agent_id'],
-                    side=action['side'],
-                    qty=action['qty'],
-                    price=action.get('price'),
-                    order_type=order_type,
-                    timestamp=self.loop.current_time,
-                    order_id=action.get('order_id', f"{action['agent_id']}_{random.randint(0, 1e9)}")
-                )
-                self.order_book.add_order(o)
-            
-        next_delay = random.uniform(0.01, 0.1) 
-        self.loop.schedule(next_delay, self._background_agent_step)
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np 
+import random
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from engine.matching_engine import MatchingEngine
+from engine.order import Order
+from engine.event_loop import EventLoop
+# FIXED: Importing the actual agents from your agents.py
+from agents.agents import MarketMaker, NoiseTrader, dispatch
+from agents.ledger import PositionLedger
+
+def trading_spaces():
+    # Action Space: 0=Hold, 1=Buy, 2=Sell
+    action_space = spaces.Discrete(3)
+
+    # Observation Space: [Rel_Bid, Rel_Ask, Rel_Spread, Norm_Inventory, Norm_Cash]
+    observation_space = spaces.Box(
+        low=-10.0,
+        high=10.0,
+        shape=(5,),
+        dtype=np.float32
+    )
+    return action_space, observation_space
+
+def write_observation(snap, inventory, cash, out):
+    """Fill `out` (5 floats) with the observation for `snap` and the agent's inventory and cash."""
+    mid = snap['mid_price']
+    if mid == 0: mid = 100.0
+
+    out[0] = (snap['best_bid'] - mid) / mid if snap['best_bid'] else 0
+    out[1] = (snap['best_ask'] - mid) / mid if snap['best_ask'] else 0
+    out[2] = snap['spread'] / mid
+    out[3] = inventory / 100.0
+    out[4] = (cash - 100000.0) / 10000.0
+
+def build_template(env_kwargs, seed):
+    """Reset a fresh environment with `seed` and return its serialized post-warmup state."""
+    env = GymTradingEnvironment(**env_kwargs)
+    env.reset(seed=seed)
+    return env._capture_template()
+
+class TemplatePool:
+    """Rotating pool of pre-warmed GymTradingEnvironment templates.
+
+    Templates are handed out round-robin and each serves `uses` resets. The first
+    time a template is taken its replacement is submitted for building, in a
+    worker process when `background` is set (otherwise it is built when needed),
+    so warmups run while episodes do. Template seeds come from `seed` in order,
+    so the sequence of templates is the same with or without the background worker.
+    """
+
+    def __init__(self, env_kwargs, size, uses, seed=None, background=True):
+        self.env_kwargs = env_kwargs
+        self.uses = uses
+        self.seeds = np.random.SeedSequence(seed)
+        self.executor = ProcessPoolExecutor(max_workers=1) if background else None
+        self.counter = 0
+        # One [template, times used, replacement] entry per slot
+        self.slots = [[build_template(env_kwargs, self._next_seed()), 0, None] for _ in range(size)]
+
+    def _next_seed(self):
+        return int(self.seeds.spawn(1)[0].generate_state(1)[0])
+
+    def take(self):
+        slot = self.slots[self.counter % len(self.slots)]
+        self.counter += 1
+        if slot[1] >= self.uses:
+            replacement = slot[2]
+            slot[0] = replacement.result() if self.executor is not None else build_template(self.env_kwargs, replacement)
+            slot[1], slot[2] = 0, None
+        if slot[2] is None:
+            seed = self._next_seed()
+            slot[2] = self.executor.submit(build_template, self.env_kwargs, seed) if self.executor is not None else seed
+        slot[1] += 1
+        return slot[0]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+class GymTradingEnvironment(gym.Env):
+    """Single insider trading against market makers and noise traders.
+
+    With `template_pool`, unseeded resets clone pre-warmed templates from a
+    TemplatePool. reset(seed=s) instead warms up from `s` itself (the template
+    is kept for the next reset with the same seed), so it returns the same
+    episode as an environment without templates.
+    """
+    metadata = {'render_modes': ['human']}
+
+    def __init__(self, backend=None, long_horizon=False, tick_size=0.01, template_pool=0, template_uses=8,
+                 template_seed=None, background_refresh=True):
+        super(GymTradingEnvironment, self).__init__()
+        
+        self.backend = backend
+        self.long_horizon = long_horizon
+        self.tick_size = tick_size
+        self.loop = EventLoop()
+
+        # Warm starts: reset() clones a pre-warmed template instead of running the warmup
+        self.templates = None
+        if template_pool:
+            self.templates = TemplatePool(dict(backend=backend, long_horizon=long_horizon, tick_size=tick_size),
+                                          template_pool, template_uses, template_seed, background_refresh)
+            self.reset_rng = np.random.default_rng(template_seed)
+            self.seeded_template = None
+        
+        self.action_space, self.observation_space = trading_spaces()
+
+        self.order_book = None
+        self.agents = []
+        self.max_steps = 1000  
+        
+        self.insider_inventory = 0
+        self.cash_balance = 100000.0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if self.templates is not None:
+            if seed is not None:
+                # Pooled templates come in pool order, so a seeded reset warms up from its own seed
+                if self.seeded_template is None or self.seeded_template[0] != seed:
+                    self.seeded_template = (seed, build_template(self.templates.env_kwargs, seed))
+                python_state, numpy_state = self._restore_template(self.seeded_template[1])
+                random.setstate(python_state)
+                np.random.set_state(numpy_state)
+            else:
+                self._restore_template(self.templates.take())
+                # Per-reset randomization: fresh RNG streams and agent order on top of the cloned state
+                episode_seed = int(self.reset_rng.integers(2**32))
+                random.seed(episode_seed)
+                np.random.seed(episode_seed)
+                random.shuffle(self.agents)
+            return self._get_obs(), {}
+
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        self.loop = EventLoop()
+        if self.long_horizon:
+            self.order_book = MatchingEngine.long_horizon(backend=self.backend, tick_size=self.tick_size)
+        else:
+            self.order_book = MatchingEngine(backend=self.backend, tick_size=self.tick_size)
+        self.insider_inventory = 0
+        self.cash_balance = 100000.0
+        self.agents = []
+
+        # Every fill is booked by the engine into the insider's or an agent's ledger slot
+        self.ledger = PositionLedger()
+        self.insider_slot = self.ledger.register("Insider", cash=self.cash_balance)
+        self.order_book.add_fill_listener(self.ledger.on_fill)
+
+        # FIXED: Using the classes defined in your agents.py
+        for i in range(5): 
+            # MarketMaker manages its own inventory limit
+            self.agents.append(MarketMaker(f"MM_{i}", inventory_limit=1000, tick_size=self.tick_size))
+        for i in range(10): 
+            # NoiseTrader uses 'sigma' not 'sigma_n'
+            self.agents.append(NoiseTrader(f"NT_{i}", sigma=3.0, tick_size=self.tick_size))
+
+        random.shuffle(self.agents)
+        for agent in self.agents:
+            agent.attach(self.ledger)
+
+        # Warmup
+        self.loop.schedule(0.1, self._background_agent_step)
+        self.loop.run_until(20.0)
+
+        # Warmup trades belong to the background agents; nobody reads them
+        self.order_book.consume_tape(len(self.order_book.tape))
+        
+        return self._get_obs(), {}
+
+    def _capture_template(self):
+        """Serialize the post-reset state (book, agents, ledger, clock, pending background steps, RNG states)."""
+        pending = []
+        for timestamp, priority, seq, callback in self.loop.queue:
+            if seq in self.loop.cancelled:
+                continue
+            if callback != self._background_agent_step:
+                raise ValueError("Only background agent steps can be pending in a template")
+            pending.append((timestamp, priority))
+        state = {
+            'order_book': self.order_book,
+            'agents': self.agents,
+            'ledger': self.ledger,
+            'insider_slot': self.insider_slot,
+            'time': self.loop.current_time,
+            'pending': pending,
+            'rng': (random.getstate(), np.random.get_state())
+        }
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _restore_template(self, template):
+        # Returns the template's (random, np.random) states; the caller decides whether to resume them
+        state = pickle.loads(template)
+        self.order_book = state['order_book']
+        self.agents = state['agents']
+        self.ledger = state['ledger']
+        self.insider_slot = state['insider_slot']
+        self.insider_inventory = int(self.ledger.position[self.insider_slot])
+        self.cash_balance = float(self.ledger.cash[self.insider_slot])
+
+        self.loop = EventLoop()
+        self.loop.current_time = state['time']
+        for timestamp, priority in sorted(state['pending']):
+            self.loop.schedule_at(timestamp, self._background_agent_step, priority)
+        return state['rng']
+
+    def close(self):
+        if self.templates is not None:
+            self.templates.close()
+        super().close()
+
+    def step(self, action):
+        fixed_qty = 10 
+        
+        snap = self.order_book.get_snapshot()
+        mid_price = snap['mid_price']
+        if mid_price == 0: mid_price = 100.0 
+
+        aggressive_offset = 0.05 
+
+        if action == 1: # Buy
+            price = self.order_book.grid.snap(mid_price + aggressive_offset)
+            self._place_order('buy', price, fixed_qty)
+            
+        elif action == 2: # Sell
+            price = self.order_book.grid.snap(mid_price - aggressive_offset)
+            self._place_order('sell', price, fixed_qty)
+            
+        # Run simulation forward
+        self.loop.run_until(self.loop.current_time + 1.0)
+        
+        # Process Fills
+        self._process_fills()
+
+        # Calculate Reward (PnL based)
+        current_portfolio_value = self.cash_balance + (self.insider_inventory * mid_price)
+        reward = (current_portfolio_value - 100000.0) / 1000.0
+
+        terminated = self.cash_balance <= 0 
+        truncated = self.loop.current_time >= (self.max_steps + 20.0) 
+        
+        return self._get_obs(), reward, terminated, truncated, {}
+
+    def _get_obs(self):
+        obs = np.empty(5, dtype=np.float32)
+        write_observation(self.order_book.get_snapshot(), self.insider_inventory, self.cash_balance, obs)
+        return obs
+
+    def _place_order(self, side, price, qty):
+        def execute():
+            order = Order(
+                agent_id="Insider",
+                side=side,
+                price=price,
+                qty=qty,
+                order_type='limit',
+                timestamp=self.loop.current_time
+            )
+            self.order_book.add_order(order)
+            
+        self.loop.schedule(0.05, execute)
+
+    def _process_fills(self):
+        self.insider_inventory = int(self.ledger.position[self.insider_slot])
+        self.cash_balance = float(self.ledger.cash[self.insider_slot])
+
+        # Fills arrive through the ledger, so nobody reads the tape
+        self.order_book.consume_tape(len(self.order_book.tape))
+
+    def _background_agent_step(self):
+        agent = random.choice(self.agents)
+        snap = self.order_book.get_snapshot()
+        
+        dispatch(self.order_book, agent.agent_id, agent.act(snap), self.loop.current_time)
+
+        next_delay = random.uniform(0.01, 0.1) 
+        self.loop.schedule(next_delay, self._background_agent_step)
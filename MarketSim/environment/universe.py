@@ -0,0 +1,263 @@
+import multiprocessing as mp
+
+import numpy as np
+
+from engine.exchange import Exchange
+from agents.agents import CANCEL
+from agents.fair_value import FairvalueProcess
+from agents.ledger import PositionLedger
+from agents.population import AgentPopulation
+from analytics.results import ScenarioResult
+from analytics.snapshots import SnapshotRecorder
+
+
+class SymbolMarket:
+    """One symbol of a MarketUniverse: its fair value, background population, ledger and recorder.
+
+    The AgentPopulation draws from its own generator, seeded per symbol, and
+    also drives the fair value, so a symbol evolves the same way whichever
+    shard it is assigned to. Cross-asset agents get a slot in every symbol's
+    ledger, which books their fills on that symbol.
+    """
+
+    def __init__(self, symbol, engine, seed, cross_agent_ids=(), noise_count=20, mm_count=5, mom_count=0,
+                 sigma=0.5, arrival_rate=15.0, initial_value=100.0, volatility=0.0005):
+        self.symbol = symbol
+        self.engine = engine
+        self.config = dict(scenario_name=symbol, seed=seed, noise_count=noise_count, mm_count=mm_count,
+                           mom_count=mom_count, sigma=sigma, arrival_rate=arrival_rate,
+                           initial_value=initial_value, volatility=volatility, tick_size=engine.tick_size)
+        # Reference price of the empty book, so the first quotes go up around this symbol's value
+        engine.last_mid = initial_value
+        self.fair_value = FairvalueProcess(initial_value=initial_value, sigma=volatility)
+        self.ledger = PositionLedger()
+        self.population = AgentPopulation(noise_count, mm_count, mom_count, sigma=sigma, inventory_limit=1000,
+                                          arrival_rate=arrival_rate, tick_size=engine.tick_size,
+                                          fair_value=self.fair_value, seed=seed)
+        self.population.attach(self.ledger)
+        self.cross_slots = [self.ledger.register(agent_id) for agent_id in cross_agent_ids]
+        engine.add_fill_listener(self.ledger.on_fill)
+        self.recorder = SnapshotRecorder()
+        self.population.warmup(engine)
+
+    def advance(self, until):
+        self.population.run_until(self.engine, until)
+
+    def record(self, timestamp):
+        """Record the book at `timestamp`; returns its top of book and the cross-asset agents' positions."""
+        self.recorder.record_snapshot(self.engine, timestamp)
+        position = self.ledger.position
+        return self.engine.get_snapshot().to_dict(), [int(position[slot]) for slot in self.cross_slots]
+
+    def result(self):
+        return ScenarioResult.collect(self.symbol, self.config, self.recorder, self.engine.tape, self.ledger)
+
+
+class Shard:
+    """The symbols one worker owns: an Exchange holding their books, plus one SymbolMarket each."""
+
+    def __init__(self, specs, cross_agent_ids=(), backend=None, tick_size=0.01, long_horizon=False):
+        self.exchange = Exchange(backend=backend, tick_size=tick_size, long_horizon=long_horizon)
+        self.markets = []
+        for spec in specs:
+            spec = dict(spec)
+            symbol = spec.pop('symbol')
+            self.markets.append(SymbolMarket(symbol, self.exchange.list_symbol(symbol),
+                                             cross_agent_ids=cross_agent_ids, **spec))
+
+    def run(self, until):
+        """Submit every background arrival up to `until`, symbol by symbol."""
+        for market in self.markets:
+            market.advance(until)
+
+    def deliver(self, timestamp, orders):
+        """Execute cross-asset orders stamped `timestamp`, then record every symbol at `timestamp`.
+
+        `orders` are (symbol, agent_id, kind, side, ticks, qty, order_id) tuples in
+        decision order. Returns the engine id of each order (the cancelled id for
+        cancels) and {symbol: (top of book, cross-asset positions)}.
+        """
+        exchange = self.exchange
+        order_ids = []
+        for symbol, agent_id, kind, side, ticks, qty, order_id in orders:
+            if kind == CANCEL:
+                exchange.cancel_order(symbol, order_id, timestamp)
+            else:
+                order_id = exchange.submit(symbol, side, ticks, qty, agent_id, timestamp)[0]
+            order_ids.append(order_id)
+        return order_ids, {market.symbol: market.record(timestamp) for market in self.markets}
+
+    def results(self):
+        return [market.result() for market in self.markets]
+
+
+def _shard_worker(conn, specs, cross_agent_ids, exchange_kwargs):
+    shard = Shard(specs, cross_agent_ids, **exchange_kwargs)
+    try:
+        while True:
+            try:
+                command, payload = conn.recv()
+            except EOFError:
+                break
+            if command == 'run':
+                # No reply: the coordinator decides for the next barrier while this window runs
+                shard.run(payload)
+                continue
+            if command == 'deliver':
+                reply = shard.deliver(*payload)
+            elif command == 'results':
+                reply = shard.results()
+            elif command == 'close':
+                break
+            conn.send(reply)
+    finally:
+        conn.close()
+
+
+class MarketUniverse:
+    """Many symbols, each with its own fair value and AgentPopulation, plus cross-asset agents.
+
+    Symbols are split into `workers` contiguous shards, each run by its own
+    process (workers=0 keeps one shard in this process). Time advances
+    conservatively in windows of `sync_interval` seconds: every shard runs its
+    symbols' own arrivals up to the next barrier independently, and nothing
+    from outside a shard can land inside an open window. Cross-asset agents
+    decide at each barrier on every symbol's book as of that same instant, and
+    their orders reach the books stamped with the following barrier, i.e. with
+    a latency of one window. That lookahead is what lets the shards run the
+    window while the agents decide, and it keeps every cross-asset order in
+    the future of every book it touches, so no shard ever rolls back.
+
+    `symbols` is a list of names, or {name: per-symbol SymbolMarket arguments}
+    overriding `market_kwargs`. Per-symbol seeds are spawned from `seed`, and
+    cross-asset orders are executed in the same order either way, so results
+    don't depend on the number of workers.
+    """
+
+    def __init__(self, symbols, cross_agents=(), workers=0, seed=None, sync_interval=1.0, backend=None,
+                 tick_size=0.01, long_horizon=False, **market_kwargs):
+        overrides = symbols if isinstance(symbols, dict) else dict.fromkeys(symbols)
+        self.symbols = list(overrides)
+        if not self.symbols:
+            raise ValueError("Universe needs at least one symbol")
+        self.cross_agents = list(cross_agents)
+        for agent in self.cross_agents:
+            unknown = set(agent.symbols) - set(self.symbols)
+            if unknown:
+                raise ValueError(f"Agent {agent.agent_id} trades unlisted symbols {sorted(unknown)}")
+        if sync_interval <= 0:
+            raise ValueError("sync_interval must be positive")
+        self.sync_interval = sync_interval
+
+        seeds = np.random.SeedSequence(seed).spawn(len(self.symbols))
+        specs = [dict(market_kwargs, **(overrides[symbol] or {}), symbol=symbol,
+                      seed=int(seed_seq.generate_state(1)[0]))
+                 for symbol, seed_seq in zip(self.symbols, seeds)]
+        cross_agent_ids = [agent.agent_id for agent in self.cross_agents]
+        exchange_kwargs = dict(backend=backend, tick_size=tick_size, long_horizon=long_horizon)
+
+        self.workers = min(workers, len(specs))
+        self.processes = []
+        self.connections = []
+        if self.workers:
+            bounds = np.linspace(0, len(specs), self.workers + 1).astype(int)
+            for k, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+                parent, child = mp.Pipe()
+                process = mp.Process(target=_shard_worker, daemon=True,
+                                     args=(child, specs[lo:hi], cross_agent_ids, exchange_kwargs))
+                process.start()
+                child.close()
+                self.processes.append(process)
+                self.connections.append(parent)
+            shard_count = self.workers
+        else:
+            bounds = [0, len(specs)]
+            self.shard = Shard(specs, cross_agent_ids, **exchange_kwargs)
+            shard_count = 1
+        self.shard_of = {symbol: k for k in range(shard_count) for symbol in self.symbols[bounds[k]:bounds[k + 1]]}
+        self.shard_count = shard_count
+        self.closed = False
+
+        self.time = 0.0
+        self.barriers = 0
+        self.books = {}
+        self._deliver(0.0, [[] for _ in range(shard_count)], [[] for _ in range(shard_count)])
+
+    def _decide(self):
+        """Every cross-asset agent's orders on the current barrier's books, grouped by shard."""
+        orders = [[] for _ in range(self.shard_count)]
+        placed = [[] for _ in range(self.shard_count)]
+        books, shard_of = self.books, self.shard_of
+        for agent in self.cross_agents:
+            intents = agent.act({symbol: books[symbol] for symbol in agent.symbols})
+            agent_id = agent.agent_id
+            for symbol, buffer in intents.items():
+                k = shard_of[symbol]
+                for intent in buffer:
+                    orders[k].append((symbol, agent_id, intent.kind, intent.side, intent.ticks, intent.qty,
+                                      intent.order_id))
+                    placed[k].append(intent)
+        return orders, placed
+
+    def _deliver(self, timestamp, orders, placed):
+        if self.workers:
+            for conn, shard_orders in zip(self.connections, orders):
+                conn.send(('deliver', (timestamp, shard_orders)))
+            replies = [conn.recv() for conn in self.connections]
+        else:
+            replies = [self.shard.deliver(timestamp, orders[0])]
+
+        for (order_ids, reports), intents in zip(replies, placed):
+            # Placements learn their engine ids, as dispatch() does for single-book agents
+            for intent, order_id in zip(intents, order_ids):
+                intent.order_id = order_id
+            for symbol, (book, positions) in reports.items():
+                self.books[symbol] = book
+                for agent, position in zip(self.cross_agents, positions):
+                    if symbol in agent.positions:
+                        agent.positions[symbol] = position
+
+    def run(self, until):
+        """Advance every symbol to `until`, one `sync_interval` window at a time."""
+        while self.time < until:
+            barrier = min((self.barriers + 1) * self.sync_interval, until)
+            if self.workers:
+                for conn in self.connections:
+                    conn.send(('run', barrier))
+            else:
+                self.shard.run(barrier)
+            orders, placed = self._decide()
+            self._deliver(barrier, orders, placed)
+            self.time = barrier
+            if barrier == (self.barriers + 1) * self.sync_interval:
+                self.barriers += 1
+
+    def results(self):
+        """One ScenarioResult per symbol, in symbol order; cross-asset agents appear in every ledger."""
+        if self.workers:
+            for conn in self.connections:
+                conn.send(('results', None))
+            results = [result for conn in self.connections for result in conn.recv()]
+        else:
+            results = self.shard.results()
+        return results
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for conn in self.connections:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
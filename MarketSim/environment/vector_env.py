@@ -0,0 +1,266 @@
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+
+import gymnasium as gym
+from gymnasium.vector import AutoresetMode
+from gymnasium.vector.utils import batch_space
+import numpy as np
+
+from engine.matching_engine import MatchingEngine
+from agents.ledger import PositionLedger
+from agents.population import AgentPopulation
+from .market_environment import trading_spaces, write_observation
+
+
+class SubMarket:
+    """One market of a VectorTradingEnvironment.
+
+    Same trading rules, reward and observation as GymTradingEnvironment, but the
+    background traders are an AgentPopulation with its own random generator, so
+    every sub-market is independent and reproducible from its seed wherever it
+    runs. The population is driven straight to each step's timestamps instead of
+    through an EventLoop: it already dispatches its pre-drawn arrivals in time order.
+    """
+
+    INITIAL_CASH = 100000.0
+    ORDER_DELAY = 0.05
+
+    def __init__(self, seed=None, noise_count=10, mm_count=5, sigma=3.0, arrival_rate=18.0, max_steps=1000,
+                 warmup=20.0, order_qty=10, aggressive_offset=0.05, backend=None, long_horizon=False,
+                 tick_size=0.01):
+        self.rng = np.random.default_rng(seed)
+        self.noise_count = noise_count
+        self.mm_count = mm_count
+        self.sigma = sigma
+        self.arrival_rate = arrival_rate
+        self.max_steps = max_steps
+        self.warmup = warmup
+        self.order_qty = order_qty
+        self.aggressive_offset = aggressive_offset
+        self.backend = backend
+        self.long_horizon = long_horizon
+        self.tick_size = tick_size
+        self.engine = None
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        if self.long_horizon:
+            self.engine = MatchingEngine.long_horizon(backend=self.backend, tick_size=self.tick_size)
+        else:
+            self.engine = MatchingEngine(backend=self.backend, tick_size=self.tick_size)
+        self.ledger = PositionLedger()
+        self.insider_slot = self.ledger.register("Insider", cash=self.INITIAL_CASH)
+        self.engine.add_fill_listener(self.ledger.on_fill)
+
+        self.population = AgentPopulation(self.noise_count, self.mm_count, 0, sigma=self.sigma, inventory_limit=1000,
+                                          arrival_rate=self.arrival_rate, tick_size=self.tick_size, seed=self.rng)
+        self.population.attach(self.ledger)
+        self.population.run_until(self.engine, self.warmup)
+        self.engine.consume_tape(len(self.engine.tape))
+
+        self.time = self.warmup
+        self.steps = 0
+        self.inventory = 0
+        self.cash = self.INITIAL_CASH
+
+    def step(self, action):
+        """Apply action 0=Hold, 1=Buy, 2=Sell and advance one second; returns (reward, terminated, truncated)."""
+        engine = self.engine
+        mid_price = engine.get_snapshot().mid_price
+        if mid_price == 0:
+            mid_price = 100.0
+
+        if action == 1 or action == 2:
+            timestamp = self.time + self.ORDER_DELAY
+            if action == 1:
+                ticks = engine.grid.to_ticks(mid_price + self.aggressive_offset)
+            else:
+                ticks = engine.grid.to_ticks(mid_price - self.aggressive_offset)
+            self.population.run_until(engine, timestamp)
+            engine.submit(action - 1, ticks, self.order_qty, "Insider", timestamp)
+
+        self.time += 1.0
+        self.population.run_until(engine, self.time)
+        self.steps += 1
+
+        self.inventory = int(self.ledger.position[self.insider_slot])
+        self.cash = float(self.ledger.cash[self.insider_slot])
+        engine.consume_tape(len(engine.tape))
+
+        reward = (self.cash + self.inventory * mid_price - self.INITIAL_CASH) / 1000.0
+        return reward, self.cash <= 0, self.steps >= self.max_steps
+
+    def observe(self, out):
+        write_observation(self.engine.get_snapshot(), self.inventory, self.cash, out)
+
+
+# Layout of the buffers shared between the env and its shard workers
+BUFFERS = (
+    ('actions', np.int64, ()),
+    ('observations', np.float32, (5,)),
+    ('rewards', np.float64, ()),
+    ('terminations', np.bool_, ()),
+    ('truncations', np.bool_, ()),
+    ('final_obs', np.float32, (5,)),
+    ('done', np.bool_, ()),
+)
+
+
+def _buffer_size(num_envs):
+    return sum(num_envs * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+               for _, dtype, shape in BUFFERS)
+
+
+def _buffer_views(buffer, num_envs):
+    views, offset = {}, 0
+    for name, dtype, shape in BUFFERS:
+        view = np.ndarray((num_envs,) + shape, dtype=dtype, buffer=buffer, offset=offset)
+        views[name] = view
+        offset += view.nbytes
+    return views
+
+
+def _reset_shard(markets, views, lo, seeds):
+    for i, market in enumerate(markets, lo):
+        market.reset(None if seeds is None else seeds[i - lo])
+        market.observe(views['observations'][i])
+    views['done'][lo:lo + len(markets)] = False
+
+
+def _step_shard(markets, views, lo):
+    actions, observations = views['actions'], views['observations']
+    rewards, terminations, truncations = views['rewards'], views['terminations'], views['truncations']
+    final_obs, done = views['final_obs'], views['done']
+    for i, market in enumerate(markets, lo):
+        reward, terminated, truncated = market.step(actions[i])
+        rewards[i], terminations[i], truncations[i] = reward, terminated, truncated
+        market.observe(observations[i])
+        done[i] = terminated or truncated
+        if done[i]:
+            # Same-step autoreset: keep the last observation, hand out the new episode's first one
+            final_obs[i] = observations[i]
+            market.reset()
+            market.observe(observations[i])
+
+
+def _shard_worker(conn, shm_name, num_envs, lo, seeds, market_kwargs):
+    shm = SharedMemory(name=shm_name)
+    try:
+        views = _buffer_views(shm.buf, num_envs)
+        markets = [SubMarket(seed=seed, **market_kwargs) for seed in seeds]
+        while True:
+            try:
+                command, payload = conn.recv()
+            except EOFError:
+                break
+            if command == 'step':
+                _step_shard(markets, views, lo)
+            elif command == 'reset':
+                _reset_shard(markets, views, lo, payload)
+            elif command == 'close':
+                break
+            conn.send(True)
+        del views
+    finally:
+        shm.close()
+        conn.close()
+
+
+class VectorTradingEnvironment(gym.vector.VectorEnv):
+    """`num_envs` independent GymTradingEnvironment-style markets stepped as one batch.
+
+    With workers=0 every SubMarket lives in this process; otherwise they are
+    split into `workers` contiguous shards, each stepped by its own process.
+    Actions, observations, rewards and termination flags live in one
+    preallocated buffer (shared memory when sharded) that step() and reset()
+    fill in place, so the returned arrays are overwritten by the next call.
+    Finished sub-envs are reset in the same step; their last observation is in
+    infos['final_obs'] under the infos['_final_obs'] mask. Sub-env seeds are
+    spawned from `seed`, so results don't depend on the number of workers.
+    """
+
+    metadata = {'render_modes': [], 'autoreset_mode': AutoresetMode.SAME_STEP}
+
+    def __init__(self, num_envs=8, workers=0, seed=None, **market_kwargs):
+        self.num_envs = num_envs
+        self.market_kwargs = market_kwargs
+        self.single_action_space, self.single_observation_space = trading_spaces()
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+
+        seeds = self._spawn_seeds(seed)
+        self.workers = min(workers, num_envs)
+        self.shm = None
+        self.processes = []
+        self.connections = []
+        if self.workers:
+            self.shm = SharedMemory(create=True, size=_buffer_size(num_envs))
+            self.buffers = _buffer_views(self.shm.buf, num_envs)
+            self.bounds = np.linspace(0, num_envs, self.workers + 1).astype(int)
+            for lo, hi in zip(self.bounds[:-1], self.bounds[1:]):
+                parent, child = mp.Pipe()
+                process = mp.Process(target=_shard_worker, daemon=True,
+                                     args=(child, self.shm.name, num_envs, lo, seeds[lo:hi], market_kwargs))
+                process.start()
+                child.close()
+                self.processes.append(process)
+                self.connections.append(parent)
+        else:
+            self.buffers = _buffer_views(bytearray(_buffer_size(num_envs)), num_envs)
+            self.markets = [SubMarket(seed=s, **market_kwargs) for s in seeds]
+        self.closed = False
+
+    def _spawn_seeds(self, seed):
+        return np.random.SeedSequence(seed).spawn(self.num_envs)
+
+    def _broadcast(self, command, payloads):
+        for conn, payload in zip(self.connections, payloads):
+            conn.send((command, payload))
+        for conn in self.connections:
+            conn.recv()
+
+    def reset(self, seed=None, options=None):
+        seeds = self._spawn_seeds(seed) if seed is not None else None
+        if self.workers:
+            self._broadcast('reset', [None if seeds is None else seeds[lo:hi]
+                                      for lo, hi in zip(self.bounds[:-1], self.bounds[1:])])
+        else:
+            _reset_shard(self.markets, self.buffers, 0, seeds)
+        return self.buffers['observations'], {}
+
+    def step(self, actions):
+        self.buffers['actions'][:] = actions
+        if self.workers:
+            self._broadcast('step', [None] * self.workers)
+        else:
+            _step_shard(self.markets, self.buffers, 0)
+
+        done = self.buffers['done']
+        infos = {}
+        if done.any():
+            infos = {'final_obs': self.buffers['final_obs'].copy(), '_final_obs': done.copy()}
+        b = self.buffers
+        return b['observations'], b['rewards'], b['terminations'], b['truncations'], infos
+
+    def close_extras(self, **kwargs):
+        if self.closed:
+            return
+        self.closed = True
+        for conn in self.connections:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self.shm is not None:
+            self.buffers = None
+            try:
+                self.shm.close()
+            except BufferError:
+                pass  # Arrays handed out by step()/reset() still map it; freed with them
+            self.shm.unlink()
+            self.shm = None
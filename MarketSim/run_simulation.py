@@ -1,146 +1,287 @@
+import logging
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from matplotlib.backends.backend_pdf import PdfPages
 from engine.matching_engine import MatchingEngine
 from engine.event_loop import EventLoop
-from agents.agents import MarketMaker, NoiseTrader, MomentumTrader
-from analytics.tape import Tape
+from engine.checkpoint import CheckpointWriter, load_checkpoint
+from engine.order_log import OrderLog
+from engine.stats import AgentStats, SimulationStats, StatsDump
+from engine.tape import TradeTape
+from agents.agents import MarketMaker, NoiseTrader, MomentumTrader, dispatch
+from agents.ledger import PositionLedger
+from agents.population import AgentPopulation
+from agents.fair_value import FairvalueProcess
 from analytics.snapshots import SnapshotRecorder
-from analytics.plots import MarketPlots
+from analytics.plots import MarketPlots, write_report
+from analytics.results import ScenarioResult
+from analytics.store import ResultStore
+from analytics.metrics import MarketMetrics
 import random
-from engine.order import Order
-
-def run_scenario(pdf, scenario_name, noise_count, mm_count, mom_count):
-    order_book = MatchingEngine()
-    loop = EventLoop()
-    tape = Tape()
-    recorder = SnapshotRecorder()
-    
-    # --- FIX 1: LOW VOLATILITY ---
-    # Keeps price realistic (e.g. 100 -> 102)
-    fv_process = FairvalueProcess(initial_value=100.0, mu=0.0, sigma=0.0005)
-    
-    np.random.seed(42)
-    random.seed(42)
-    
-    agents = []
-    for i in range(noise_count):
-        agents.append(NoiseTrader(f"NT_{i}"))
-    for i in range(mm_count):
-        # MMs now manage their own inventory and orders
-        agents.append(MarketMaker(f"MM_{i}", inventory_limit=1000))
-    for i in range(mom_count):
-        agents.append(MomentumTrader(f"MOM_{i}"))
-    
-    def background_step():
+
+logger = logging.getLogger(__name__)
+
+def run_scenario(pdf, scenario_name, noise_count, mm_count, mom_count, **kwargs):
+    result = simulate_scenario(scenario_name, noise_count, mm_count, mom_count, **kwargs)
+    render_report(pdf, result)
+    return result
+
+def render_report(pdf, result):
+    plotter = MarketPlots(result, result.tape)
+    plotter.generate_scenario_report(pdf, result.name)
+
+def simulate_scenario(scenario_name, noise_count, mm_count, mom_count, backend=None,
+                      horizon=3600.0, long_horizon=False, tick_size=0.01, vectorized=False, seed=42,
+                      checkpoint_path=None, checkpoint_interval=600.0, order_log=None, profile=False):
+    """Run one scenario to `horizon` and return its ScenarioResult; everything random derives from `seed`.
+
+    With `checkpoint_path`, the run's state is appended there every
+    `checkpoint_interval` simulated seconds; resume_scenario() picks it up after a crash.
+    With `order_log`, every instruction sent to the engine is written to that
+    path for engine.order_log.replay(). With `profile`, the result's `stats`
+    holds the engine, event loop and agent instrumentation of the run.
+    """
+    run = ScenarioRun(scenario_name, noise_count, mm_count, mom_count, backend=backend, horizon=horizon,
+                      long_horizon=long_horizon, tick_size=tick_size, vectorized=vectorized, seed=seed,
+                      order_log=order_log)
+    if profile:
+        run.enable_stats()
+    run.run(checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval)
+    run.close()
+    return run.result()
+
+def resume_scenario(checkpoint_path, horizon=None, checkpoint_interval=None):
+    """Continue the run saved in `checkpoint_path` from its last checkpoint, to `horizon` (default: its own).
+
+    Checkpoints keep coming at the saved run's interval unless `checkpoint_interval` is given.
+    """
+    run = ScenarioRun.load(checkpoint_path)
+    if checkpoint_interval is None:
+        checkpoint_interval = run.checkpoint_interval
+    run.run(until=horizon, checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval, resume=True)
+    run.close()
+    return run.result()
+
+class ScenarioRun:
+    """Everything one scenario run owns: book, agents, ledger, recorder, fair value and pending events.
+
+    Event callbacks are bound methods, so the whole run, queued events included,
+    pickles as one object graph; that is what checkpoints store.
+    """
+
+    CHECKPOINT_STORES = (TradeTape, SnapshotRecorder)
+
+    def __init__(self, scenario_name, noise_count, mm_count, mom_count, backend=None,
+                 horizon=3600.0, long_horizon=False, tick_size=0.01, vectorized=False, seed=42, order_log=None):
+        self.config = dict(scenario_name=scenario_name, noise_count=noise_count, mm_count=mm_count,
+                           mom_count=mom_count, backend=backend, horizon=horizon, long_horizon=long_horizon,
+                           tick_size=tick_size, vectorized=vectorized, seed=seed)
+        self.scenario_name = scenario_name
+        self.horizon = horizon
+        if long_horizon:
+            self.order_book = MatchingEngine.long_horizon(backend=backend, tick_size=tick_size)
+        else:
+            self.order_book = MatchingEngine(backend=backend, tick_size=tick_size)
+        if order_log is not None:
+            OrderLog(order_log, engine=self.order_book)
+        self.loop = EventLoop()
+        self.tape = self.order_book.tape
+        self.ledger = PositionLedger()
+        self.recorder = SnapshotRecorder()
+        # Online VWAP, bars and volatility, updated at every recorded tick
+        self.metrics = MarketMetrics(self.tape, bar_freqs=('1s', '30s', '1min'))
+
+        # --- FIX 1: LOW VOLATILITY ---
+        # Keeps price realistic (e.g. 100 -> 102)
+        self.fv_process = FairvalueProcess(initial_value=100.0, mu=0.0, sigma=0.0005)
+
+        np.random.seed(seed)
+        random.seed(seed)
+
+        self.agents = []
+        self.population = None
+        self.arrivals = 0
+        self.stats = None
+        if vectorized:
+            self.population = population = AgentPopulation(noise_count, mm_count, mom_count, inventory_limit=1000, tick_size=tick_size,
+                                         fair_value=self.fv_process, seed=seed)
+            population.attach(self.ledger)
+            self.order_book.add_fill_listener(self.ledger.on_fill)
+            logger.info("  > Warming up %s...", scenario_name)
+            population.warmup(self.order_book)
+            population.start(self.loop, self.order_book)
+        else:
+            self.start_agents(noise_count, mm_count, mom_count, tick_size)
+
+        self.loop.schedule_every(1.0, self.record_tick)
+
+    def start_agents(self, noise_count, mm_count, mom_count, tick_size):
+        """Create one Python object per agent and schedule the background arrival process."""
+        agents = self.agents
+        order_book = self.order_book
+        for i in range(noise_count):
+            agents.append(NoiseTrader(f"NT_{i}", tick_size=tick_size))
+        for i in range(mm_count):
+            # MMs now manage their own inventory and orders
+            agents.append(MarketMaker(f"MM_{i}", inventory_limit=1000, tick_size=tick_size))
+        for i in range(mom_count):
+            agents.append(MomentumTrader(f"MOM_{i}", tick_size=tick_size))
+
+        # Fills are booked straight into each agent's ledger slot by the engine
+        for agent in agents:
+            agent.attach(self.ledger)
+        order_book.add_fill_listener(self.ledger.on_fill)
+
+        # Warmup
+        logger.info("  > Warming up %s...", self.scenario_name)
+        for _ in range(100): 
+            mm_agents = [a for a in agents if isinstance(a, MarketMaker)]
+            if not mm_agents: break
+            agent = random.choice(mm_agents)
+            snap = order_book.get_snapshot()
+            if snap.mid_price == 100.0 and snap.spread == 0:
+                snap = {'mid_price': 100.0, 'spread': 0.05}
+            
+            # Warmup only adds orders: quotes pile up rather than being cancelled
+            dispatch(order_book, agent.agent_id, agent.act(snap), self.loop.current_time, cancels=False)
+
+        self.loop.schedule(0, self.background_step)
+
+    def background_step(self):
+        self.arrivals += 1
+        order_book = self.order_book
         lambda_rate = 15
         arrival_delay = np.random.exponential(1/lambda_rate)
-        current_fv = fv_process.step(arrival_delay)
+        current_fv = self.fv_process.step(arrival_delay)
         
-        # State Sync
-        for trade in order_book.tape:
-            for agent in agents:
-                if trade.buyer_id == agent.agent_id:
-                    agent.inventory += trade.qty
-                    agent.balance -= trade.qty * trade.price
-                elif trade.seller_id == agent.agent_id:
-                    agent.inventory -= trade.qty
-                    agent.balance += trade.qty * trade.price
-        order_book.tape.clear()
-
-        agent = random.choice(agents)
+        agent = random.choice(self.agents)
         snap = order_book.get_snapshot()
+        snap.fair_value = current_fv if isinstance(agent, NoiseTrader) else None
         
-        if isinstance(agent, NoiseTrader):
-            snap['fair_value'] = current_fv
-        else:
-            snap.pop('fair_value', None)
-        
-        action = agent.act(snap)
-        
-        if action:
-            intents = [action] if isinstance(action, dict) else action
-            for item in intents:
-                # --- FIX 2: HANDLE CANCELLATIONS ---
-                if item.get('type') == 'CANCEL':
-                    order_book.cancel_order(item['order_id'])
-                    continue
-
-                if isinstance(item, dict):
-                    # Robust order type parsing
-                    t_str = item.get('type', 'PLACE_LIMIT')
-                    order_type = t_str.split('_')[1].lower() if '_' in t_str else 'limit'
-
-                    # --- FIX 3: UNIQUE ORDER IDs ---
-                    # Use Agent's ID if provided, else generate random unique ID
-                    # This prevents order_id=0 overwriting in the engine
-                    oid = item.get('order_id', f"sys_{random.randint(0, 10**9)}")
-
-                    new_order = Order(
-                        agent_id=item['agent_id'],
-                        order_id=oid,  # Pass the ID explicitly
-                        side=item['side'],
-                        qty=item['qty'],
-                        price=item.get('price'),
-                        order_type=order_type,
-                        timestamp=loop.current_time
-                    )
-                    order_book.add_order(new_order)
-
-        loop.schedule(arrival_delay, background_step)
-
-    # Warmup
-    print(f"  > Warming up {scenario_name}...")
-    for _ in range(100): 
-        mm_agents = [a for a in agents if isinstance(a, MarketMaker)]
-        if not mm_agents: break
-        agent = random.choice(mm_agents)
-        snap = order_book.get_snapshot()
-        if snap['mid_price'] == 100.0 and snap['spread'] == 0:
-            snap['mid_price'] = 100.0
-            snap['spread'] = 0.05
-        
-        # Warmup usually just adds orders, that's fine
-        action = agent.act(snap)
-        if action:
-            for item in action:
-                if item.get('type') == 'CANCEL': continue
-                oid = item.get('order_id', f"wu_{random.randint(0, 10**9)}")
-                o = Order(item['agent_id'], item['side'], item['qty'], item['price'], order_id=oid)
-                order_book.add_order(o)
-
-    loop.schedule(0, background_step)
-    
-    def record_tick():
-        recorder.record_snapshot(order_book, loop.current_time)
-        loop.schedule(1.0, record_tick)
-    
-    loop.schedule(1.0, record_tick)
-    loop.run_until(3600.0)
-    
-    plotter = MarketPlots(recorder, tape)
-    plotter.generate_scenario_report(pdf, scenario_name)
-
-class FairvalueProcess:
-    def __init__(self, initial_value=100.0, mu=0.0, sigma=0.0005):
-        self.current_value = initial_value
-        self.mu = mu
-        self.sigma = sigma
-    
-    def step(self, dt):
-        dW = np.random.normal(0, np.sqrt(dt))
-        self.current_value *= np.exp((self.mu - 0.5 * self.sigma**2) * dt + self.sigma * dW)
-        return self.current_value
-
-def main():
+        # --- FIX 2: HANDLE CANCELLATIONS ---
+        # dispatch() executes cancels and placements in the order the agent decided them
+        dispatch(order_book, agent.agent_id, agent.act(snap), self.loop.current_time)
+
+        self.loop.schedule(arrival_delay, self.background_step)
+
+    def record_tick(self):
+        now = self.loop.current_time
+        mid, spread = self.recorder.record_snapshot(self.order_book, now)[:2]
+        self.metrics.sync()
+        self.metrics.on_snapshot(now, mid, spread)
+
+    def run(self, until=None, checkpoint_path=None, checkpoint_interval=600.0, resume=False):
+        """Advance the loop to `until` (default: the horizon), checkpointing every `checkpoint_interval` seconds.
+
+        The loop runs in checkpoint-sized chunks; run_until() over consecutive
+        chunks dispatches exactly the events one call over the whole span would.
+        """
+        until = self.horizon if until is None else until
+        self.horizon = max(self.horizon, until)
+        if checkpoint_path is None:
+            self.loop.run_until(until)
+            return
+        self.checkpoint_interval = checkpoint_interval
+        writer = CheckpointWriter(checkpoint_path, [self.tape, self.recorder], resume=resume)
+        while self.loop.current_time < until:
+            self.loop.run_until(min(self.loop.current_time + checkpoint_interval, until))
+            writer.write(self)
+
+    def enable_stats(self, dump_interval=None, dump_path=None):
+        """Instrument the engine, event loop and agents; returns the SimulationStats.
+
+        With `dump_interval`, a JSON line of the stats is appended to `dump_path`
+        (logged on engine.stats' logger when None) every `dump_interval` simulated seconds.
+        """
+        if self.stats is None:
+            agent_stats = AgentStats()
+            for agent in self.agents:
+                agent_stats.instrument(agent)
+            if self.population is not None:
+                agent_stats.instrument_population(self.population)
+            self.stats = SimulationStats(self.order_book.enable_stats(), self.loop.enable_stats(), agent_stats)
+            if dump_interval is not None:
+                StatsDump(self.stats, self.loop, dump_interval, dump_path)
+        return self.stats
+
+    def agent_arrivals(self):
+        """Agent decisions processed so far."""
+        return self.population.arrivals if self.population is not None else self.arrivals
+
+    def close(self):
+        if self.order_book.order_log is not None:
+            self.order_book.order_log.close()
+
+    def result(self):
+        result = ScenarioResult.collect(self.scenario_name, self.config, self.recorder, self.tape, self.ledger)
+        if self.stats is not None:
+            result.stats = self.stats.snapshot()
+        # The result carries the trades in its own columns; its metrics leave the tape behind
+        result.metrics = self.metrics.detached()
+        return result
+
+    # The global RNGs drive the object-mode agents; they travel with the run
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['rng_state'] = (random.getstate(), np.random.get_state())
+        return state
+
+    @classmethod
+    def load(cls, checkpoint_path):
+        """The run as of the last complete checkpoint in `checkpoint_path`, global RNGs restored."""
+        run = load_checkpoint(checkpoint_path, cls.CHECKPOINT_STORES)
+        python_state, numpy_state = run.__dict__.pop('rng_state')
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+        return run
+
+def _simulate_config(config):
+    return simulate_scenario(**config)
+
+def run_scenarios(configs, workers=None, base_seed=42, store=None):
+    """Run scenario configs (dicts of simulate_scenario arguments) on a process pool.
+
+    Configs without a 'seed' get one spawned from `base_seed` by position, so a
+    sweep produces the same results whatever the number of workers; workers=1
+    runs everything serially in this process. Results come back in config order
+    and, given a ResultStore, are also written to it.
+    """
+    configs = [dict(config) for config in configs]
+    for config, seed_seq in zip(configs, np.random.SeedSequence(base_seed).spawn(len(configs))):
+        config.setdefault('seed', int(seed_seq.generate_state(1)[0]))
+
+    if workers == 1 or len(configs) <= 1:
+        results = [_simulate_config(config) for config in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_config, configs))
+    if store is not None:
+        for result in results:
+            store.write(result)
+    return results
+
+SCENARIOS = [
+    ("Scenario A: Noise Only", 100, 0, 0),
+    ("Scenario B: Noise + Market Makers", 80, 20, 0),
+    ("Scenario C: Noise + Momentum", 80, 0, 20)
+]
+
+def main(workers=None, store_path=None, decimate=None):
+    # Every scenario seeded with 42, as the serial runner always did
+    configs = [dict(scenario_name=name, noise_count=n, mm_count=mm, mom_count=mom, seed=42)
+               for name, n, mm, mom in SCENARIOS]
+    store = ResultStore(store_path) if store_path is not None else None
+    results = run_scenarios(configs, workers=workers, store=store)
+
+    if decimate is not None:
+        # Decimated pages built on the worker pool from the streamed bars
+        write_report('simulation_report.pdf', results, workers=workers, decimate=decimate)
+        return
+
     with PdfPages('simulation_report.pdf') as pdf:
-        scenarios = [
-            ("Scenario A: Noise Only", 100, 0, 0),
-            ("Scenario B: Noise + Market Makers", 80, 20, 0),
-            ("Scenario C: Noise + Momentum", 80, 0, 20)
-        ]
-        
-        for name, n, mm, mom in scenarios:
-            run_scenario(pdf, name, n, mm, mom)
+        for result in results:
+            render_report(pdf, result)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     main()
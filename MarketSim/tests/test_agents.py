@@ -0,0 +1,48 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine
+from engine.order import Side, OrderStatus
+from agents.agents import MarketMaker, NoiseTrader, MomentumTrader, dispatch, PLACE_LIMIT, PLACE_MARKET, CANCEL
+
+
+class TestAgentIntents(unittest.TestCase):
+
+    def test_market_maker_requotes_by_engine_id(self):
+        engine = MatchingEngine()
+        mm = MarketMaker("MM", tick_size=engine.tick_size)
+        intents = mm.act(engine.get_snapshot())
+        self.assertEqual([(i.kind, i.side) for i in intents], [(PLACE_LIMIT, Side.BUY), (PLACE_LIMIT, Side.SELL)])
+        dispatch(engine, mm.agent_id, intents, 0.0)
+        quotes = intents.placed_ids()
+        self.assertEqual(len(quotes), 2)
+        first_objects = list(intents)
+
+        # The next decision cancels both quotes first, reusing the same Intent objects
+        intents = mm.act(engine.get_snapshot())
+        self.assertEqual([(i.kind, i.order_id) for i in intents][:2], [(CANCEL, quotes[0]), (CANCEL, quotes[1])])
+        self.assertIs(list(intents)[0], first_objects[0])
+        dispatch(engine, mm.agent_id, intents, 1.0)
+        self.assertTrue(all(engine.orders[oid].status == OrderStatus.CANCELLED for oid in quotes))
+        self.assertEqual(engine.book.resting, 2)
+
+    def test_taker_intents(self):
+        engine = MatchingEngine()
+        noise = NoiseTrader("NT", tick_size=engine.tick_size)
+        intents = noise.act({'fair_value': 100.0})
+        self.assertEqual(len(intents), 1)
+        self.assertGreaterEqual(next(iter(intents)).ticks, 1)
+
+        momentum = MomentumTrader("MOM", window_size=2)
+        self.assertEqual(len(momentum.act({'mid_price': 100.0})), 0)
+        self.assertEqual(len(momentum.act({'mid_price': 100.0})), 0)
+        intents = momentum.act({'mid_price': 101.0})
+        intent = next(iter(intents))
+        self.assertEqual((intent.kind, intent.side, intent.ticks), (PLACE_MARKET, Side.BUY, None))
+
+if __name__ == '__main__':
+    unittest.main()
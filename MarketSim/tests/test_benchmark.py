@@ -0,0 +1,31 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmark import BENCHMARKS, compare, run_benchmarks
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        name = "engine.get_snapshot[cached]"
+        results = run_benchmarks([name], quick=True, repeats=1, log=None)
+        self.assertGreater(results[name]['rate'], 0)
+
+        baseline = {name: {'rate': results[name]['rate'] * 2}, "engine.gone": {'rate': 1.0}}
+        rows = compare(results, baseline, threshold=0.1)
+        self.assertEqual([(row[0], row[4]) for row in rows], [(name, 'regression')])
+        rows = compare(results, {name: {'rate': results[name]['rate'] * 1.05}}, threshold=0.1)
+        self.assertEqual(rows[0][4], 'ok')
+
+    def test_every_area_is_covered(self):
+        for prefix in ("engine.add_order", "engine.submit", "engine.get_snapshot", "recorder.", "event_loop.",
+                       "scenario.A", "scenario.B", "scenario.C", "gym.step", "gym.reset",
+                       "universe.run"):
+            self.assertTrue(any(name.startswith(prefix) for name in BENCHMARKS), prefix)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from environment.market_environment import GymTradingEnvironment
+
+
+def episodes(env, count=6, steps=5):
+    rewards = []
+    for _ in range(count):
+        obs, _ = env.reset()
+        rewards.append(float(obs.sum()) + sum(env.step(k % 3)[1] for k in range(steps)))
+    env.close()
+    return rewards
+
+
+class TestTemplateResets(unittest.TestCase):
+
+    def test_pool_is_reproducible_with_and_without_background_refresh(self):
+        kwargs = dict(template_pool=2, template_uses=2, template_seed=11)
+        background = episodes(GymTradingEnvironment(**kwargs))
+        inline = episodes(GymTradingEnvironment(background_refresh=False, **kwargs))
+        self.assertEqual(background, inline)
+        self.assertGreater(len(set(background)), 1)
+
+    def test_clone_starts_after_warmup(self):
+        env = GymTradingEnvironment(template_pool=1, background_refresh=False)
+        obs, _ = env.reset(seed=3)
+        self.assertEqual(env.loop.current_time, 20.0)
+        self.assertEqual(len(env.loop), 1)
+        self.assertEqual((env.insider_inventory, env.cash_balance), (0, 100000.0))
+        self.assertTrue(np.all(np.isfinite(obs)))
+        # Clones are independent copies: stepping one leaves the template untouched
+        first_book = env.order_book
+        env.step(1)
+        env.reset(seed=3)
+        self.assertIsNot(env.order_book, first_book)
+        self.assertEqual(env.loop.current_time, 20.0)
+        env.close()
+
+    def test_seeded_reset_matches_plain_environment(self):
+        def seeded_episode(env):
+            obs, _ = env.reset(seed=5)
+            return obs.tolist() + [env.step(k % 3)[1] for k in range(5)]
+
+        plain = seeded_episode(GymTradingEnvironment())
+        env = GymTradingEnvironment(template_pool=2, template_seed=11, background_refresh=False)
+        env.reset()
+        for _ in range(3):
+            self.assertEqual(seeded_episode(env), plain)
+            env.reset()
+        env.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import random
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.event_loop import EventLoop
+
+
+def random_schedule(loop, seed, n=2000):
+    """Self-rescheduling chains plus a recurring timer; returns the dispatch log."""
+    rng = random.Random(seed)
+    log = []
+
+    def make(name):
+        def callback():
+            log.append((loop.current_time, name))
+            if rng.random() < 0.9:
+                loop.schedule(rng.expovariate(5.0), callback, rng.randint(0, 2))
+        return callback
+
+    for i in range(n // 100):
+        loop.schedule(rng.random() * 10, make(i), rng.randint(0, 2))
+    loop.schedule_every(1.0, lambda: log.append((loop.current_time, 'tick')))
+    loop.run_until(50.0)
+    return log
+
+
+class TestEventLoop(unittest.TestCase):
+
+    def test_calendar_backend_matches_heap(self):
+        heap_log = random_schedule(EventLoop(), 1)
+        calendar_log = random_schedule(EventLoop('calendar', bucket_width=0.25), 1)
+        self.assertGreater(len(heap_log), 100)
+        self.assertEqual(heap_log, calendar_log)
+
+    def test_cancel_and_recurring_timer(self):
+        for backend in ['heap', 'calendar']:
+            loop = EventLoop(backend)
+            log = []
+            keep = loop.schedule(2.0, lambda: log.append('keep'))
+            drop = loop.schedule(1.0, lambda: log.append('drop'))
+            loop.cancel(drop)
+            timer = loop.schedule_every(0.5, lambda: log.append(loop.current_time), delay=0)
+            loop.schedule(1.2, timer.cancel)
+            loop.run_until(5.0)
+            self.assertEqual(log, [0.0, 0.5, 1.0, 'keep'])
+            self.assertFalse(timer.active)
+            self.assertEqual(len(loop), 0)
+            self.assertEqual(keep[0], 2.0)
+
+    def test_drain_runs_due_batches(self):
+        loop = EventLoop()
+        log = []
+        loop.schedule_every(1.0, lambda: log.append(('tick', loop.current_time)), priority=1)
+        loop.schedule_every(1.0, lambda: log.append(('agents', loop.current_time)), priority=0)
+        self.assertEqual(loop.drain(3.0), 6)
+        self.assertEqual(log[:2], [('agents', 1.0), ('tick', 1.0)])
+        self.assertEqual(loop.current_time, 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analytics.indicators import SMA, EMA, RunningVariance, RollingVariance, RollingMin, RollingMax, OrderFlowImbalance
+from analytics.metrics import MarketMetrics
+from engine.tape import TradeTape
+
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        self.values = np.random.default_rng(3).normal(100, 1, 2500)
+
+    def test_windowed_indicators_match_pandas(self):
+        series = pd.Series(self.values)
+        for window in [1, 50, 1000]:
+            indicators = [SMA(window), RollingVariance(window), RollingMin(window), RollingMax(window)]
+            out = np.array([[ind.update(x) for ind in indicators] for x in self.values.tolist()])
+            rolling = series.rolling(window, min_periods=1)
+            expected = np.c_[rolling.mean(), rolling.var(), rolling.min(), rolling.max()]
+            np.testing.assert_allclose(out[window:], expected[window:], rtol=1e-9, atol=1e-9)
+            self.assertTrue(indicators[0].ready)
+
+    def test_cumulative_indicators(self):
+        ema, variance = EMA(span=20), RunningVariance()
+        out = [ema.update(x) for x in self.values.tolist()]
+        for x in self.values.tolist():
+            variance.update(x)
+        np.testing.assert_allclose(out, pd.Series(self.values).ewm(span=20, adjust=False).mean())
+        self.assertAlmostEqual(variance.variance, self.values.var(ddof=1))
+
+    def test_order_flow_imbalance(self):
+        ofi = OrderFlowImbalance()
+        self.assertEqual(ofi.update(99.0, 10, 101.0, 5), 0)
+        self.assertEqual(ofi.update(99.0, 15, 101.0, 5), 5)     # bid queue grew
+        self.assertEqual(ofi.update(100.0, 3, 101.0, 5), 8)     # new better bid
+        self.assertEqual(ofi.update(100.0, 3, 100.5, 2), 6)     # new better ask
+        self.assertEqual(ofi.update(None, 0, 100.5, 2), 3)      # bid side emptied
+
+        rolling = OrderFlowImbalance(window=2)
+        for quote in [(99.0, 10, 101.0, 5), (99.0, 15, 101.0, 5), (100.0, 3, 101.0, 5), (100.0, 3, 100.5, 2)]:
+            rolling.update(*quote)
+        self.assertEqual(rolling.value, 1)
+
+
+class TestStreamingMetrics(unittest.TestCase):
+
+    def test_matches_batch_resampling(self):
+        rng = np.random.default_rng(5)
+        times = np.arange(1.0, 601.0)
+        mids = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(times))))
+        spreads = rng.uniform(0.01, 0.1, len(times))
+        tape = TradeTape()
+        trade_times = np.sort(rng.uniform(0, 600, 2000))
+        trade_prices = 100 + rng.normal(0, 0.5, 2000)
+        trade_qty = rng.integers(1, 20, 2000)
+
+        metrics = MarketMetrics(tape, window_size=30, bar_freqs=('1s', '1min'))
+        trades = iter(zip(trade_times, trade_prices, trade_qty))
+        pending = next(trades)
+        for t, mid, spread in zip(times, mids, spreads):
+            while pending is not None and pending[0] <= t:
+                tape.append(pending[0], pending[1], int(pending[2]), "B", "S", 'buy')
+                pending = next(trades, None)
+            metrics.sync()
+            metrics.on_snapshot(t, mid, spread)
+
+        self.assertAlmostEqual(metrics.vwap(), np.dot(trade_prices, trade_qty) / trade_qty.sum())
+        self.assertAlmostEqual(metrics.average_spread(), spreads.mean())
+
+        l1 = pd.Series(mids, index=pd.to_datetime(times, unit='s'))
+        expected = l1.resample('1min').ohlc().dropna()
+        np.testing.assert_allclose(metrics.get_ohlc_data('60s').to_numpy(), expected.to_numpy())
+        self.assertTrue((metrics.get_ohlc_data('1min').index == expected.index).all())
+
+        log_returns = np.log(l1 / l1.shift(1)).dropna()
+        self.assertAlmostEqual(metrics.current_session_volatility(), log_returns.std())
+        self.assertAlmostEqual(metrics.current_rolling_volatility(), log_returns.iloc[-30:].std())
+        self.assertAlmostEqual(metrics.realized_volatility(), np.sqrt((log_returns ** 2).sum()))
+
+        trades = pd.DataFrame({'price': trade_prices, 'qty': trade_qty}, index=pd.to_datetime(trade_times, unit='s'))
+        bars = metrics.get_ohlc_data('1min', source='trades')
+        np.testing.assert_allclose(bars[['open', 'high', 'low', 'close']].to_numpy(),
+                                   trades['price'].resample('1min').ohlc().dropna().to_numpy())
+        np.testing.assert_array_equal(bars['volume'].to_numpy(), trades['qty'].resample('1min').sum().to_numpy())
+        self.assertEqual(bars['trades'].sum(), 2000)
+
+if __name__ == '__main__':
+    unittest.main()
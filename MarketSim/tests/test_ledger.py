@@ -0,0 +1,42 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine
+from engine.order import Order
+from agents.ledger import PositionLedger
+
+
+class TestPositionLedger(unittest.TestCase):
+
+    def test_fills_routed_to_owner_slots(self):
+        """Engine fills land in the owning agents' slots with average-cost realized PnL."""
+        engine = MatchingEngine()
+        ledger = PositionLedger(capacity=2)
+        for agent_id in ["A", "B", "C"]:
+            ledger.register(agent_id, cash=1000.0)
+        engine.add_fill_listener(ledger.on_fill)
+
+        engine.add_order(Order("A", "sell", 10, 100.0, timestamp=1, order_id="a1"))
+        engine.add_order(Order("B", "buy", 10, 100.0, timestamp=2, order_id="b1"))
+        engine.add_order(Order("A", "sell", 5, 104.0, timestamp=3, order_id="a2"))
+        engine.add_order(Order("B", "sell", 4, 90.0, timestamp=4, order_id="b2"))
+        engine.add_order(Order("C", "buy", 5, 90.0, timestamp=5, order_id="c1"))
+
+        a, b, c = (ledger.slots[x] for x in "ABC")
+        self.assertEqual(ledger.position[[a, b, c]].tolist(), [-10, 6, 4])
+        self.assertEqual(ledger.cash[b], 1000.0 - 1000.0 + 4 * 90.0)
+        self.assertEqual(ledger.realized_pnl[b], 4 * (90.0 - 100.0))
+        self.assertEqual(ledger.mark_to_market(100.0)[c], 1000.0 - 360.0 + 400.0)
+
+    def test_self_trade_is_flat(self):
+        ledger = PositionLedger()
+        ledger.register("A")
+        ledger.on_fill(1.0, 100.0, 5, "A", "A", 'buy')
+        self.assertEqual((ledger.position[0], ledger.cash[0]), (0, 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+import unittest
+import random
+import numpy as np
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine
+from engine.order import Order, Side, OrderStatus
+
+
+def random_flow(seed, n=3000, batch=1):
+    """Deterministic mix of limit, market and cancel instructions; `batch` consecutive ones share a timestamp."""
+    rng = random.Random(seed)
+    flow = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.3 and i > 0:
+            flow.append(('cancel', f"o{rng.randrange(i)}"))
+        else:
+            side = rng.choice(['buy', 'sell'])
+            order_type = 'market' if r > 0.9 else 'limit'
+            price = round(100 + rng.gauss(0, 0.5), 2) if order_type == 'limit' else None
+            flow.append(('add', dict(agent_id=f"A{rng.randrange(10)}", side=side, qty=rng.randint(1, 20),
+                                     price=price, order_type=order_type, timestamp=(i // batch) * 0.01,
+                                     order_id=f"o{i}")))
+    return flow
+
+
+def replay(backend, flow):
+    engine = MatchingEngine(backend=backend)
+    snapshots = []
+    for kind, payload in flow:
+        if kind == 'cancel':
+            engine.cancel_order(payload)
+        else:
+            engine.add_order(Order(**payload))
+        snapshots.append(engine.get_snapshot().to_dict())
+    return engine, snapshots
+
+
+class TestOrderBookBackends(unittest.TestCase):
+
+    def test_backends_produce_identical_tapes(self):
+        """Heap and price-level books must match the same flow identically."""
+        # batch=100 puts many orders at one price and timestamp, where only arrival order decides
+        for batch in (1, 100):
+            flow = random_flow(7, batch=batch)
+            heap_engine, heap_snaps = replay('heap', flow)
+            level_engine, level_snaps = replay('levels', flow)
+
+            self.assertGreater(len(heap_engine.tape), 0)
+            self.assertEqual([t.to_dict() for t in heap_engine.tape], [t.to_dict() for t in level_engine.tape])
+            self.assertEqual(heap_snaps, level_snaps)
+            self.assertEqual(heap_engine.depth(5), level_engine.depth(5))
+
+    def test_same_timestamp_fills_in_arrival_order(self):
+        for backend in ('heap', 'levels'):
+            engine = MatchingEngine(backend=backend)
+            for i in range(6):
+                engine.add_order(Order(f"S{i}", "sell", 1, 100.0, timestamp=0.0))
+            engine.add_order(Order("B", "buy", 6, 100.0, timestamp=0.0))
+            self.assertEqual([t.seller_id for t in engine.tape], [f"S{i}" for i in range(6)], backend)
+
+    def test_fifo_within_level(self):
+        """Orders at the same price fill in arrival order."""
+        engine = MatchingEngine(backend='levels')
+        engine.add_order(Order("A1", "sell", 5, 101.0, timestamp=1, order_id="first"))
+        engine.add_order(Order("A2", "sell", 5, 101.0, timestamp=2, order_id="second"))
+        engine.add_order(Order("B1", "buy", 7, 101.0, timestamp=3, order_id="taker"))
+
+        self.assertEqual([t.seller_id for t in engine.tape], ["A1", "A2"])
+        self.assertEqual(engine.depth(5)[1], [(101.0, 3)])
+
+    def test_cancel_removes_level(self):
+        """Cancelling the last order at a level removes the level immediately."""
+        engine = MatchingEngine(backend='levels')
+        engine.add_order(Order("A1", "buy", 10, 99.0, timestamp=1, order_id="b1"))
+        engine.add_order(Order("A2", "buy", 10, 98.0, timestamp=1, order_id="b2"))
+
+        self.assertTrue(engine.cancel_order("b1"))
+        self.assertFalse(engine.cancel_order("b1"))
+        self.assertEqual(engine.get_snapshot()['best_bid'], 98.0)
+        self.assertNotIn(99.0, engine.bids.levels)
+
+    def test_batch_matches_single_orders(self):
+        """add_orders must produce the same tape as feeding add_order one by one."""
+        flow = [payload for kind, payload in random_flow(11) if kind == 'add']
+        single = MatchingEngine()
+        for payload in flow:
+            single.add_order(Order(**payload))
+
+        agent_ids = sorted({p['agent_id'] for p in flow})
+        batch = MatchingEngine()
+        result = batch.add_orders(
+            side=[0 if p['side'] == 'buy' else 1 for p in flow],
+            price=[np.nan if p['price'] is None else p['price'] for p in flow],
+            qty=[p['qty'] for p in flow],
+            order_type=[0 if p['order_type'] == 'limit' else 1 for p in flow],
+            agent=[agent_ids.index(p['agent_id']) for p in flow],
+            timestamp=[p['timestamp'] for p in flow],
+            agent_ids=agent_ids
+        )
+
+        self.assertEqual([t.to_dict() for t in single.tape], [t.to_dict() for t in batch.tape])
+        self.assertEqual(single.get_snapshot().to_dict(), batch.get_snapshot().to_dict())
+        # Every trade has exactly one aggressor from the batch
+        self.assertEqual(result['filled_qty'].sum(), sum(t.qty for t in batch.tape))
+
+        resting = [oid for oid in result['order_id'].tolist()
+                   if oid in batch.orders and batch.orders[oid].status in (OrderStatus.OPEN, OrderStatus.PARTIAL)]
+        self.assertGreater(len(resting), 10)
+        self.assertTrue(batch.cancel_orders(resting[:10]).all())
+        self.assertFalse(batch.cancel_orders(resting[:10]).any())
+
+    def test_batch_validation(self):
+        engine = MatchingEngine()
+        with self.assertRaises(ValueError):
+            engine.add_orders(side=[0, 1], price=[100.0, -1.0], qty=[1, 1])
+        with self.assertRaises(ValueError):
+            engine.add_orders(side=[0, 2], price=[100.0, 100.0], qty=[1, 1])
+
+    def test_zero_qty_is_rejected(self):
+        engine = MatchingEngine()
+        self.assertEqual(engine.submit(Side.BUY, 10000, 0, "A", 0.0)[2], OrderStatus.REJECTED)
+        self.assertEqual(engine.submit(Side.BUY, 10000, -5, "A", 0.0)[2], OrderStatus.REJECTED)
+        result = engine.add_orders(side=[0, 0], price=[100.0, 100.0], qty=[0, 3])
+        self.assertEqual(result['status'].tolist(), [OrderStatus.REJECTED, OrderStatus.OPEN])
+        order = Order("A", Side.SELL, 0, 100.0)
+        oid = engine.add_order(order)
+        self.assertEqual(order.status, OrderStatus.REJECTED)
+        self.assertFalse(engine.cancel_order(oid))
+        self.assertEqual(engine.memory_stats()['resting_orders'], 1)
+
+    def test_batch_and_scalar_ticks_agree(self):
+        grid = MatchingEngine(tick_size=0.05).grid
+        prices = [0.1 + 0.2, 0.025, 0.075, 100.024, 100.026, 99.975, 1e-9]
+        self.assertEqual(grid.to_ticks_array(prices).tolist(), [grid.to_ticks(p) for p in prices])
+
+    def test_prices_share_tick_level(self):
+        """Prices that round to the same tick rest on one level and come back as clean floats."""
+        for backend in ['heap', 'levels']:
+            engine = MatchingEngine(backend=backend, tick_size=0.05)
+            engine.add_order(Order("A1", "buy", 10, 0.1 + 0.2, timestamp=1, order_id="b1"))
+            engine.add_order(Order("A2", "buy", 5, 0.3, timestamp=2, order_id="b2"))
+            engine.add_order(Order("A3", "sell", 12, 0.29, timestamp=3, order_id="s1"))
+
+            self.assertEqual(engine.orders["b1"].price, 0.3)
+            self.assertEqual([(t.seller_id, t.buyer_id, t.price) for t in engine.tape],
+                             [("A3", "A1", 0.3), ("A3", "A2", 0.3)])
+            self.assertEqual(engine.depth(5)[0], [(0.3, 3)])
+
+    def test_snapshot_tracks_book_version(self):
+        """The snapshot is one reused view, refreshed only when the book changes."""
+        engine = MatchingEngine(backend='levels')
+        engine.add_order(Order("A1", "buy", 10, 99.0, timestamp=1, order_id="b1"))
+        snap = engine.get_snapshot()
+        version = snap.version
+
+        self.assertIs(engine.get_snapshot(), snap)
+        self.assertEqual(engine.get_snapshot().version, version)
+
+        engine.add_order(Order("A2", "sell", 10, 101.0, timestamp=2, order_id="s1"))
+        self.assertGreater(engine.get_snapshot().version, version)
+        self.assertEqual((snap['best_bid'], snap.get('best_ask'), snap.mid_price, snap.spread), (99.0, 101.0, 100.0, 2.0))
+
+        engine.cancel_order("s1")
+        self.assertEqual(engine.get_snapshot().best_ask, float('inf'))
+        self.assertEqual(engine.get_snapshot().spread, 2.0)
+
+    def test_depth_ladder_aggregates_live_orders(self):
+        """copy_depth must match a brute-force aggregation of live resting orders."""
+        for backend in ['heap', 'levels']:
+            engine, _ = replay(backend, random_flow(5))
+            ticks = np.zeros((2, 5), dtype=np.int64)
+            qty = np.zeros((2, 5), dtype=np.int64)
+            count = np.zeros((2, 5), dtype=np.int64)
+            engine.copy_depth(5, ticks, qty, count)
+
+            for row, side in enumerate(Side):
+                levels = {}
+                for order in engine.orders.values():
+                    if order.side == side and order.status in (OrderStatus.OPEN, OrderStatus.PARTIAL):
+                        level = levels.setdefault(order.ticks, [0, 0])
+                        level[0] += order.qty
+                        level[1] += 1
+                expected = sorted(levels.items(), reverse=(side == Side.BUY))[:5]
+                self.assertTrue(expected)
+                got = [(ticks[row, i], [qty[row, i], count[row, i]]) for i in range(len(expected))]
+                self.assertEqual(got, expected)
+
+    def test_integer_client_ids(self):
+        """An integer id set by the caller is a client id too, never taken for an engine id."""
+        engine = MatchingEngine()
+        other = engine.add_order(Order("A", "buy", 5, 98.0))
+        mine = engine.add_order(Order("A", "buy", 5, 99.0, order_id=other))
+        self.assertNotEqual(mine, other)
+        self.assertEqual(engine.orders[mine].client_id, other)
+
+        self.assertTrue(engine.cancel_order(other))
+        self.assertEqual(engine.orders[mine].status, OrderStatus.CANCELLED)
+        self.assertEqual(engine.orders.get(other).status, OrderStatus.OPEN)
+        self.assertEqual(engine.depth()[0], [(98.0, 5)])
+
+    def test_dense_ids_and_client_ids(self):
+        """The engine numbers orders densely; caller ids only live in an optional map."""
+        engine = MatchingEngine(retire_orders=True)
+        first = engine.add_order(Order("A", "buy", 5, 99.0, order_id="mine"))
+        second = engine.add_order(Order("A", Side.SELL, 5, 101.0))
+        self.assertEqual(second, first + 1)
+        self.assertEqual((engine.orders["mine"].order_id, engine.orders[first].client_id), (first, "mine"))
+        self.assertEqual(engine.orders[second].status, OrderStatus.OPEN)
+
+        self.assertTrue(engine.cancel_order("mine"))
+        self.assertNotIn("mine", engine.orders)
+        self.assertEqual(engine.orders.clients, {})
+        self.assertTrue(engine.cancel_order(np.int64(second)))
+        self.assertFalse(engine.cancel_order("unknown"))
+
+        # Slots of retired ids are released, so the index doesn't grow with the order count
+        for i in range(20_000):
+            engine.cancel_order(engine.submit(Side.BUY, 9900, 1, "B", float(i))[0])
+        self.assertEqual(len(engine.orders), 0)
+        self.assertLess(len(engine.orders.slots), 10_000)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            MatchingEngine(backend='btree')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine
+from engine.order import Order
+from engine.order_log import OrderLog, read_order_log, replay
+from analytics.snapshots import SnapshotRecorder
+from run_simulation import simulate_scenario
+
+
+class TestOrderLog(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_records_every_entry_point(self):
+        engine = MatchingEngine(tick_size=0.05)
+        with OrderLog(self.path, engine=engine):
+            engine.add_order(Order("A", "sell", 10, 100.05, order_id="s1", timestamp=1.0))
+            engine.submit(0, 2000, 4, "B", 1.5)
+            engine.add_orders([0, 1], [99.0, np.nan], [5, 3], order_type=[0, 1], agent=[0, 1], timestamp=2.0,
+                              agent_ids=["B", "C"])
+            engine.cancel_order("s1", 2.5)
+
+        config, records = read_order_log(self.path)
+        self.assertEqual(config['tick_size'], 0.05)
+        self.assertEqual(records, [
+            ('order', 1.0, 1, 0, 100.05, 10, "A", "s1"),
+            ('submit', 1.5, 0, 2000, 4, "B"),
+            ('submit', 2.0, 0, 1980, 5, "B"),
+            ('submit', 2.0, 1, None, 3, "C"),
+            ('cancel', 2.5, "s1"),
+        ])
+
+        replayed = replay(self.path)
+        self.assertEqual(replayed.tape.columns().keys(), engine.tape.columns().keys())
+        for name, values in engine.tape.columns().items():
+            np.testing.assert_array_equal(replayed.tape.columns()[name], values)
+        self.assertEqual(replayed.depth(), engine.depth())
+
+    def test_ids_keep_their_type(self):
+        engine = MatchingEngine()
+        with OrderLog(self.path, engine=engine):
+            engine.add_order(Order(7, "sell", 10, 100.0, order_id=-3, timestamp=1.0))
+            engine.add_order(Order("7", "sell", 10, 100.1, order_id="-3", timestamp=1.0))
+            engine.submit(0, 10010, 15, np.int64(8), 2.0)
+
+        records = read_order_log(self.path)[1]
+        self.assertEqual([(r[6], r[7]) for r in records[:2]], [(7, -3), ("7", "-3")])
+        self.assertEqual([type(r[6]) for r in records[:2]], [int, str])
+        self.assertEqual(type(records[2][5]), int)
+
+        replayed = replay(self.path)
+        self.assertEqual([trade.buyer_id for trade in replayed.tape], [8, 8])
+        self.assertEqual([trade.seller_id for trade in replayed.tape], [7, "7"])
+        self.assertEqual(replayed.orders[-3].agent_id, 7)
+
+    def test_replay_regenerates_scenario_history(self):
+        for vectorized in (False, True):
+            result = simulate_scenario("B", 40, 5, 5, horizon=120.0, vectorized=vectorized, order_log=self.path)
+            recorder = SnapshotRecorder()
+            engine = replay(self.path, recorder=recorder, until=120.0)
+
+            for name, values in result.trades.items():
+                np.testing.assert_array_equal(engine.tape.columns()[name], values)
+            l1 = recorder.get_l1_dataframe()
+            self.assertEqual(len(l1), 120)
+            np.testing.assert_array_equal(l1['mid_price'].to_numpy(), result.l1['mid_price'])
+
+if __name__ == '__main__':
+    unittest.main()
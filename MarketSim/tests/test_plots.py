@@ -0,0 +1,121 @@
+import unittest
+import os
+import sys
+import re
+import tempfile
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run_simulation import run_scenarios
+from analytics.plots import MarketPlots, minmax_indices, lttb_indices, write_report
+from analytics.pdfcat import concat_pdfs, _objects, REF
+
+
+class TestDecimation(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.x = np.arange(20_000, dtype=float)
+        self.y = np.cumsum(rng.normal(size=len(self.x)))
+        self.y[[100, 5000, 5001]] = np.nan
+
+    def test_minmax_keeps_every_bucket_extreme(self):
+        width = 200
+        picked = minmax_indices(self.x, self.y, width)
+        self.assertLessEqual(len(picked), 2 * width)
+        self.assertTrue(np.all(np.diff(picked) > 0))
+        self.assertTrue(np.isfinite(self.y[picked]).all())
+        for bucket in np.array_split(np.arange(len(self.x)), width):
+            values = self.y[bucket]
+            inside = self.y[picked[(picked >= bucket[0]) & (picked <= bucket[-1])]]
+            self.assertEqual(inside.min(), np.nanmin(values))
+            self.assertEqual(inside.max(), np.nanmax(values))
+
+    def test_lttb_keeps_endpoints_and_count(self):
+        picked = lttb_indices(self.x, self.y, 500)
+        self.assertEqual(len(picked), 500)
+        self.assertEqual((picked[0], picked[-1]), (0, len(self.x) - 1))
+        self.assertTrue(np.all(np.diff(picked) > 0))
+        # Short series come back whole
+        np.testing.assert_array_equal(lttb_indices(self.x[:10], self.y[:10], 500), np.arange(10))
+
+
+class TestReport(unittest.TestCase):
+
+    def test_streamed_candles_and_pooled_report(self):
+        configs = [dict(scenario_name=name, noise_count=40, mm_count=5, mom_count=0, horizon=300.0)
+                   for name in ("A", "B")]
+        results = run_scenarios(configs, workers=1)
+
+        # Candles from the streamed 1s bars match a resample of the recorded mid
+        result = results[0]
+        plotter = MarketPlots(result, result.tape, metrics=result.metrics, decimate='lttb')
+        df = result.get_l1_dataframe().iloc[50:]
+        streamed = plotter._ohlc(df, '1s')
+        np.testing.assert_array_equal(streamed.to_numpy(), df['mid_price'].resample('1s').ohlc().dropna().to_numpy())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.pdf')
+            write_report(path, results, workers=2)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read().count(b'/Type /Page /'), len(results))
+
+
+class TestPdfConcat(unittest.TestCase):
+
+    @staticmethod
+    def pages(count):
+        import matplotlib.pyplot as plt
+        import io
+        parts = []
+        for i in range(count):
+            fig, ax = plt.subplots()
+            ax.plot([0, 1, i])
+            ax.set_title(f"page {i}")
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='pdf')
+            plt.close(fig)
+            parts.append(buffer.getvalue())
+        return parts
+
+    def test_pages_keep_their_objects(self):
+        merged = concat_pdfs(self.pages(3))
+
+        # Every in-use xref entry points at its own object header
+        xref_at = int(merged[merged.rindex(b'startxref') + 9:].split()[0])
+        table = merged[xref_at:merged.index(b'trailer', xref_at)]
+        entries = re.findall(rb'(\d{10}) (\d{5}) ([nf])', table)
+        for number, (offset, _, kind) in enumerate(entries):
+            if kind == b'n':
+                self.assertTrue(merged.startswith(b'%d 0 obj' % number, int(offset)))
+        self.assertEqual(int(re.search(rb'/Size (\d+)', merged[xref_at:]).group(1)), len(entries))
+
+        objects, trailer = _objects(merged)
+        for body in objects.values():
+            head = body.split(b'stream')[0]
+            self.assertTrue(all(int(m.group(1)) in objects for m in REF.finditer(head)))
+        catalog = objects[int(re.search(rb'/Root (\d+)', trailer).group(1))]
+        root = objects[int(re.search(rb'/Pages (\d+)', catalog).group(1))]
+        self.assertIn(b'/Count 3', root)
+        kids = [objects[int(k)] for k in re.findall(rb'(\d+) 0 R', root)]
+        self.assertEqual(len(kids), 3)
+        self.assertTrue(all(b'/Parent' in kid for kid in kids))
+        self.assertEqual(merged.count(b'/Type /Page /'), 3)
+
+    def test_unsupported_pdfs_are_refused(self):
+        part = self.pages(1)[0]
+        xref_at = int(part[part.rindex(b'startxref') + 9:].split()[0])
+        with self.assertRaises(ValueError):
+            concat_pdfs([part[:xref_at] + part[xref_at:].replace(b'xref', b'1 0 obj', 1)])
+        number = re.search(rb'(\d+) 0 obj', part).group(1)
+        offset = b'%010d 00000 n' % part.index(number + b' 0 obj')
+        with self.assertRaises(ValueError):
+            concat_pdfs([part.replace(offset, offset.replace(b'00000 n', b'00001 n'))])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine
+from agents.ledger import PositionLedger
+from agents.population import AgentPopulation
+
+
+class TestAgentPopulation(unittest.TestCase):
+
+    def run_population(self, seed):
+        engine = MatchingEngine()
+        ledger = PositionLedger()
+        population = AgentPopulation(40, 3, 5, tick_size=engine.tick_size, seed=seed, block_size=256)
+        population.attach(ledger)
+        engine.add_fill_listener(ledger.on_fill)
+        population.warmup(engine, 20)
+        for t in range(1, 121):
+            population.run_until(engine, float(t))
+        return engine, ledger
+
+    def test_seeded_runs_are_reproducible_and_balanced(self):
+        engine, ledger = self.run_population(7)
+        again, _ = self.run_population(7)
+        self.assertGreater(len(engine.tape), 0)
+        self.assertEqual(engine.tape.columns()['price'].tolist(), again.tape.columns()['price'].tolist())
+        self.assertTrue(np.all(np.diff(engine.tape.columns()['timestamp']) >= 0))
+        # Every fill is between two registered members, so positions net to zero
+        self.assertEqual(ledger.position[:len(ledger)].sum(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine, OrderIndex
+from engine.order import Side, OrderStatus
+from engine.order_book import HeapBook
+from agents.ledger import PositionLedger
+from agents.population import AgentPopulation
+
+
+class TestRetention(unittest.TestCase):
+
+    def test_max_tape_keeps_last_trades(self):
+        engine = MatchingEngine(max_tape=10)
+        for i in range(50):
+            engine.submit(Side.SELL, 10000, 1, "S", float(i))
+            engine.submit(Side.BUY, 10000, 1, "B", float(i))
+            # Trimming runs on entry, so at most one order's trades sit above the cap
+            self.assertLessEqual(len(engine.tape), 11)
+        self.assertEqual(engine.tape.cursor, 50)
+        self.assertEqual(engine.memory_stats()['dropped_trades'], 50 - len(engine.tape))
+
+    def test_order_ttl_expires_resting_orders(self):
+        engine = MatchingEngine(order_ttl=5.0, retire_orders=True)
+        stale = engine.submit(Side.BUY, 9900, 5, "A", 0.0)[0]
+        fresh = engine.submit(Side.BUY, 9800, 5, "A", 4.0)[0]
+        engine.submit(Side.SELL, 10100, 5, "B", 6.0)
+        self.assertNotIn(stale, engine.orders)
+        self.assertEqual(engine.orders[fresh].status, OrderStatus.OPEN)
+        stats = engine.memory_stats()
+        self.assertEqual((stats['expired_orders'], stats['resting_orders'], stats['indexed_orders']), (1, 2, 2))
+
+    def test_retired_orders_leave_the_index(self):
+        engine = MatchingEngine(retire_orders=True)
+        resting = engine.submit(Side.SELL, 10000, 10, "S", 0.0)[0]
+        filled = engine.submit(Side.BUY, 10000, 4, "B", 1.0)[0]
+        cancelled = engine.submit(Side.BUY, 9900, 4, "B", 2.0)[0]
+        engine.cancel_order(cancelled)
+        self.assertEqual(engine.orders[resting].qty, 6)
+        self.assertNotIn(filled, engine.orders)
+        self.assertNotIn(cancelled, engine.orders)
+        # A fully filled submit() is never indexed; only the cancelled order had to be retired
+        self.assertEqual(engine.memory_stats()['retired_orders'], 1)
+
+    def test_heap_compaction_bounds_tombstones(self):
+        engine = MatchingEngine(backend='heap', compact_ratio=0.25)
+        ids = [engine.submit(Side.BUY, 9000 + i, 1, "A", float(i))[0] for i in range(4000)]
+        # Cancel everything but the best bids, so every cancel leaves a tombstone
+        for oid in ids[:3000]:
+            engine.cancel_order(oid)
+            stats = engine.memory_stats()
+            bound = max(HeapBook.MIN_COMPACT_TOMBSTONES, 0.25 * stats['resting_orders'])
+            self.assertLessEqual(stats['tombstones'], bound + 1)
+        self.assertGreater(engine.book.compactions, 0)
+        self.assertEqual(engine.get_snapshot().best_bid, 129.99)
+
+    def test_long_resting_orders_do_not_pin_the_index(self):
+        engine = MatchingEngine(retire_orders=True)
+        pinned = engine.submit(Side.BUY, 5000, 1, "A", 0.0)[0]
+        for i in range(20_000):
+            engine.cancel_order(engine.submit(Side.BUY, 9900, 1, "B", float(i))[0])
+        self.assertLessEqual(engine.memory_stats()['index_slots'], 2 * OrderIndex.TRIM)
+        self.assertEqual(engine.orders[pinned].status, OrderStatus.OPEN)
+        self.assertTrue(engine.cancel_order(pinned))
+        self.assertEqual(len(engine.orders), 0)
+
+    def test_long_horizon_stays_bounded(self):
+        """A long session on a long_horizon engine never outgrows its limits."""
+        engine = MatchingEngine.long_horizon(max_tape=2000, order_ttl=120.0)
+        ledger = PositionLedger()
+        population = AgentPopulation(80, 20, 0, sigma=0.5, seed=3)
+        population.attach(ledger)
+        engine.add_fill_listener(ledger.on_fill)
+        population.warmup(engine)
+        for t in range(30, 2401, 30):
+            population.run_until(engine, float(t))
+            stats = engine.memory_stats()
+            self.assertLessEqual(stats['tape_length'], 2000 + 50)
+            self.assertLessEqual(stats['tombstones'], HeapBook.MIN_COMPACT_TOMBSTONES + 0.25 * stats['resting_orders'])
+            self.assertLessEqual(stats['index_slots'], 2 * stats['indexed_orders'] + 2 * OrderIndex.TRIM)
+            # Nothing rests longer than the ttl (plus one probe interval)
+            self.assertLess(stats['resting_orders'], 120 * 15 + 30 * 15)
+
+        stats = engine.memory_stats()
+        self.assertGreater(stats['dropped_trades'], 0)
+        self.assertGreater(stats['expired_orders'], 0)
+        self.assertGreater(stats['compactions'], 0)
+        self.assertGreater(stats['retired_orders'], 10 * stats['index_slots'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run_simulation import run_scenarios
+
+
+class TestScenarioRunner(unittest.TestCase):
+
+    def test_pool_matches_serial_run(self):
+        configs = [dict(scenario_name="B", noise_count=40, mm_count=5, mom_count=0, horizon=60.0),
+                   dict(scenario_name="C", noise_count=40, mm_count=0, mom_count=10, horizon=60.0),
+                   dict(scenario_name="V", noise_count=40, mm_count=5, mom_count=5, horizon=60.0, vectorized=True)]
+        serial = run_scenarios(configs, workers=1)
+        parallel = run_scenarios(configs, workers=2)
+
+        self.assertEqual(len({result.config['seed'] for result in serial}), len(configs))
+        for a, b in zip(serial, parallel):
+            self.assertEqual(a.name, b.name)
+            self.assertTrue(a.equals(b))
+        self.assertEqual(len(serial[0].l1['mid_price']), 60)
+        self.assertEqual(serial[0].agents['position'].sum(), 0)
+
+        # Trades travel once, as result columns; the streamed metrics come without the tape
+        for result in parallel:
+            self.assertIsNone(result.metrics.tape)
+            self.assertEqual(result.metrics.trade_count, len(result.trades['price']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.matching_engine import MatchingEngine
+from analytics.snapshots import SnapshotRecorder
+
+
+class TestSnapshotRecorder(unittest.TestCase):
+
+    def record(self, recorder, n=250):
+        engine = MatchingEngine()
+        rng = np.random.default_rng(2)
+        for t in range(n):
+            for _ in range(5):
+                side = int(rng.integers(0, 2))
+                engine.submit(side, 10000 + int(rng.integers(-20, 20)), int(rng.integers(1, 10)), "A", float(t))
+            recorder.record_snapshot(engine, float(t))
+
+    def test_chunks_and_spill_read_as_one_history(self):
+        reference = SnapshotRecorder(depth=3, capacity=4096)
+        self.record(reference)
+        chunked = SnapshotRecorder(depth=3, capacity=64)
+        self.record(chunked)
+        with tempfile.TemporaryDirectory() as spill_dir:
+            spilled = SnapshotRecorder(depth=3, capacity=64, spill_dir=spill_dir)
+            self.record(spilled)
+            self.assertEqual(len(os.listdir(spill_dir)), 3 * 9)
+
+            for recorder in (chunked, spilled):
+                self.assertEqual(len(recorder), 250)
+                expected, actual = reference.get_l1_arrays(), recorder.get_l1_arrays()
+                for name in expected:
+                    np.testing.assert_array_equal(actual[name], expected[name])
+                expected, actual = reference.get_l2_arrays(), recorder.get_l2_arrays()
+                for name in expected:
+                    np.testing.assert_array_equal(actual[name], expected[name])
+
+                window = recorder.get_l1_arrays(start=60.0, stop=130.0)
+                np.testing.assert_array_equal(window['timestamp'], np.arange(60.0, 131.0))
+                self.assertEqual(len(recorder.get_l2_dataframe(start=200.0)), 50)
+
+            # Spilled chunks are read back as memory maps
+            first = next(spilled.iter_chunks(columns=['mid_price']))['mid_price']
+            self.assertIsInstance(first, np.memmap)
+            self.assertEqual(reference.get_l1_dataframe().shape, spilled.get_l1_dataframe().shape)
+
+    def test_checkpoint_deltas_rebuild_history(self):
+        recorder = SnapshotRecorder(depth=3, capacity=64)
+        self.record(recorder, 100)
+        first, marker = recorder.checkpoint_delta(None)
+        self.record(recorder, 50)
+        second, _ = recorder.checkpoint_delta(marker)
+
+        restored = SnapshotRecorder.restore_checkpoint([first, second])
+        self.assertEqual(len(restored), 150)
+        for name, values in recorder.get_l1_arrays().items():
+            np.testing.assert_array_equal(restored.get_l1_arrays()[name], values)
+
+if __name__ == '__main__':
+    unittest.main()
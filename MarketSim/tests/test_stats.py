@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.event_loop import EventLoop
+from engine.matching_engine import MatchingEngine
+from engine.order import Order
+from engine.stats import StatsDump
+from run_simulation import simulate_scenario
+
+
+class TestStats(unittest.TestCase):
+
+    def test_engine_counters(self):
+        engine = MatchingEngine()
+        stats = engine.enable_stats()
+        engine.add_order(Order("A", "sell", 10, 100.0, order_id="s1"))
+        engine.add_order(Order("A", "sell", 10, 100.1, order_id="s2"))
+        engine.cancel_order("s1")
+        engine.submit(0, 10010, 4, "B", 1.0)
+        engine.get_snapshot()
+        engine.get_snapshot()
+
+        counts = stats.snapshot()
+        self.assertEqual(counts['orders_added'], 3)
+        self.assertEqual(counts['orders_cancelled'], 1)
+        self.assertEqual(counts['tombstones_skipped'], 1)
+        self.assertEqual(counts['fills'], 1)
+        self.assertEqual(counts['snapshot_calls'], 2)
+        self.assertEqual(counts['snapshot_rebuilds'], 1)
+        self.assertEqual(counts['resting_orders'], 1)
+
+        stats.disable()
+        self.assertNotIn('add_order', vars(engine))
+        engine.add_order(Order("A", "buy", 1, 99.0, order_id="b1"))
+        self.assertEqual(stats.snapshot()['orders_added'], 3)
+
+    def test_fill_count_survives_tape_trimming(self):
+        engine = MatchingEngine(max_tape=3)
+        stats = engine.enable_stats()
+        for i in range(10):
+            engine.submit(1, 10000, 1, "S", float(i))
+            engine.submit(0, 10000, 1, "B", float(i))
+        engine.consume_tape(len(engine.tape))
+        self.assertEqual(stats.snapshot()['fills'], 10)
+        self.assertEqual(engine.fill_count, 10)
+
+    def test_dump_without_path_logs(self):
+        loop = EventLoop()
+        stats = loop.enable_stats()
+        StatsDump(stats, loop, 1.0)
+        with self.assertLogs('engine.stats', level='INFO') as logs:
+            loop.run_until(3.0)
+        self.assertEqual(len(logs.output), 3)
+
+    def test_loop_callback_timings(self):
+        loop = EventLoop()
+        stats = loop.enable_stats()
+        ticks = []
+        loop.schedule_every(1.0, lambda: ticks.append(loop.current_time))
+        loop.schedule(0.5, ticks.clear)
+        loop.run_until(5.0)
+
+        callbacks = stats.snapshot()['callbacks']
+        self.assertEqual(callbacks['TestStats.test_loop_callback_timings.<locals>.<lambda>']['calls'], 5)
+        self.assertEqual(callbacks['list.clear']['calls'], 1)
+
+    def test_profiled_run_matches_plain_run(self):
+        for vectorized in (False, True):
+            config = dict(scenario_name="C", noise_count=40, mm_count=5, mom_count=5, horizon=60.0,
+                          vectorized=vectorized)
+            plain = simulate_scenario(**config)
+            profiled = simulate_scenario(profile=True, **config)
+            self.assertTrue(plain.equals(profiled))
+            self.assertIsNone(plain.stats)
+            self.assertEqual(set(profiled.stats['agents']), {'NoiseTrader', 'MarketMaker', 'MomentumTrader'})
+            self.assertGreater(profiled.stats['engine']['fills'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
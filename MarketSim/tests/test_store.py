@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run_simulation import run_scenarios
+from analytics.store import ResultStore
+
+
+class TestResultStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        configs = [dict(scenario_name=name, noise_count=30, mm_count=mm, mom_count=0, horizon=90.0, seed=seed)
+                   for name, mm in (("A", 0), ("B", 5)) for seed in (1, 2)]
+        cls.results = run_scenarios(configs, workers=1)
+
+    def test_partitions_and_lazy_queries(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ResultStore(root, partition_seconds=30.0)
+            for result in self.results:
+                store.write(result)
+
+            # Reopening reads the index only
+            store = ResultStore(root)
+            self.assertEqual(len(store.runs()), 4)
+            self.assertEqual(len(store.runs(scenario_name="B")), 2)
+            self.assertEqual(len(store.runs(scenario_name="B", seed=2)), 1)
+
+            # 90 one-second snapshots from t=1 fall into four 30s partitions
+            self.assertEqual(len(store.partitions('l1', scenario_name="A", seed=1)), 4)
+            self.assertEqual(len(store.partitions('l1', start=35.0, stop=50.0, scenario_name="A", seed=1)), 1)
+
+            a1 = self.results[0]
+            spreads = store.load('l1', columns=['timestamp', 'spread'], scenario_name="A", seed=1)
+            self.assertEqual(list(spreads.columns), ['run', 'scenario', 'seed', 'timestamp', 'spread'])
+            np.testing.assert_array_equal(spreads['spread'].to_numpy(), a1.l1['spread'])
+
+            window = store.load('l1', columns=['timestamp'], start=35.0, stop=50.0, scenario_name="A", seed=1)
+            self.assertEqual(window['timestamp'].tolist(), [float(t) for t in range(35, 51)])
+
+            # VWAP by scenario from two trade columns
+            trades = store.load('trades', columns=['price', 'qty'])
+            trades['notional'] = trades['price'] * trades['qty']
+            by_scenario = trades.groupby('scenario')[['notional', 'qty']].sum()
+            for name in ("A", "B"):
+                runs = [r for r in self.results if r.name == name]
+                notional = sum(float((r.trades['price'] * r.trades['qty']).sum()) for r in runs)
+                qty = sum(int(r.trades['qty'].sum()) for r in runs)
+                self.assertAlmostEqual(by_scenario.loc[name, 'notional'] / by_scenario.loc[name, 'qty'], notional / qty)
+
+            # L2 is read through scan(), as memory maps
+            _, l2 = next(store.scan('l2', columns=['price', 'levels'], scenario_name="B", seed=2))
+            self.assertIsInstance(l2['price'], np.memmap)
+            np.testing.assert_array_equal(l2['levels'], self.results[3].l2['levels'][:len(l2['levels'])])
+
+            agents = store.load('agents', scenario_name="B", seed=1)
+            np.testing.assert_array_equal(agents['pnl'].to_numpy(), self.results[2].agents['pnl'])
+            self.assertEqual(agents['agent_id'].tolist(), self.results[2].agents['agent_id'])
+
+            # Writing a run again replaces it
+            store.write(self.results[0])
+            self.assertEqual(len(store.partitions('l1', scenario_name="A", seed=1)), 4)
+
+    def test_runner_writes_its_results(self):
+        with tempfile.TemporaryDirectory() as root:
+            configs = [dict(scenario_name="C", noise_count=20, mm_count=0, mom_count=5, horizon=30.0)] * 2
+            results = run_scenarios(configs, workers=1, store=ResultStore(root))
+
+            store = ResultStore(root)
+            self.assertEqual(len(store.runs(scenario_name="C")), 2)
+            for result in results:
+                self.assertEqual(len(store.runs(scenario_name="C", seed=result.config['seed'])), 1)
+                spreads = store.load('l1', columns=['spread'], scenario_name="C", seed=result.config['seed'])
+                np.testing.assert_array_equal(spreads['spread'].to_numpy(), result.l1['spread'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.tape import TradeTape
+
+
+class TestTradeTape(unittest.TestCase):
+
+    def test_cursor_reads_survive_growth_and_consume(self):
+        """Readers see every trade exactly once while the buffer grows and recycles space."""
+        tape = TradeTape(capacity=4)
+        cursor = 0
+        seen = []
+        for i in range(50):
+            tape.append(float(i), 100.0 + i, i + 1, f"B{i % 3}", f"S{i % 2}", 'buy' if i % 2 else 'sell')
+            if i % 7 == 6:
+                trades, cursor = tape.read(cursor)
+                seen.extend(trades['qty'].tolist())
+                tape.consume(len(tape) - 2)
+        trades, cursor = tape.read(cursor)
+        seen.extend(trades['qty'].tolist())
+
+        self.assertEqual(seen, list(range(1, 51)))
+        self.assertEqual(cursor, 50)
+        self.assertEqual(tape[-1].buyer_id, "B1")
+        self.assertEqual(tape[-1].aggressor_side, 'buy')
+        with self.assertRaises(ValueError):
+            tape.read(0)
+
+    def test_dataframe_export(self):
+        tape = TradeTape()
+        tape.log_trade(1.0, 105.0, 10, "B1", "S1", "buy")
+        tape.log_trade(2.0, 106.0, 20, "B2", "S1", "sell")
+        df = tape.to_dataframe()
+
+        self.assertEqual(list(df['seller']), ["S1", "S1"])
+        self.assertEqual(df['qty'].sum(), 30)
+        self.assertTrue('datetime' in df.columns)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine.exchange import Exchange
+from engine.order import Side
+from agents.cross_asset import CrossMarketMaker, PairsTrader
+from environment.universe import MarketUniverse
+
+
+def _universe(workers):
+    symbols = {f"S{i}": dict(initial_value=50.0 + 10 * i) for i in range(5)}
+    agents = [CrossMarketMaker("XMM", ["S0", "S1", "S2"]),
+              PairsTrader("PAIR", "S3", "S4", window=10, entry=1.0)]
+    return MarketUniverse(symbols, agents, workers=workers, seed=3, noise_count=10, mm_count=3), agents
+
+
+class TestExchange(unittest.TestCase):
+
+    def test_books_are_independent(self):
+        exchange = Exchange(["AAA", "BBB"])
+        fills = []
+        exchange.add_fill_listener(lambda symbol, *fill: fills.append((symbol,) + fill))
+        exchange.submit("AAA", Side.BUY, 10000, 5, "a", 0.0)
+        exchange.submit("BBB", Side.SELL, 9990, 5, "b", 0.0)
+        self.assertEqual(fills, [])
+
+        exchange.submit("AAA", Side.SELL, 10000, 2, "c", 1.0)
+        self.assertEqual([f[0] for f in fills], ["AAA"])
+        self.assertEqual(exchange["AAA"].get_snapshot().best_bid, 100.0)
+        self.assertEqual(exchange.snapshots(["BBB"])["BBB"]["best_ask"], 99.9)
+        with self.assertRaises(ValueError):
+            exchange.list_symbol("AAA")
+
+
+class TestMarketUniverse(unittest.TestCase):
+
+    def test_sharded_run_matches_in_process(self):
+        local, local_agents = _universe(workers=0)
+        with local:
+            local.run(30.0)
+            local.run(45.5)
+            expected = local.results()
+        sharded, sharded_agents = _universe(workers=2)
+        with sharded:
+            sharded.run(45.5)
+            results = sharded.results()
+
+        self.assertEqual([r.name for r in results], ["S0", "S1", "S2", "S3", "S4"])
+        for a, b in zip(expected, results):
+            self.assertTrue(a.equals(b), a.name)
+        for a, b in zip(local_agents, sharded_agents):
+            self.assertEqual(a.positions, b.positions)
+
+    def test_barriers_and_cross_asset_fills(self):
+        with _universe(workers=0)[0] as universe:
+            universe.run(20.0)
+            results = universe.results()
+        for result in results:
+            # One row at start plus one per one-second barrier, all symbols on the same clock
+            self.assertEqual(result.l1['timestamp'].tolist(), [float(t) for t in range(21)])
+        # The cross market maker is booked per symbol, and only where it quotes
+        traded = [r.agent_dataframe().loc["XMM", "position"] != 0 or r.agent_dataframe().loc["XMM", "cash"] != 0
+                  for r in results]
+        self.assertTrue(any(traded[:3]))
+        self.assertFalse(any(traded[3:]))
+        self.assertAlmostEqual(results[4].l1['mid_price'][0], 90.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import os
+import sys
+
+# Ensure we can import from the parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from environment.vector_env import VectorTradingEnvironment
+
+
+def rollout(workers, steps=12):
+    env = VectorTradingEnvironment(4, workers=workers, seed=3, max_steps=5, warmup=5.0)
+    try:
+        obs, _ = env.reset(seed=3)
+        history = [obs.copy()]
+        actions = np.random.default_rng(0).integers(0, 3, (steps, 4))
+        finals = 0
+        for step_actions in actions:
+            obs, rewards, terminations, truncations, infos = env.step(step_actions)
+            history.append(np.column_stack([obs, rewards, terminations, truncations]))
+            if infos:
+                finals += int(infos['_final_obs'].sum())
+        return np.concatenate(history, axis=None), finals
+    finally:
+        env.close()
+
+
+class TestVectorTradingEnvironment(unittest.TestCase):
+
+    def test_sharded_matches_in_process_and_autoresets(self):
+        local, local_finals = rollout(workers=0)
+        sharded, sharded_finals = rollout(workers=2)
+        np.testing.assert_array_equal(local, sharded)
+        # max_steps=5 over 12 steps: every sub-env finishes twice
+        self.assertEqual(local_finals, 8)
+        self.assertEqual(sharded_finals, 8)
+
+if __name__ == '__main__':
+    unittest.main()